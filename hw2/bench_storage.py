@@ -0,0 +1,40 @@
+"""
+Сравнение скорости вставки и поиска ссылок для движков хранилища
+из storage.py. Хранилища создаются во временном каталоге.
+Запуск: python bench_storage.py [количество ссылок]
+"""
+import sys
+import tempfile
+from random import sample
+from time import perf_counter
+
+from storage import open_storage
+
+
+def bench(engine: str, count: int, data_dir: str):
+    storage = open_storage(engine, data_dir)
+    keys = [f'k{i}' for i in range(count)]
+    start = perf_counter()
+    for i, key in enumerate(keys):
+        storage.insert(f'http://example.com/{i}', key)
+    insert_rate = count / (perf_counter() - start)
+    lookups = sample(keys, min(count, 100000))
+    start = perf_counter()
+    for key in lookups:
+        storage.find(key)
+    lookup_rate = len(lookups) / (perf_counter() - start)
+    storage.close()
+    start = perf_counter()
+    open_storage(engine, data_dir).close()
+    reopen = perf_counter() - start
+    print(f'{engine:<7} вставка: {insert_rate:>9.0f} в секунду, '
+          f'поиск: {lookup_rate:>9.0f} в секунду, '
+          f'открытие: {reopen * 1000:>7.1f} мс')
+
+
+if __name__ == '__main__':
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 100000
+    print(f'Ссылок: {count}')
+    for engine in ('sqlite', 'memory', 'log'):
+        with tempfile.TemporaryDirectory() as data_dir:
+            bench(engine, count, data_dir)
@@ -2,12 +2,14 @@ from django.core.management import execute_from_command_line
 from django.http import HttpResponseRedirect
 from django.urls import path
 from django.conf import settings
-from django.db import connection
 from django.shortcuts import render
 
-from random import choice, randrange
 from string import ascii_letters, digits
 from pathlib import Path
+from threading import Lock
+import os
+
+from storage import open_storage
 
 BASE_DIR = Path(__file__).resolve().parent  # Определение пути к файлу
 
@@ -27,50 +29,38 @@ settings.configure(
     }
 )
 
-CREATE_TABLE = '''
-CREATE TABLE if not exists url_shortener(
-    id integer primary key,
-    url_original CHAR(256),
-    url_short CHAR(100) 
-);
-'''
+# Движок хранилища ссылок: sqlite, memory или log (см. storage.py)
+STORAGE_ENGINE = os.environ.get('HW2_STORAGE', 'sqlite')
 
+# Алфавит ключей коротких ссылок и размер резервируемого блока ключей
+ALPHABET = digits + ascii_letters
+KEY_BLOCK_SIZE = 500
 
-def create_table():
-    """
-    Создает таблицу из SQL запроса CREATE_TABLE
-    """
-    with connection.cursor() as cur:
-        cur.execute(CREATE_TABLE)
+# Зарезервированные, но ещё не выданные ключи текущего процесса
+free_keys = []
+free_keys_lock = Lock()
+
+# Хранилище открывается (и создаёт свою схему) при запуске, до обработки
+# первого запроса
+storage = open_storage(STORAGE_ENGINE, BASE_DIR / 'data')
 
 
 def insert_records(url_orig: str, url_short: str):
     """
-    Вставляет передаваемые URL в колонки url_original, url_short
-    таблицы url_shortener
+    Сохраняет передаваемые URL (оригинальный и ключ короткого) в хранилище
     """
-    with connection.cursor() as cur:
-        query = f'INSERT INTO url_shortener (url_original, url_short) ' \
-                f'VALUES(%s, %s)'
-        cur.execute(query, (url_orig, url_short))
+    storage.insert(url_orig, url_short)
 
 
 def find_url(url_key: str):
     """
     Функция ищет ключ (случайная последовательность символов после адреса хоста)
-    короткого URL в таблице url_shortener и возвращает соответствующий ему
+    короткого URL в хранилище и возвращает соответствующий ему
     оригинальный URL или значение False при ненахождении объекта поиска.
     :param url_key: Искомый ключ короткого URL.
     :return: Оригинальный URL или значение False.
     """
-    try:
-        with connection.cursor() as cur:
-            query = 'SELECT * FROM url_shortener WHERE url_short = %s'
-            cur.execute(query, [url_key])
-            record = cur.fetchone()
-        return record[1]
-    except:
-        return False
+    return storage.find(url_key) or False
 
 
 def check_url(url_txt: str) -> bool:
@@ -83,23 +73,47 @@ def check_url(url_txt: str) -> bool:
     return url_txt.startswith(('http://', 'https://', 'ftp://'))
 
 
-def random_url(min_=5, max_=8) -> str:
+def base62_encode(number: int) -> str:
     """
-    Функция генерирует случайную последовательность цифр и букв.
-    Минимальная длина ключа - min_ символов, максимальная - max_ символов.
-    Также производится проверка сгенерированной последовательности
-    на уникальность - через поиск в базе данных, с использованием рекурсии.
-    :param: min_: Минимальная длина случайной последовательности.
-            max_: Максимальная длина случайной последовательности.
-    :return: Случайная последовательность букв и цифр.
+    Функция кодирует неотрицательное целое число строкой из символов
+    ALPHABET (цифры, строчные и прописные латинские буквы).
+    :param number: Кодируемое число.
+    :return: Строка в кодировке base62.
     """
-    dictionary = ascii_letters + digits
-    pass_length = randrange(min_, max_)
-    random_str = ''.join(choice(dictionary) for _ in range(pass_length))
-    if find_url(random_str):
-        return random_url(min_, max_)
-    else:
-        return random_str
+    chars = []
+    while True:
+        number, rest = divmod(number, 62)
+        chars.append(ALPHABET[rest])
+        if not number:
+            return ''.join(reversed(chars))
+
+
+def reserve_keys(count=KEY_BLOCK_SIZE) -> list:
+    """
+    Функция резервирует в хранилище блок из count значений счётчика ключей
+    и возвращает base62-представления этих значений, исключая ключи,
+    которые уже заняты (например, случайными ключами старых ссылок).
+    Занятость проверяется одним запросом на весь блок.
+    :param count: Размер резервируемого блока.
+    :return: Список свободных ключей.
+    """
+    end = storage.reserve(count)
+    keys = [base62_encode(number) for number in range(end - count, end)]
+    taken = storage.taken(keys)
+    return [key for key in keys if key not in taken]
+
+
+def allocate_url_key() -> str:
+    """
+    Функция возвращает свободный ключ для новой короткой ссылки. Ключи
+    выдаются из заранее зарезервированного блока (см. reserve_keys), поэтому
+    создание ссылки обходится одним INSERT без поиска ключа в базе данных.
+    :return: Ключ короткого URL.
+    """
+    with free_keys_lock:
+        while not free_keys:
+            free_keys.extend(reversed(reserve_keys()))
+        return free_keys.pop()
 
 
 def handler(request):
@@ -117,7 +131,7 @@ def handler(request):
         message = ''
         short_url = ''
         if check_url(url_original):
-            url_key = random_url()
+            url_key = allocate_url_key()
             insert_records(url_original, url_key)
             short_url = ''.join(('http://', request.get_host(), '/', url_key))
         else:
@@ -137,8 +151,9 @@ def url_handler(request, url_key):
     перенаправляет (производит HTTP редирект) на главную страницу.
     Если найден, редиректит на полный URL, сохраненный под данным ключом.
     """
-    if find_url(url_key):
-        return HttpResponseRedirect(find_url(url_key))
+    url_original = find_url(url_key)
+    if url_original:
+        return HttpResponseRedirect(url_original)
     else:
         return HttpResponseRedirect('/')
 
@@ -150,4 +165,3 @@ urlpatterns = [
 
 if __name__ == '__main__':
     execute_from_command_line()
-    create_table()
@@ -0,0 +1,250 @@
+import json
+import os
+import sqlite3
+from pathlib import Path
+from threading import Lock, local
+
+CREATE_TABLE = '''
+CREATE TABLE if not exists url_shortener(
+    id integer primary key,
+    url_original CHAR(256),
+    url_short CHAR(100)
+);
+'''
+
+CREATE_INDEX = '''
+CREATE UNIQUE INDEX if not exists url_shortener_url_short
+    ON url_shortener (url_short);
+'''
+
+CREATE_COUNTER_TABLE = '''
+CREATE TABLE if not exists url_key_counter(
+    name CHAR(50) primary key,
+    value integer not null default 0
+);
+'''
+
+# Запросы составлены один раз и не меняются, поэтому модуль sqlite3
+# переиспользует их подготовленные выражения из кеша соединения
+INSERT_URL = 'INSERT INTO url_shortener (url_original, url_short) ' \
+             'VALUES (?, ?)'
+SELECT_URL = 'SELECT url_original FROM url_shortener WHERE url_short = ?'
+INIT_COUNTER = 'INSERT OR IGNORE INTO url_key_counter (name) VALUES (?)'
+INCR_COUNTER = 'UPDATE url_key_counter SET value = value + ? WHERE name = ?'
+SELECT_COUNTER = 'SELECT value FROM url_key_counter WHERE name = ?'
+
+# Имя счётчика ключей коротких ссылок
+COUNTER_NAME = 'url_short'
+
+
+class Storage:
+    """
+    Интерфейс хранилища коротких ссылок. Хранилище создаёт свою схему при
+    открытии (в конструкторе), так что к первому запросу она уже существует.
+    """
+
+    def insert(self, url_original: str, url_short: str):
+        """
+        Сохраняет соответствие ключ короткого URL -> оригинальный URL.
+        """
+        raise NotImplementedError
+
+    def find(self, url_short: str):
+        """
+        Возвращает оригинальный URL по ключу или None.
+        """
+        raise NotImplementedError
+
+    def reserve(self, count: int) -> int:
+        """
+        Атомарно увеличивает счётчик ключей на count и возвращает его новое
+        значение (конец зарезервированного блока).
+        """
+        raise NotImplementedError
+
+    def taken(self, keys: list) -> set:
+        """
+        Возвращает множество уже занятых ключей из списка keys.
+        """
+        return {key for key in keys if self.find(key) is not None}
+
+    def close(self):
+        pass
+
+
+class SQLiteStorage(Storage):
+    """
+    Хранилище в базе SQLite, настроенной на скорость: журнал WAL,
+    synchronous=NORMAL (fsync только при контрольных точках WAL),
+    отображение файла в память (mmap). У каждого потока своё соединение
+    (сервер разработки Django обрабатывает запросы в потоках), запросы
+    выполняются через кеш подготовленных выражений соединения.
+    Режим WAL записывается в сам файл базы, поэтому первое открытие
+    переводит в него и data/db.sqlite3 из репозитория. Рядом с базой
+    появляются файлы -wal и -shm (они в .gitignore); close() переносит
+    журнал в файл базы, чтобы в нём были все ссылки.
+    """
+
+    def __init__(self, path, mmap_size=256 * 2 ** 20):
+        self.path = str(path)
+        self.mmap_size = mmap_size
+        self._local = local()
+        with self.connection as conn:
+            conn.execute(CREATE_TABLE)
+            conn.execute(CREATE_INDEX)
+            conn.execute(CREATE_COUNTER_TABLE)
+
+    @property
+    def connection(self) -> sqlite3.Connection:
+        conn = getattr(self._local, 'conn', None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, cached_statements=64,
+                                   check_same_thread=False)
+            conn.execute('PRAGMA journal_mode=WAL')
+            conn.execute('PRAGMA synchronous=NORMAL')
+            conn.execute(f'PRAGMA mmap_size={int(self.mmap_size)}')
+            conn.execute('PRAGMA busy_timeout=5000')
+            self._local.conn = conn
+        return conn
+
+    def insert(self, url_original: str, url_short: str):
+        with self.connection as conn:
+            conn.execute(INSERT_URL, (url_original, url_short))
+
+    def find(self, url_short: str):
+        record = self.connection.execute(SELECT_URL, (url_short,)).fetchone()
+        return record[0] if record else None
+
+    def reserve(self, count: int) -> int:
+        with self.connection as conn:
+            conn.execute(INIT_COUNTER, (COUNTER_NAME,))
+            conn.execute(INCR_COUNTER, (count, COUNTER_NAME))
+            return conn.execute(SELECT_COUNTER, (COUNTER_NAME,)).fetchone()[0]
+
+    def taken(self, keys: list) -> set:
+        query = 'SELECT url_short FROM url_shortener WHERE url_short IN (%s)'
+        taken = set()
+        for i in range(0, len(keys), 500):
+            batch = keys[i:i + 500]
+            rows = self.connection.execute(
+                query % ', '.join('?' * len(batch)), batch)
+            taken.update(row[0] for row in rows)
+        return taken
+
+    def close(self):
+        conn = getattr(self._local, 'conn', None)
+        if conn is not None:
+            conn.execute('PRAGMA wal_checkpoint(TRUNCATE)')
+            conn.close()
+            self._local.conn = None
+
+
+class MemoryStorage(Storage):
+    """
+    Хранилище в словаре в памяти процесса - для тестов. Данные теряются
+    при завершении процесса.
+    """
+
+    def __init__(self):
+        self.urls = {}
+        self.counter = 0
+        self._lock = Lock()
+
+    def insert(self, url_original: str, url_short: str):
+        with self._lock:
+            if url_short in self.urls:
+                raise KeyError(f'Ключ {url_short} уже занят')
+            self.urls[url_short] = url_original
+
+    def find(self, url_short: str):
+        return self.urls.get(url_short)
+
+    def reserve(self, count: int) -> int:
+        with self._lock:
+            self.counter += count
+            return self.counter
+
+
+class LogStorage(Storage):
+    """
+    Хранилище в журнале только для добавления: каждая ссылка и каждое
+    резервирование блока ключей дописываются в конец файла строкой JSON,
+    а поиск идёт по индексу-словарю в памяти. При открытии индекс
+    восстанавливается чтением журнала от начала до конца (неполная
+    последняя строка после аварийного завершения отбрасывается).
+    С fsync=True каждая запись сбрасывается на диск.
+    """
+
+    def __init__(self, path, fsync=False):
+        self.path = Path(path)
+        self.fsync = fsync
+        self.urls = {}
+        self.counter = 0
+        self._lock = Lock()
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        if self.path.exists():
+            self._replay()
+        self._file = open(self.path, 'a', encoding='utf-8')
+
+    def _replay(self):
+        """
+        Восстанавливает индекс по журналу. Неполная последняя строка (без
+        перевода строки) обрезается, чтобы следующая запись не дописалась
+        к ней и не потерялась при следующем чтении журнала.
+        """
+        end = 0
+        with open(self.path, 'rb') as log:
+            for line in log:
+                if not line.endswith(b'\n'):
+                    break
+                end += len(line)
+                try:
+                    record = json.loads(line)
+                except ValueError:
+                    continue
+                if 'counter' in record:
+                    self.counter = record['counter']
+                else:
+                    self.urls[record['short']] = record['original']
+        if end < self.path.stat().st_size:
+            os.truncate(self.path, end)
+
+    def _append(self, record: dict):
+        self._file.write(json.dumps(record, ensure_ascii=False) + '\n')
+        self._file.flush()
+        if self.fsync:
+            os.fsync(self._file.fileno())
+
+    def insert(self, url_original: str, url_short: str):
+        with self._lock:
+            if url_short in self.urls:
+                raise KeyError(f'Ключ {url_short} уже занят')
+            self._append({'short': url_short, 'original': url_original})
+            self.urls[url_short] = url_original
+
+    def find(self, url_short: str):
+        return self.urls.get(url_short)
+
+    def reserve(self, count: int) -> int:
+        with self._lock:
+            self._append({'counter': self.counter + count})
+            self.counter += count
+            return self.counter
+
+    def close(self):
+        self._file.close()
+
+
+def open_storage(engine: str, data_dir) -> Storage:
+    """
+    Создаёт хранилище по имени движка: sqlite (data_dir/db.sqlite3),
+    memory или log (data_dir/urls.log).
+    """
+    data_dir = Path(data_dir)
+    if engine == 'sqlite':
+        return SQLiteStorage(data_dir / 'db.sqlite3')
+    if engine == 'memory':
+        return MemoryStorage()
+    if engine == 'log':
+        return LogStorage(data_dir / 'urls.log')
+    raise ValueError(f'Неизвестный движок хранилища: {engine}')
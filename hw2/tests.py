@@ -0,0 +1,121 @@
+import sqlite3
+import tempfile
+import unittest
+from pathlib import Path
+
+from storage import LogStorage, MemoryStorage, SQLiteStorage, open_storage
+
+
+class StorageTestMixin:
+    """
+    Общие проверки для всех движков хранилища: сохранение, поиск,
+    отсутствующий ключ, счётчик ключей и повторное открытие.
+    """
+    engine = None
+    storage_class = None
+    persistent = True
+
+    def setUp(self):
+        self.data_dir = tempfile.TemporaryDirectory()
+        self.addCleanup(self.data_dir.cleanup)
+        self.storage = self.open()
+        self.addCleanup(lambda: self.storage.close())
+
+    def open(self):
+        return open_storage(self.engine, self.data_dir.name)
+
+    def reopen(self):
+        self.storage.close()
+        self.storage = self.open()
+
+    def test_engine(self):
+        self.assertIsInstance(self.storage, self.storage_class)
+
+    def test_insert_and_find(self):
+        self.storage.insert('http://example.com', 'abc')
+        self.storage.insert('http://example.org', 'xyz')
+        self.assertEqual(self.storage.find('abc'), 'http://example.com')
+        self.assertEqual(self.storage.find('xyz'), 'http://example.org')
+
+    def test_missing_key(self):
+        self.assertIsNone(self.storage.find('missing'))
+
+    def test_duplicate_key(self):
+        self.storage.insert('http://example.com', 'abc')
+        with self.assertRaises((KeyError, sqlite3.IntegrityError)):
+            self.storage.insert('http://example.org', 'abc')
+        self.assertEqual(self.storage.find('abc'), 'http://example.com')
+
+    def test_reserve(self):
+        self.assertEqual(self.storage.reserve(500), 500)
+        self.assertEqual(self.storage.reserve(10), 510)
+
+    def test_taken(self):
+        self.storage.insert('http://example.com', 'abc')
+        self.assertEqual(self.storage.taken(['abc', 'xyz']), {'abc'})
+
+    def test_reopen(self):
+        if not self.persistent:
+            self.skipTest('хранилище не сохраняет данные')
+        self.storage.insert('http://example.com', 'abc')
+        self.storage.reserve(500)
+        self.reopen()
+        self.assertEqual(self.storage.find('abc'), 'http://example.com')
+        self.assertIsNone(self.storage.find('missing'))
+        self.assertEqual(self.storage.reserve(10), 510)
+
+
+class SQLiteStorageTest(StorageTestMixin, unittest.TestCase):
+    engine = 'sqlite'
+    storage_class = SQLiteStorage
+
+    def test_wal_mode_is_stored_in_file(self):
+        self.storage.insert('http://example.com', 'abc')
+        self.storage.close()
+        path = Path(self.data_dir.name) / 'db.sqlite3'
+        conn = sqlite3.connect(path)
+        self.addCleanup(conn.close)
+        self.assertEqual(conn.execute('PRAGMA journal_mode').fetchone(),
+                         ('wal',))
+        self.assertEqual(conn.execute(
+            'SELECT url_original FROM url_shortener').fetchall(),
+            [('http://example.com',)])
+
+
+class MemoryStorageTest(StorageTestMixin, unittest.TestCase):
+    engine = 'memory'
+    storage_class = MemoryStorage
+    persistent = False
+
+
+class LogStorageTest(StorageTestMixin, unittest.TestCase):
+    engine = 'log'
+    storage_class = LogStorage
+
+    def test_replay_drops_torn_last_line(self):
+        self.storage.insert('http://example.com', 'abc')
+        self.storage.reserve(500)
+        self.storage.close()
+        path = Path(self.data_dir.name) / 'urls.log'
+        with open(path, 'a', encoding='utf-8') as log:
+            log.write('{"short": "xyz", "orig')
+        self.storage = self.open()
+        self.assertEqual(self.storage.find('abc'), 'http://example.com')
+        self.assertIsNone(self.storage.find('xyz'))
+        self.assertEqual(self.storage.reserve(10), 510)
+        self.storage.insert('http://example.org', 'new')
+        self.reopen()
+        self.assertEqual(self.storage.find('abc'), 'http://example.com')
+        self.assertEqual(self.storage.find('new'), 'http://example.org')
+        self.assertIsNone(self.storage.find('xyz'))
+        self.assertEqual(self.storage.reserve(10), 520)
+
+
+class OpenStorageTest(unittest.TestCase):
+    def test_unknown_engine(self):
+        with self.assertRaises(ValueError):
+            open_storage('redis', tempfile.gettempdir())
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -3,6 +3,10 @@ ASGI config for short_url_project project.
 
 It exposes the ASGI callable as a module-level variable named ``application``.
 
+Under ASGI the redirect path is served by the async url_handler_async view
+(see settings_asgi.py and urls_asgi.py), e.g.:
+    uvicorn short_url_project.asgi:application
+
 For more information on this file, see
 https://docs.djangoproject.com/en/3.2/howto/deployment/asgi/
 """
@@ -11,6 +15,12 @@ import os
 
 from django.core.asgi import get_asgi_application
 
-os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'short_url_project.settings')
+os.environ.setdefault('DJANGO_SETTINGS_MODULE',
+                      'short_url_project.settings_asgi')
 
 application = get_asgi_application()
+
+# Фильтр Блума по ключам ссылок строится в фоновом потоке, а не в запросе
+from shortener.views import link_filter  # noqa: E402
+
+link_filter.start()
@@ -11,6 +11,7 @@ https://docs.djangoproject.com/en/3.2/ref/settings/
 """
 
 from pathlib import Path
+from tempfile import gettempdir
 
 # Build paths inside the project like this: BASE_DIR / 'subdir'.
 BASE_DIR = Path(__file__).resolve().parent.parent
@@ -78,6 +79,10 @@ DATABASES = {
     'default': {
         'ENGINE': 'django.db.backends.sqlite3',
         'NAME': BASE_DIR / 'db.sqlite3',
+        # Тестовая база в файле: в общей базе в памяти параллельная запись
+        # из разных потоков (shortener.tests) не ждёт блокировку, а сразу
+        # получает ошибку "database table is locked"
+        'TEST': {'NAME': BASE_DIR / 'test_db.sqlite3'},
     }
 }
 
@@ -126,3 +131,58 @@ STATIC_URL = '/static/'
 DEFAULT_AUTO_FIELD = 'django.db.models.BigAutoField'
 
 LOGIN_REDIRECT_URL = '/'
+
+# Кеш для редиректов коротких ссылок
+# https://docs.djangoproject.com/en/3.2/topics/cache/
+
+CACHES = {
+    'default': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        'LOCATION': 'short-url-cache',
+    },
+    # Кеш, общий для всех процессов сервера на этой машине (для нескольких
+    # машин нужен Redis или Memcached)
+    'shared': {
+        'BACKEND': 'django.core.cache.backends.filebased.FileBasedCache',
+        'LOCATION': Path(gettempdir()) / 'short_url_project_cache',
+    },
+}
+
+# Максимальное количество ключей в LRU-кеше процесса и время жизни записи (с)
+SHORTENER_LRU_SIZE = 10000
+SHORTENER_LRU_TTL = 60
+# Алиас кеша Django и время жизни записи в нём (с)
+SHORTENER_CACHE_ALIAS = 'default'
+SHORTENER_CACHE_TIMEOUT = 3600
+# Счётчики редиректов сбрасываются в базу после накопления
+# SHORTENER_COUNTER_THRESHOLD переходов или раз в SHORTENER_COUNTER_INTERVAL с
+SHORTENER_COUNTER_THRESHOLD = 100
+SHORTENER_COUNTER_INTERVAL = 5
+# Кеш, общий для процессов, в котором команда flush_redirects оставляет
+# запрос сброса буферов, и как часто (с) процесс сервера его проверяет
+SHORTENER_FLUSH_CACHE = 'shared'
+SHORTENER_FLUSH_CHECK_INTERVAL = 1
+# Распределитель ключей коротких ссылок: random, sequence, block или pool
+# (см. shortener/keys.py), размер резервируемой пачки ключей и размер
+# пополнения пула ключей
+SHORTENER_KEY_ALLOCATOR = 'block'
+SHORTENER_KEY_BATCH_SIZE = 500
+SHORTENER_KEY_POOL_SIZE = 10000
+# Размер порции при массовом сокращении ссылок (bulk_create)
+SHORTENER_BULK_CHUNK_SIZE = 1000
+# Журнал событий переходов: включение и условия записи пачки в базу
+SHORTENER_CLICK_LOG = True
+SHORTENER_CLICK_LOG_THRESHOLD = 500
+SHORTENER_CLICK_LOG_INTERVAL = 5
+# Фильтр Блума по ключам ссылок: включение, доля ложноположительных ответов
+# и период перестроения фильтра фоновым потоком сервера (с). Версия
+# фильтра и журнал новых ссылок хранятся в кеше SHORTENER_BLOOM_CACHE:
+# он должен быть общим для процессов (файловый, Redis, Memcached), иначе
+# ключи, которых нет в фильтре процесса, проверяются по базе данных
+SHORTENER_BLOOM = True
+SHORTENER_BLOOM_CACHE = 'shared'
+SHORTENER_BLOOM_FP_RATE = 0.01
+SHORTENER_BLOOM_MAX_AGE = 600
+# Повторное сокращение того же URL тем же пользователем возвращает
+# существующую короткую ссылку
+SHORTENER_DEDUP = True
@@ -0,0 +1,8 @@
+"""
+Настройки для запуска под ASGI (short_url_project/asgi.py): совпадают
+с основными, но редиректы обслуживает асинхронный обработчик
+url_handler_async (см. short_url_project/urls_asgi.py).
+"""
+from short_url_project.settings import *  # noqa: F401,F403
+
+ROOT_URLCONF = 'short_url_project.urls_asgi'
@@ -16,7 +16,7 @@ Including another URLconf
 from django.contrib import admin
 from django.urls import path
 from shortener.views import handler, url_handler, create_user, logout_user, \
-    start
+    start, bulk_handler, link_stats
 import django.contrib.auth.views as auth_views
 
 urlpatterns = [
@@ -26,6 +26,8 @@ urlpatterns = [
          auth_views.LoginView.as_view(template_name='login.html')),
     path('logout', logout_user),
     path('shortener', handler),
+    path('shortener/bulk', bulk_handler),
+    path('stats/<url_key>', link_stats),
     path('<url_key>', url_handler),
     path('', start),
 ]
@@ -0,0 +1,16 @@
+"""short_url_project URL Configuration для ASGI
+
+Те же маршруты, что и в short_url_project/urls.py, но редирект по короткой
+ссылке обслуживает асинхронный обработчик url_handler_async. Остальные
+(синхронные) обработчики под ASGI выполняются Django в отдельном потоке.
+"""
+from django.urls import path
+
+from short_url_project.urls import urlpatterns as wsgi_urlpatterns
+from shortener.views import url_handler, url_handler_async
+
+urlpatterns = [
+    path('<url_key>', url_handler_async)
+    if getattr(pattern, 'callback', None) is url_handler else pattern
+    for pattern in wsgi_urlpatterns
+]
@@ -14,3 +14,8 @@ from django.core.wsgi import get_wsgi_application
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'short_url_project.settings')
 
 application = get_wsgi_application()
+
+# Фильтр Блума по ключам ссылок строится в фоновом потоке, а не в запросе
+from shortener.views import link_filter  # noqa: E402
+
+link_filter.start()
@@ -1,6 +1,17 @@
+import atexit
+
 from django.apps import AppConfig
 
 
 class ShortenerConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'shortener'
+
+    def ready(self):
+        # Подключение обработчиков сигналов (инвалидация кеша редиректов)
+        import shortener.signals  # noqa: F401
+        from shortener.views import click_log, redirect_counter
+        # Запись накопленных счётчиков редиректов и событий переходов
+        # при завершении процесса
+        atexit.register(redirect_counter.flush)
+        atexit.register(click_log.flush)
@@ -0,0 +1,47 @@
+from contextlib import contextmanager
+from time import perf_counter
+
+from django.db import connection
+from django.test.utils import setup_test_environment, \
+    teardown_test_environment
+
+
+@contextmanager
+def test_database():
+    """
+    Контекстный менеджер для бенчмарков: создаёт отдельную тестовую базу
+    данных (как при запуске manage.py test), чтобы не засорять рабочую
+    db.sqlite3, и удаляет её после завершения замеров. Также настраивается
+    тестовое окружение, чтобы можно было использовать тестовый клиент.
+    Перед удалением базы буферы счётчиков и событий переходов сбрасываются,
+    чтобы они не попали в рабочую базу при завершении процесса.
+    """
+    from shortener.views import click_log, redirect_counter
+
+    setup_test_environment()
+    old_name = connection.settings_dict['NAME']
+    test_settings = connection.settings_dict['TEST']
+    test_name = test_settings['NAME']
+    # Бенчмарки работают с базой в памяти, а не с файлом тестовой базы
+    # (TEST NAME): в файле каждая вставка в режиме autocommit
+    # синхронизируется с диском
+    test_settings['NAME'] = None
+    connection.creation.create_test_db(verbosity=0, autoclobber=True)
+    try:
+        yield connection
+    finally:
+        redirect_counter.flush()
+        click_log.flush()
+        connection.creation.destroy_test_db(old_name, verbosity=0)
+        test_settings['NAME'] = test_name
+        teardown_test_environment()
+
+
+def rate(func, count: int) -> float:
+    """
+    Вызывает func(i) count раз и возвращает количество вызовов в секунду.
+    """
+    start = perf_counter()
+    for i in range(count):
+        func(i)
+    return count / (perf_counter() - start)
@@ -0,0 +1,257 @@
+import logging
+from hashlib import blake2b
+from math import ceil, log
+from threading import Event, Lock, Thread
+from time import monotonic
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.core.cache import caches
+from django.core.cache.backends.dummy import DummyCache
+from django.core.cache.backends.locmem import LocMemCache
+from django.db import DatabaseError, connection
+
+logger = logging.getLogger('shortener.bloom')
+
+# Ключи общего кеша фильтра (SHORTENER_BLOOM_CACHE): версия фильтра
+# (увеличивается командой rebuild_bloom, после чего все процессы
+# перестраивают свои фильтры), номер последней созданной ссылки и ключ
+# ссылки с этим номером (журнал новых ссылок для других процессов)
+VERSION_KEY = 'shortener:bloom:version'
+SEQ_KEY = 'shortener:bloom:seq'
+ADDED_KEY = 'shortener:bloom:added:{}'
+# Наибольшее количество новых ссылок, которые процесс дочитывает
+# из журнала; при большем отставании фильтр перестраивается
+MAX_CATCH_UP = 1000
+
+
+class BloomFilter:
+    """
+    Фильтр Блума над строками. Отвечает на вопрос "может ли строка
+    присутствовать в множестве": ответ "нет" всегда точный, ответ "да"
+    ошибочен с вероятностью около fp_rate при количестве элементов
+    не более capacity. Позиции битов вычисляются двойным хешированием
+    по двум половинам дайджеста blake2b.
+    """
+
+    def __init__(self, capacity: int, fp_rate=0.01):
+        capacity = max(capacity, 1)
+        self.size = max(ceil(-capacity * log(fp_rate) / log(2) ** 2), 8)
+        self.hashes = max(round(self.size / capacity * log(2)), 1)
+        self.bits = bytearray((self.size + 7) // 8)
+        self.count = 0
+
+    def _positions(self, item: str):
+        digest = blake2b(item.encode(), digest_size=16).digest()
+        h1 = int.from_bytes(digest[:8], 'little')
+        h2 = int.from_bytes(digest[8:], 'little') | 1
+        return ((h1 + i * h2) % self.size for i in range(self.hashes))
+
+    def add(self, item: str):
+        for position in self._positions(item):
+            self.bits[position >> 3] |= 1 << (position & 7)
+        self.count += 1
+
+    def __contains__(self, item: str) -> bool:
+        return all(self.bits[position >> 3] & (1 << (position & 7))
+                   for position in self._positions(item))
+
+    @property
+    def memory(self) -> int:
+        """
+        Размер битового массива фильтра в байтах.
+        """
+        return len(self.bits)
+
+    def expected_fp_rate(self) -> float:
+        """
+        Теоретическая вероятность ложноположительного ответа при текущем
+        количестве элементов.
+        """
+        return (1 - (1 - 1 / self.size) ** (self.hashes * self.count)) \
+            ** self.hashes
+
+
+class LinkFilter:
+    """
+    Фильтр Блума над всеми ключами коротких ссылок текущего процесса.
+    Фильтр строится из базы данных (функция loader возвращает итератор
+    ключей) в фоновом потоке, который запускается при старте сервера
+    (start, см. wsgi.py и asgi.py) и перестраивает фильтр каждые
+    SHORTENER_BLOOM_MAX_AGE секунд или по запросу; обработка запросов
+    построения фильтра не ждёт. Пока фильтр не построен, все ключи
+    считаются возможными и ищутся в базе.
+    Ссылки, созданные другими процессами, попадают в журнал в общем
+    кеше SHORTENER_BLOOM_CACHE (publish): при отрицательном ответе фильтр
+    дочитывает журнал и перепроверяет ключ. Если кеш не общий для
+    процессов (LocMemCache, DummyCache), отрицательному ответу верить
+    нельзя, и ключ ищется в базе данных.
+    """
+
+    def __init__(self, loader, count_loader):
+        self.loader = loader
+        self.count_loader = count_loader
+        self.fp_rate = getattr(settings, 'SHORTENER_BLOOM_FP_RATE', 0.01)
+        self.max_age = getattr(settings, 'SHORTENER_BLOOM_MAX_AGE', 600)
+        self.filter = None
+        self.version = None
+        self.seq = 0
+        self.built_at = 0
+        self._lock = Lock()
+        self._build_lock = Lock()
+        self._wakeup = Event()
+        self._thread = None
+
+    @property
+    def enabled(self) -> bool:
+        return getattr(settings, 'SHORTENER_BLOOM', True)
+
+    @property
+    def shared(self):
+        return caches[getattr(settings, 'SHORTENER_BLOOM_CACHE', 'default')]
+
+    def is_shared(self) -> bool:
+        """
+        Возвращает True, если кеш фильтра виден всем процессам сервера.
+        """
+        return not isinstance(self.shared, (LocMemCache, DummyCache))
+
+    def shared_state(self):
+        """
+        Возвращает версию фильтра и номер последней созданной ссылки
+        из общего кеша.
+        """
+        state = self.shared.get_many([VERSION_KEY, SEQ_KEY])
+        return state.get(VERSION_KEY, 0), state.get(SEQ_KEY, 0)
+
+    def rebuild(self) -> BloomFilter:
+        """
+        Строит новый фильтр по всем ключам из базы данных и заменяет им
+        текущий. Запас ёмкости - вдвое больше текущего количества ссылок.
+        Состояние журнала читается до чтения ключей, поэтому ссылки,
+        созданные во время построения, будут дочитаны из журнала.
+        Построения выполняются по одному.
+        """
+        with self._build_lock:
+            version, seq = self.shared_state()
+            bloom = BloomFilter(2 * self.count_loader() + 1000, self.fp_rate)
+            for url_key in self.loader():
+                bloom.add(url_key)
+            with self._lock:
+                self.filter = bloom
+                self.version = version
+                self.seq = seq
+                self.built_at = monotonic()
+            return bloom
+
+    def request_rebuild(self):
+        """
+        Просит фоновый поток перестроить фильтр.
+        """
+        self._wakeup.set()
+
+    def run(self):
+        while True:
+            try:
+                self.rebuild()
+            except DatabaseError:
+                logger.exception('Ошибка построения фильтра Блума')
+            finally:
+                connection.close()
+            self._wakeup.wait(self.max_age)
+            self._wakeup.clear()
+
+    def start(self):
+        """
+        Запускает фоновый поток построения фильтра (один раз на процесс).
+        """
+        if not self.enabled or self._thread is not None:
+            return
+        self._thread = Thread(target=self.run, name='link-filter',
+                              daemon=True)
+        self._thread.start()
+
+    def publish(self, url_keys):
+        """
+        Добавляет ключи новых ссылок в фильтр процесса и в журнал в общем
+        кеше, откуда их прочитают фильтры других процессов.
+        """
+        url_keys = list(url_keys)
+        if not url_keys:
+            return
+        with self._lock:
+            if self.filter is not None:
+                for url_key in url_keys:
+                    self.filter.add(url_key)
+        shared = self.shared
+        shared.add(SEQ_KEY, 0, None)
+        last = shared.incr(SEQ_KEY, len(url_keys))
+        first = last - len(url_keys) + 1
+        shared.set_many({ADDED_KEY.format(first + number): url_key
+                         for number, url_key in enumerate(url_keys)},
+                        2 * self.max_age)
+
+    def catch_up(self, seq: int) -> bool:
+        """
+        Дочитывает из журнала ключи ссылок, созданных другими процессами
+        после построения фильтра, до номера seq.
+        :return: False, если журнал прочитать не удалось (записи ещё
+        не появились или уже истекли).
+        """
+        start = self.seq
+        # Номер меньше прочитанного - счётчик журнала вытеснен из кеша
+        if seq < start or seq - start > MAX_CATCH_UP:
+            self.request_rebuild()
+            return False
+        keys = [ADDED_KEY.format(number) for number in range(start + 1,
+                                                             seq + 1)]
+        added = self.shared.get_many(keys)
+        with self._lock:
+            if self.seq != start:
+                # Журнал уже дочитал другой поток
+                return self.seq >= seq
+            for key in keys:
+                if key not in added:
+                    return False
+                self.filter.add(added[key])
+                self.seq += 1
+        return True
+
+    def might_contain(self, url_key: str) -> bool:
+        """
+        Возвращает False, если ключа url_key точно нет в базе данных.
+        """
+        bloom = self.filter
+        if not self.enabled or bloom is None or url_key in bloom:
+            return True
+        if not self.is_shared():
+            return True
+        version, seq = self.shared_state()
+        if version != self.version or \
+                monotonic() - self.built_at > 2 * self.max_age:
+            self.request_rebuild()
+            return True
+        if seq != self.seq and not self.catch_up(seq):
+            return True
+        return url_key in self.filter
+
+    async def amight_contain(self, url_key: str) -> bool:
+        """
+        Асинхронный вариант might_contain: если фильтр построен и ключ в нём
+        есть, ответ даётся сразу; проверка журнала в общем кеше выполняется
+        в потоке через sync_to_async.
+        """
+        bloom = self.filter
+        if not self.enabled or bloom is None or url_key in bloom:
+            return True
+        return await sync_to_async(self.might_contain,
+                                   thread_sensitive=False)(url_key)
+
+    def invalidate(self):
+        """
+        Увеличивает версию фильтра в общем кеше, чтобы все процессы
+        перестроили свои фильтры при следующей проверке.
+        """
+        shared = self.shared
+        shared.add(VERSION_KEY, 0, None)
+        shared.incr(VERSION_KEY)
@@ -0,0 +1,98 @@
+import csv
+import json
+from itertools import islice
+
+from django.conf import settings
+
+
+def is_jsonl(content_type: str, file_name: str = '') -> bool:
+    """
+    Определяет формат входных данных: JSON Lines (по типу содержимого или
+    расширению файла .jsonl/.ndjson) или CSV (во всех остальных случаях).
+    """
+    return ('json' in content_type or
+            file_name.lower().endswith(('.jsonl', '.ndjson')))
+
+
+def text_lines(stream):
+    """
+    Построчно читает байтовый поток (загруженный файл или тело запроса)
+    и возвращает строки в кодировке UTF-8, не загружая поток в память целиком.
+    """
+    for line in stream:
+        yield line.decode('utf-8-sig')
+
+
+def read_csv(lines):
+    """
+    Генератор URL из CSV: берётся первая колонка каждой строки, пустые
+    строки и заголовок url пропускаются.
+    """
+    for row in csv.reader(lines):
+        if row and row[0].strip() and row[0].strip().lower() != 'url':
+            yield row[0]
+
+
+def read_jsonl(lines):
+    """
+    Генератор URL из JSON Lines: строка может быть объектом с ключом url
+    или просто строкой JSON. Некорректные строки, а также строки, в которых
+    URL - не строка (null, число, список), возвращаются как есть, чтобы
+    они попали в ответ как не прошедшие проверку.
+    """
+    for line in lines:
+        line = line.strip()
+        if not line:
+            continue
+        try:
+            value = json.loads(line)
+        except ValueError:
+            yield line
+            continue
+        if isinstance(value, dict):
+            value = value.get('url')
+        yield value if isinstance(value, str) else line
+
+
+def chunked(iterable, size: int):
+    """
+    Разбивает итерируемый объект на списки длиной не более size элементов.
+    """
+    iterator = iter(iterable)
+    while True:
+        chunk = list(islice(iterator, size))
+        if not chunk:
+            return
+        yield chunk
+
+
+class Echo:
+    """
+    Объект-заглушка с методом write, который возвращает записанную строку -
+    позволяет использовать csv.writer для построчной генерации ответа.
+    """
+
+    def write(self, value):
+        return value
+
+
+def shorten_stream(urls, create_links, jsonl=False, chunk_size=None):
+    """
+    Генератор строк ответа массового сокращения ссылок. URL читаются
+    порциями по chunk_size штук, для каждой порции вызывается
+    create_links(list) -> list ключей (None для URL, не прошедших проверку),
+    после чего отдаются пары (оригинальный URL, короткий URL) в формате
+    CSV или JSON Lines. В памяти одновременно находится только одна порция.
+    """
+    chunk_size = chunk_size or getattr(settings, 'SHORTENER_BULK_CHUNK_SIZE',
+                                       1000)
+    writer = csv.writer(Echo())
+    if not jsonl:
+        yield writer.writerow(['original', 'short'])
+    for chunk in chunked(urls, chunk_size):
+        for original, short in zip(chunk, create_links(chunk)):
+            if jsonl:
+                yield json.dumps({'original': original, 'short': short},
+                                 ensure_ascii=False) + '\n'
+            else:
+                yield writer.writerow([original, short or ''])
@@ -0,0 +1,189 @@
+from collections import OrderedDict
+from math import ceil
+from threading import Lock
+from time import monotonic
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.core.cache import caches
+from django.utils import timezone
+
+# Префикс ключей в кеше Django, чтобы не пересекаться с другими приложениями
+CACHE_PREFIX = 'shortener:url:'
+
+
+class LRUCache:
+    """
+    Простой потокобезопасный LRU-кеш с ограничением по количеству элементов
+    и временем жизни записи. При переполнении вытесняется запись, к которой
+    дольше всего не обращались. Время жизни нужно для того, чтобы кеши
+    в других процессах (воркерах) рано или поздно увидели удаление ссылки.
+    """
+
+    def __init__(self, max_size=1024, ttl=60):
+        self.max_size = max_size
+        self.ttl = ttl
+        self._data = OrderedDict()
+        self._lock = Lock()
+
+    def get(self, key):
+        """
+        Возвращает значение по ключу или None, если ключа нет либо
+        запись устарела. Найденная запись переносится в конец очереди.
+        """
+        with self._lock:
+            item = self._data.get(key)
+            if item is None:
+                return None
+            value, expires = item
+            if expires < monotonic():
+                del self._data[key]
+                return None
+            self._data.move_to_end(key)
+            return value
+
+    def set(self, key, value, ttl=None):
+        """
+        Сохраняет значение и при необходимости вытесняет самую старую запись.
+        Параметр ttl может только сократить время жизни записи.
+        """
+        ttl = self.ttl if ttl is None else min(ttl, self.ttl)
+        with self._lock:
+            self._data[key] = (value, monotonic() + ttl)
+            self._data.move_to_end(key)
+            while len(self._data) > self.max_size:
+                self._data.popitem(last=False)
+
+    def delete(self, key):
+        with self._lock:
+            self._data.pop(key, None)
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+
+    def __len__(self):
+        return len(self._data)
+
+
+class RedirectCache:
+    """
+    Read-through кеш для соответствия ключ короткого URL -> оригинальный URL.
+    Первый уровень - LRU в памяти процесса, второй - кеш Django (настройка
+    SHORTENER_CACHE_ALIAS). Если ключ не найден ни на одном уровне,
+    вызывается функция loader (поиск в базе данных), и найденный результат
+    сохраняется на обоих уровнях. Отсутствующие ключи не кешируются.
+    Функция loader возвращает пару (оригинальный URL, срок действия ссылки
+    или None) либо None; в кеше хранится эта же пара, и запись с истёкшим
+    сроком считается отсутствующей ссылкой. Записи ссылок с ограниченным
+    сроком хранятся в кеше не дольше, чем до его истечения.
+    """
+
+    def __init__(self, loader, max_size=None, ttl=None, alias=None):
+        self.loader = loader
+        self.local = LRUCache(
+            max_size or getattr(settings, 'SHORTENER_LRU_SIZE', 1024),
+            ttl or getattr(settings, 'SHORTENER_LRU_TTL', 60))
+        self.alias = alias or getattr(settings, 'SHORTENER_CACHE_ALIAS',
+                                      'default')
+        self.timeout = getattr(settings, 'SHORTENER_CACHE_TIMEOUT', 3600)
+
+    @property
+    def shared(self):
+        return caches[self.alias]
+
+    def lifetime(self, expires_at) -> int:
+        """
+        Возвращает время хранения записи в кеше (с): не больше timeout и не
+        дольше, чем до истечения срока ссылки expires_at (0 - срок истёк).
+        """
+        if expires_at is None:
+            return self.timeout
+        left = ceil((expires_at - timezone.now()).total_seconds())
+        return max(min(left, self.timeout), 0)
+
+    @staticmethod
+    def resolve(entry):
+        """
+        Возвращает оригинальный URL из записи кеша или False, если срок
+        действия ссылки истёк.
+        """
+        url_original, expires_at = entry
+        if expires_at is not None and expires_at <= timezone.now():
+            return False
+        return url_original
+
+    def get(self, url_key: str):
+        """
+        Возвращает оригинальный URL для ключа или False, если ключ не найден
+        или срок действия ссылки истёк.
+        """
+        entry = self.local.get(url_key)
+        if entry is None:
+            entry = self.shared.get(CACHE_PREFIX + url_key)
+            if entry is None:
+                entry = self.loader(url_key)
+                if not entry:
+                    return False
+                self.shared.set(CACHE_PREFIX + url_key, tuple(entry),
+                                self.lifetime(entry[1]))
+            self.local.set(url_key, tuple(entry), self.lifetime(entry[1]))
+        return self.resolve(entry)
+
+    async def aget(self, url_key: str):
+        """
+        Асинхронный вариант get: попадание в LRU процесса обслуживается
+        без переключения потоков, обращения к кешу Django и базе данных
+        выполняются в потоке пула через sync_to_async.
+        """
+        entry = self.local.get(url_key)
+        if entry is not None:
+            return self.resolve(entry)
+        return await sync_to_async(self.get, thread_sensitive=False)(url_key)
+
+    def cached(self, url_key: str) -> bool:
+        """
+        Проверяет наличие ключа в кеше (на любом уровне) без обращения
+        к базе данных.
+        """
+        return (self.local.get(url_key) is not None or
+                self.shared.get(CACHE_PREFIX + url_key) is not None)
+
+    def prime(self, links: dict, expires_at=None):
+        """
+        Заранее помещает в кеш соответствия ключ -> оригинальный URL
+        (например, только что созданных ссылок) с общим сроком действия
+        expires_at.
+        """
+        lifetime = self.lifetime(expires_at)
+        for url_key, url_original in links.items():
+            self.local.set(url_key, (url_original, expires_at), lifetime)
+        self.shared.set_many({CACHE_PREFIX + url_key: (url_original,
+                                                       expires_at)
+                              for url_key, url_original in links.items()},
+                             lifetime)
+
+    def invalidate(self, url_key: str):
+        """
+        Удаляет ключ из обоих уровней кеша. Вызывается при создании
+        и удалении ссылки.
+        """
+        self.local.delete(url_key)
+        self.shared.delete(CACHE_PREFIX + url_key)
+
+    def invalidate_many(self, url_keys: list):
+        """
+        Удаляет из обоих уровней кеша несколько ключей (одним запросом
+        к кешу Django).
+        """
+        for url_key in url_keys:
+            self.local.delete(url_key)
+        self.shared.delete_many([CACHE_PREFIX + url_key
+                                 for url_key in url_keys])
+
+    def clear_local(self):
+        """
+        Очищает только LRU текущего процесса (используется в тестах
+        и бенчмарке для "холодного" старта).
+        """
+        self.local.clear()
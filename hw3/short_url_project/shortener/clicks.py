@@ -0,0 +1,132 @@
+from collections import Counter
+from threading import Lock
+from time import monotonic
+from urllib.parse import urlsplit
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Count, F, Max
+from django.db.models.functions import TruncHour
+from django.utils import timezone
+
+from shortener.counters import FlushRequest
+from shortener.models import ClickDaily, ClickEvent, ClickHourly, KeyCounter
+
+# Имя счётчика KeyCounter, в котором хранится id последнего свёрнутого события
+ROLLUP_WATERMARK = 'click_rollup'
+
+
+def referrer_host(request) -> str:
+    """
+    Возвращает имя хоста из заголовка Referer запроса (или пустую строку).
+    """
+    referrer = request.META.get('HTTP_REFERER', '')
+    try:
+        return (urlsplit(referrer).hostname or '')[:255]
+    except ValueError:
+        return ''
+
+
+class ClickLog:
+    """
+    Буфер событий переходов. Запрос только добавляет событие в список
+    в памяти; в базу события записываются одним bulk_create, когда
+    накоплено threshold событий или с предыдущей записи прошло больше
+    interval секунд, по запросу команды flush_redirects (FlushRequest),
+    а также при завершении процесса. Если запись не удалась, события
+    возвращаются в буфер.
+    """
+
+    def __init__(self, threshold=None, interval=None):
+        self.threshold = threshold or getattr(
+            settings, 'SHORTENER_CLICK_LOG_THRESHOLD', 500)
+        self.interval = interval or getattr(
+            settings, 'SHORTENER_CLICK_LOG_INTERVAL', 5)
+        self._events = []
+        self._last_flush = monotonic()
+        self._lock = Lock()
+        self.flush_request = FlushRequest()
+
+    @property
+    def enabled(self) -> bool:
+        return getattr(settings, 'SHORTENER_CLICK_LOG', True)
+
+    def add(self, url_key: str, request, flush=True) -> bool:
+        """
+        Добавляет в буфер событие перехода по ключу url_key. Параметр flush
+        и возвращаемое значение - как у RedirectCounter.incr.
+        """
+        if not self.enabled:
+            return False
+        event = ClickEvent(url_short=url_key, created_at=timezone.now(),
+                           referrer_host=referrer_host(request))
+        with self._lock:
+            self._events.append(event)
+            due = (len(self._events) >= self.threshold or
+                   monotonic() - self._last_flush >= self.interval)
+        due = self.flush_request.due() or due
+        if due and flush:
+            self.flush()
+        return due
+
+    def pending(self) -> int:
+        return len(self._events)
+
+    def flush(self) -> int:
+        """
+        Записывает накопленные события в базу данных. Возвращает количество
+        записанных событий.
+        """
+        with self._lock:
+            events, self._events = self._events, []
+            self._last_flush = monotonic()
+        if not events:
+            return 0
+        try:
+            ClickEvent.objects.bulk_create(events, batch_size=500)
+        except Exception:
+            with self._lock:
+                self._events[:0] = events
+            raise
+        return len(events)
+
+
+def rollup_clicks(batch_size=10000) -> int:
+    """
+    Сворачивает новые события переходов (с id больше сохранённого в счётчике
+    ROLLUP_WATERMARK) в почасовые и посуточные суммы ClickHourly
+    и ClickDaily. События обрабатываются пачками по batch_size штук, каждая
+    пачка - в отдельной транзакции вместе со сдвигом отметки, поэтому
+    повторный запуск не учитывает события дважды. Возвращает количество
+    обработанных событий.
+    """
+    last_id = ClickEvent.objects.aggregate(last=Max('id'))['last'] or 0
+    KeyCounter.objects.get_or_create(name=ROLLUP_WATERMARK)
+    processed = 0
+    while True:
+        with transaction.atomic():
+            watermark = KeyCounter.objects.get(name=ROLLUP_WATERMARK).value
+            if watermark >= last_id:
+                return processed
+            upper = min(watermark + batch_size, last_id)
+            rows = (ClickEvent.objects
+                    .filter(id__gt=watermark, id__lte=upper)
+                    .annotate(hour=TruncHour('created_at'))
+                    .values('url_short', 'hour')
+                    .annotate(n=Count('id')))
+            hourly, daily = Counter(), Counter()
+            for row in rows:
+                hourly[row['url_short'], row['hour']] += row['n']
+                daily[row['url_short'], row['hour'].date()] += row['n']
+            for model, field, counts in ((ClickHourly, 'hour', hourly),
+                                         (ClickDaily, 'day', daily)):
+                for (url_key, period), n in counts.items():
+                    updated = model.objects.filter(
+                        url_short=url_key, **{field: period}).update(
+                        count=F('count') + n)
+                    if not updated:
+                        model.objects.create(url_short=url_key, count=n,
+                                             **{field: period})
+            processed += sum(hourly.values())
+            KeyCounter.objects.filter(name=ROLLUP_WATERMARK).update(
+                value=upper)
@@ -0,0 +1,152 @@
+from collections import Counter, defaultdict
+from threading import Lock
+from time import monotonic
+
+from django.conf import settings
+from django.core.cache import caches
+from django.core.cache.backends.dummy import DummyCache
+from django.core.cache.backends.locmem import LocMemCache
+from django.db import transaction
+from django.db.models import F
+from django.db.models.functions import Coalesce
+
+# Максимальное количество ключей в одном UPDATE (ограничение SQLite
+# на количество параметров запроса)
+BATCH_SIZE = 500
+# Ключ общего кеша с номером последнего запроса сброса буферов
+# (увеличивается командой flush_redirects)
+FLUSH_REQUEST_KEY = 'shortener:flush_request'
+
+
+class FlushRequest:
+    """
+    Запрос принудительного сброса буфера из другого процесса. Команда
+    flush_redirects увеличивает номер запроса в общем кеше
+    SHORTENER_FLUSH_CACHE (request), а буфер процесса сервера при очередном
+    переходе, не чаще раза в SHORTENER_FLUSH_CHECK_INTERVAL секунд,
+    сравнивает его с последним увиденным номером (due). Пока процесс
+    не получает переходов, его буфер не сбрасывается.
+    """
+
+    def __init__(self, check_interval=None):
+        self.check_interval = getattr(
+            settings, 'SHORTENER_FLUSH_CHECK_INTERVAL', 1) \
+            if check_interval is None else check_interval
+        self._seen = None
+        self._checked_at = None
+        self._lock = Lock()
+
+    @property
+    def shared(self):
+        return caches[getattr(settings, 'SHORTENER_FLUSH_CACHE', 'default')]
+
+    def is_shared(self) -> bool:
+        """
+        Возвращает True, если запрос виден всем процессам сервера.
+        """
+        return not isinstance(self.shared, (LocMemCache, DummyCache))
+
+    def request(self) -> int:
+        """
+        Просит все процессы сбросить буферы. Возвращает номер запроса.
+        """
+        shared = self.shared
+        shared.add(FLUSH_REQUEST_KEY, 0, None)
+        return shared.incr(FLUSH_REQUEST_KEY)
+
+    def due(self) -> bool:
+        """
+        Возвращает True, если с прошлой проверки появился новый запрос
+        сброса. Запросы, сделанные до первой проверки, процесс
+        не касаются: его буфер тогда ещё был пуст.
+        """
+        now = monotonic()
+        with self._lock:
+            if self._checked_at is not None and \
+                    now - self._checked_at < self.check_interval:
+                return False
+            self._checked_at = now
+        number = self.shared.get(FLUSH_REQUEST_KEY, 0)
+        with self._lock:
+            seen, self._seen = self._seen, number
+        return seen is not None and number != seen
+
+
+
+class RedirectCounter:
+    """
+    Буфер счётчиков редиректов. Вместо записи строки в базу на каждый
+    переход, увеличения накапливаются в памяти процесса и периодически
+    сбрасываются пачкой UPDATE ... SET redirect_count = redirect_count + n.
+    Сброс происходит, когда накоплено threshold переходов или с момента
+    предыдущего сброса прошло больше interval секунд (проверяется при
+    очередном переходе), по запросу команды flush_redirects
+    (FlushRequest), а также при завершении процесса. Если запись в базу
+    не удалась, счётчики возвращаются в буфер, так что переходы
+    не теряются.
+    """
+
+    def __init__(self, model, threshold=None, interval=None):
+        self.model = model
+        self.threshold = threshold or getattr(
+            settings, 'SHORTENER_COUNTER_THRESHOLD', 100)
+        self.interval = interval or getattr(
+            settings, 'SHORTENER_COUNTER_INTERVAL', 5)
+        self._buffer = Counter()
+        self._pending = 0
+        self._last_flush = monotonic()
+        self._lock = Lock()
+        self.flush_request = FlushRequest()
+
+    def incr(self, url_key: str, n: int = 1, flush=True) -> bool:
+        """
+        Учитывает n переходов по ключу url_key и при необходимости
+        сбрасывает буфер в базу данных. С flush=False только возвращает
+        признак того, что буфер пора сбросить (для асинхронного кода,
+        который выполняет сброс отложенно).
+        """
+        with self._lock:
+            self._buffer[url_key] += n
+            self._pending += n
+            due = (self._pending >= self.threshold or
+                   monotonic() - self._last_flush >= self.interval)
+        due = self.flush_request.due() or due
+        if due and flush:
+            self.flush()
+        return due
+
+    def pending(self) -> int:
+        """
+        Возвращает количество переходов, ещё не записанных в базу.
+        """
+        return self._pending
+
+    def flush(self) -> int:
+        """
+        Записывает накопленные счётчики в базу данных. Ключи с одинаковым
+        приращением обновляются одним запросом. Возвращает количество
+        записанных переходов.
+        """
+        with self._lock:
+            buffer, self._buffer = self._buffer, Counter()
+            self._pending = 0
+            self._last_flush = monotonic()
+        if not buffer:
+            return 0
+        by_increment = defaultdict(list)
+        for url_key, n in buffer.items():
+            by_increment[n].append(url_key)
+        try:
+            with transaction.atomic():
+                for n, url_keys in by_increment.items():
+                    count = Coalesce(F('redirect_count'), 0) + n
+                    for i in range(0, len(url_keys), BATCH_SIZE):
+                        batch = url_keys[i:i + BATCH_SIZE]
+                        self.model.objects.filter(
+                            url_short__in=batch).update(redirect_count=count)
+        except Exception:
+            with self._lock:
+                self._buffer.update(buffer)
+                self._pending += sum(buffer.values())
+            raise
+        return sum(buffer.values())
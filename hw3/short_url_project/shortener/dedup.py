@@ -0,0 +1,48 @@
+from hashlib import sha256
+from urllib.parse import urlsplit, urlunsplit
+
+# Порты по умолчанию для допустимых схем - при нормализации убираются
+DEFAULT_PORTS = {'http': 80, 'https': 443, 'ftp': 21}
+
+
+def normalize_url(url: str) -> str:
+    """
+    Функция приводит URL к каноническому виду для поиска дубликатов:
+    схема и хост - в нижнем регистре, порт по умолчанию для схемы убирается,
+    пустой путь заменяется на "/", завершающий "/" у непустого пути
+    отбрасывается, пустые query и фрагмент убираются. Регистр пути
+    и параметров запроса сохраняется.
+    :param url: Исходный URL.
+    :return: Нормализованный URL.
+    """
+    parts = urlsplit(url.strip())
+    scheme = parts.scheme.lower()
+    host = (parts.hostname or '').rstrip('.')
+    if ':' in host:  # IPv6
+        host = f'[{host}]'
+    try:
+        port = parts.port
+    except ValueError:
+        port = None
+    netloc = host
+    if port is not None and port != DEFAULT_PORTS.get(scheme):
+        netloc = f'{host}:{port}'
+    if parts.username or parts.password:
+        userinfo = parts.username or ''
+        if parts.password:
+            userinfo = f'{userinfo}:{parts.password}'
+        netloc = f'{userinfo}@{netloc}'
+    path = parts.path or '/'
+    if len(path) > 1:
+        path = path.rstrip('/') or '/'
+    return urlunsplit((scheme, netloc, path, parts.query, parts.fragment))
+
+
+def url_hash(url: str) -> str:
+    """
+    Функция возвращает SHA-256 (64 шестнадцатеричных символа)
+    от нормализованного URL.
+    :param url: Исходный URL.
+    :return: Хеш нормализованного URL.
+    """
+    return sha256(normalize_url(url).encode()).hexdigest()
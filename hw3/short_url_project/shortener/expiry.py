@@ -0,0 +1,34 @@
+from django.db import connection, transaction
+from django.utils import timezone
+
+from shortener.models import UrlShortener
+
+
+def purge_expired(redirect_cache, batch_size=1000) -> int:
+    """
+    Удаляет ссылки, срок действия которых истёк к моменту запуска, пачками
+    по batch_size строк. Пачка выбирается по индексу на expires_at
+    (от самых старых) и удаляется по первичному ключу в отдельной короткой
+    транзакции, поэтому таблица не блокируется надолго; затем ключи пачки
+    удаляются из кеша редиректов redirect_cache. Фильтр Блума не
+    перестраивается: удалённые ключи дают в нём только ложноположительные
+    ответы, которые отсеиваются кешем и базой данных, и исчезают при
+    очередном перестроении фильтра. Возвращает количество удалённых ссылок.
+    """
+    now = timezone.now()
+    query = f'DELETE FROM {UrlShortener._meta.db_table} WHERE id IN (%s)'
+    deleted = 0
+    while True:
+        with transaction.atomic():
+            batch = list(UrlShortener.objects.filter(expires_at__lte=now)
+                         .order_by('expires_at')
+                         .values_list('id', 'url_short')[:batch_size])
+            if not batch:
+                return deleted
+            # Удаление без сигналов post_delete: кеш сбрасывается одним
+            # запросом на всю пачку
+            with connection.cursor() as cur:
+                cur.execute(query % ', '.join(['%s'] * len(batch)),
+                            [link_id for link_id, _ in batch])
+        redirect_cache.invalidate_many([url_key for _, url_key in batch])
+        deleted += len(batch)
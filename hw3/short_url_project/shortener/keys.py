@@ -0,0 +1,198 @@
+from random import choice, randrange
+from string import ascii_letters, digits
+from threading import Lock
+from uuid import uuid4
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import F
+
+from shortener.models import KeyCounter, KeyPool, UrlShortener
+
+# Алфавит ключей коротких ссылок (62 символа)
+ALPHABET = digits + ascii_letters
+
+
+def base62_encode(number: int) -> str:
+    """
+    Функция кодирует неотрицательное целое число строкой из символов
+    ALPHABET (цифры, строчные и прописные латинские буквы).
+    :param number: Кодируемое число.
+    :return: Строка в кодировке base62.
+    """
+    if number < 0:
+        raise ValueError('Число должно быть неотрицательным')
+    if number == 0:
+        return ALPHABET[0]
+    chars = []
+    while number:
+        number, rest = divmod(number, 62)
+        chars.append(ALPHABET[rest])
+    return ''.join(reversed(chars))
+
+
+def taken_keys(url_keys) -> set:
+    """
+    Возвращает множество ключей из url_keys, которые уже заняты в таблице
+    коротких ссылок (один запрос на каждые 500 ключей).
+    """
+    url_keys = list(url_keys)
+    taken = set()
+    for i in range(0, len(url_keys), 500):
+        taken.update(UrlShortener.objects
+                     .filter(url_short__in=url_keys[i:i + 500])
+                     .values_list('url_short', flat=True))
+    return taken
+
+
+class KeyAllocator:
+    """
+    Базовый класс распределителя ключей коротких ссылок. Распределитель
+    выдаёт заведомо свободные ключи, поэтому создание ссылки требует только
+    одного INSERT, без поиска ключа в базе. Ключи выдаются из локального
+    буфера, который пополняется пачкой методом refill().
+    """
+
+    def __init__(self, batch_size=None):
+        self.batch_size = batch_size or getattr(
+            settings, 'SHORTENER_KEY_BATCH_SIZE', 500)
+        self._keys = []
+        self._lock = Lock()
+
+    def refill(self) -> list:
+        raise NotImplementedError
+
+    def allocate(self) -> str:
+        """
+        Возвращает свободный ключ для новой короткой ссылки.
+        """
+        with self._lock:
+            while not self._keys:
+                self._keys = self.refill()[::-1]
+            return self._keys.pop()
+
+    def allocate_many(self, count: int) -> list:
+        """
+        Возвращает список из count свободных ключей.
+        """
+        return [self.allocate() for _ in range(count)]
+
+
+class RandomAllocator(KeyAllocator):
+    """
+    Случайные ключи длиной от min_ до max_ - 1 символов, как в исходной
+    функции random_url. Кандидаты генерируются пачкой и проверяются
+    на занятость одним запросом на всю пачку.
+    """
+
+    def __init__(self, min_=5, max_=8, **kwargs):
+        super().__init__(**kwargs)
+        self.min_, self.max_ = min_, max_
+
+    def refill(self) -> list:
+        candidates = {''.join(choice(ALPHABET)
+                              for _ in range(randrange(self.min_, self.max_)))
+                      for _ in range(self.batch_size)}
+        return sorted(candidates - taken_keys(candidates))
+
+
+class BlockAllocator(KeyAllocator):
+    """
+    Ключи - base62-представление значений счётчика KeyCounter. Процесс
+    резервирует сразу блок из batch_size значений одним UPDATE, поэтому
+    воркеры не конкурируют за счётчик на каждой ссылке. При batch_size=1
+    получается обычная последовательность. Ключи блока, совпавшие с уже
+    существующими (например, случайными ключами старых ссылок),
+    отбрасываются.
+    """
+
+    def __init__(self, name='url_short', **kwargs):
+        super().__init__(**kwargs)
+        self.name = name
+
+    def reserve(self) -> range:
+        """
+        Резервирует блок значений счётчика и возвращает его как range.
+        """
+        with transaction.atomic():
+            KeyCounter.objects.get_or_create(name=self.name)
+            KeyCounter.objects.filter(name=self.name).update(
+                value=F('value') + self.batch_size)
+            end = KeyCounter.objects.get(name=self.name).value
+        return range(end - self.batch_size, end)
+
+    def refill(self) -> list:
+        keys = [base62_encode(number) for number in self.reserve()]
+        taken = taken_keys(keys)
+        return [key for key in keys if key not in taken]
+
+
+class SequenceAllocator(BlockAllocator):
+    """
+    Ключ - base62-представление очередного значения счётчика
+    (блок размером в одно значение).
+    """
+
+    def __init__(self, **kwargs):
+        kwargs['batch_size'] = 1
+        super().__init__(**kwargs)
+
+
+class PoolAllocator(KeyAllocator):
+    """
+    Ключи берутся из заранее сгенерированного пула (таблица KeyPool).
+    Процесс помечает сразу batch_size ключей своей меткой одним UPDATE
+    (поэтому два процесса не получат один и тот же ключ), затем забирает
+    и удаляет их. Когда пул пуст, он пополняется пачкой случайных ключей
+    через bulk_create (pool_size ключей за раз).
+    """
+
+    def __init__(self, pool_size=None, **kwargs):
+        super().__init__(**kwargs)
+        self.pool_size = pool_size or getattr(
+            settings, 'SHORTENER_KEY_POOL_SIZE', 10000)
+        self.generator = RandomAllocator(batch_size=self.pool_size)
+
+    def fill_pool(self) -> int:
+        """
+        Пополняет пул свободными случайными ключами. Возвращает количество
+        добавленных ключей.
+        """
+        keys = self.generator.refill()
+        KeyPool.objects.bulk_create((KeyPool(key=key) for key in keys),
+                                    batch_size=500, ignore_conflicts=True)
+        return len(keys)
+
+    def refill(self) -> list:
+        claim = uuid4().hex
+        free = KeyPool.objects.filter(claim__isnull=True).values('pk')
+        with transaction.atomic():
+            claimed = KeyPool.objects.filter(
+                pk__in=free[:self.batch_size]).update(claim=claim)
+            if not claimed:
+                self.fill_pool()
+                return []
+            keys = list(KeyPool.objects.filter(claim=claim)
+                        .values_list('key', flat=True))
+            KeyPool.objects.filter(claim=claim).delete()
+        return keys
+
+
+ALLOCATORS = {
+    'random': RandomAllocator,
+    'sequence': SequenceAllocator,
+    'block': BlockAllocator,
+    'pool': PoolAllocator,
+}
+
+
+def get_allocator(name=None) -> KeyAllocator:
+    """
+    Создаёт распределитель ключей по имени (по умолчанию - из настройки
+    SHORTENER_KEY_ALLOCATOR).
+    """
+    name = name or getattr(settings, 'SHORTENER_KEY_ALLOCATOR', 'block')
+    try:
+        return ALLOCATORS[name]()
+    except KeyError:
+        raise ValueError(f'Неизвестный распределитель ключей: {name}')
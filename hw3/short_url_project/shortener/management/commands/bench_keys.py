@@ -0,0 +1,91 @@
+from random import randrange
+from time import perf_counter
+
+from django.core.management.base import BaseCommand
+from django.db import connection
+
+from shortener.bench import test_database
+from shortener.keys import ALLOCATORS, RandomAllocator, base62_encode
+from shortener.models import UrlShortener
+
+# Ключи длиной 5-7 символов - числа от KEY_BASE до KEY_BASE + KEY_SPACE
+# в base62; KEY_STEP взаимно прост с KEY_SPACE, поэтому умножение на него
+# по модулю KEY_SPACE переставляет числа без повторов
+KEY_BASE = 62 ** 4
+KEY_SPACE = 62 ** 7 - KEY_BASE
+KEY_STEP = 1000003
+
+
+def legacy_key(number: int) -> str:
+    """
+    Переводит число в ключ длиной 5-7 символов, разным числам
+    (по модулю KEY_SPACE) соответствуют разные ключи.
+    """
+    return base62_encode(KEY_BASE + number * KEY_STEP % KEY_SPACE)
+
+
+def seed_links(start: int, stop: int, chunk=50000):
+    """
+    Добавляет в таблицу ссылок stop - start записей с ключами длиной
+    5-7 символов, как у ссылок, созданных исходной функцией random_url.
+    Номер записи со случайным сдвигом переводится в ключ взаимно
+    однозначно (legacy_key), поэтому ключи одной пачки не повторяются;
+    совпадения с уже существующими ключами пропускаются
+    (INSERT OR IGNORE), и вместо них добавляются записи с новым сдвигом.
+    Вставка выполняется пачками через executemany, минуя ORM.
+    """
+    query = 'INSERT OR IGNORE INTO shortener_urlshortener ' \
+            '(url_original, url_short, redirect_count, url_hash) ' \
+            "VALUES (%s, %s, 0, '')"
+    with connection.cursor() as cur:
+        for offset in range(start, stop, chunk):
+            count = min(offset + chunk, stop) - offset
+            while count:
+                salt = randrange(KEY_SPACE)
+                cur.executemany(query, [
+                    (f'http://example.com/{i}', legacy_key(salt + i))
+                    for i in range(offset, offset + count)])
+                count -= cur.rowcount
+
+
+# Для сравнения: исходная схема random_url - проверка каждого ключа
+# отдельным запросом
+BENCH_ALLOCATORS = dict(ALLOCATORS,
+                        legacy=lambda: RandomAllocator(batch_size=1))
+
+
+class Command(BaseCommand):
+    help = 'Измеряет скорость создания коротких ссылок разными ' \
+           'распределителями ключей при заданном количестве существующих ' \
+           'ссылок (на временной тестовой базе данных).'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--sizes', default='10000,1000000,10000000',
+                            help='Количество существующих ссылок через '
+                                 'запятую.')
+        parser.add_argument('--links', type=int, default=1000,
+                            help='Количество создаваемых ссылок в замере.')
+        parser.add_argument('--allocators', default=','.join(BENCH_ALLOCATORS),
+                            help='Распределители ключей через запятую.')
+
+    def handle(self, *args, **options):
+        sizes = sorted(int(size) for size in options['sizes'].split(','))
+        names = options['allocators'].split(',')
+        links = options['links']
+        with test_database():
+            existing = 0
+            for size in sizes:
+                seed_links(existing, size)
+                existing = size
+                for name in names:
+                    allocator = BENCH_ALLOCATORS[name]()
+                    start = perf_counter()
+                    for i in range(links):
+                        UrlShortener.objects.create(
+                            url_original=f'http://example.org/{i}',
+                            url_short=allocator.allocate())
+                    elapsed = perf_counter() - start
+                    existing += links
+                    self.stdout.write(
+                        f'{size:>10} ссылок  {name:<9} '
+                        f'{links / elapsed:>8.0f} ссылок/с')
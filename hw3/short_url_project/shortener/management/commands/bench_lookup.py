@@ -0,0 +1,76 @@
+from random import randrange, seed
+from time import perf_counter
+
+from django.core.cache import cache
+from django.core.management.base import BaseCommand
+from django.db import connection
+from django.test import RequestFactory
+
+from shortener.bench import test_database
+from shortener.keys import base62_encode
+from shortener.views import find_link, link_filter, redirect_cache, \
+    url_handler
+
+
+def find_url_unindexed(url_key: str):
+    """
+    Поиск в том виде, как он был до добавления индекса: SELECT * с полным
+    просмотром таблицы (NOT INDEXED запрещает SQLite использовать индекс).
+    Срок действия ссылок не проверяется.
+    """
+    with connection.cursor() as cur:
+        query = 'SELECT * FROM shortener_urlshortener NOT INDEXED ' \
+                'WHERE url_short = %s'
+        cur.execute(query, [url_key])
+        record = cur.fetchone()
+    return (record[1], None) if record else None
+
+
+class Command(BaseCommand):
+    help = 'Сравнивает задержку редиректа с полным просмотром таблицы и ' \
+           'с поиском по уникальному индексу url_short (на временной ' \
+           'тестовой базе данных, кеш редиректов не используется).'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--rows', type=int, default=1000000,
+                            help='Количество ссылок в таблице.')
+        parser.add_argument('--requests', type=int, default=200,
+                            help='Количество редиректов в каждом замере.')
+        parser.add_argument('--seed', type=int, default=0,
+                            help='Зерно генератора случайных ключей '
+                                 'для запросов.')
+
+    def handle(self, *args, **options):
+        rows, requests = options['rows'], options['requests']
+        query = 'INSERT INTO shortener_urlshortener ' \
+                '(url_original, url_short, redirect_count, url_hash) ' \
+                "VALUES (%s, %s, 0, '')"
+        factory = RequestFactory()
+        with test_database():
+            with connection.cursor() as cur:
+                for offset in range(0, rows, 50000):
+                    cur.executemany(query, [
+                        (f'http://example.com/{i}',
+                         base62_encode(i))
+                        for i in range(offset, min(offset + 50000, rows))])
+            seed(options['seed'])
+            keys = [base62_encode(randrange(rows))
+                    for _ in range(requests)]
+            # Фильтр Блума строится до замеров, иначе его построение
+            # по всей таблице попало бы в задержку первого редиректа
+            link_filter.rebuild()
+            loader = redirect_cache.loader
+            try:
+                for name, lookup in (('без индекса', find_url_unindexed),
+                                     ('по индексу', find_link)):
+                    redirect_cache.loader = lookup
+                    start = perf_counter()
+                    for url_key in keys:
+                        cache.clear()
+                        redirect_cache.clear_local()
+                        url_handler(factory.get('/' + url_key), url_key)
+                    latency = (perf_counter() - start) / requests * 1000
+                    self.stdout.write(f'{rows} ссылок, {name}: '
+                                      f'{latency:.3f} мс на редирект')
+            finally:
+                redirect_cache.loader = loader
@@ -0,0 +1,45 @@
+from django.core.management.base import BaseCommand
+from django.test import Client, override_settings
+
+from shortener.bench import rate, test_database
+from shortener.models import UrlShortener
+from shortener.views import redirect_cache
+
+
+class Command(BaseCommand):
+    help = 'Измеряет количество редиректов в секунду с холодным и прогретым ' \
+           'кешем редиректов, а также с выключенным и включённым журналом ' \
+           'событий переходов (на временной тестовой базе данных).'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--links', type=int, default=1000,
+                            help='Количество коротких ссылок в базе.')
+        parser.add_argument('--requests', type=int, default=5000,
+                            help='Количество редиректов в каждом замере.')
+
+    def handle(self, *args, **options):
+        links, requests = options['links'], options['requests']
+        with test_database():
+            UrlShortener.objects.bulk_create(
+                UrlShortener(url_original=f'http://example.com/{i}',
+                             url_short=f'k{i}')
+                for i in range(links))
+            client = Client()
+
+            def click(i):
+                client.get(f'/k{i % links}')
+
+            def cold_click(i):
+                redirect_cache.invalidate(f'k{i % links}')
+                click(i)
+
+            cold = rate(cold_click, requests)
+            rate(click, links)  # прогрев кеша
+            warm = rate(click, requests)
+            with override_settings(SHORTENER_CLICK_LOG=False):
+                no_log = rate(click, requests)
+        self.stdout.write(f'Ссылок: {links}, запросов: {requests}')
+        self.stdout.write(f'Холодный кеш: {cold:.0f} редиректов/с')
+        self.stdout.write(f'Прогретый кеш: {warm:.0f} редиректов/с')
+        self.stdout.write(f'Прогретый кеш без журнала переходов: '
+                          f'{no_log:.0f} редиректов/с')
@@ -0,0 +1,25 @@
+from django.core.management.base import BaseCommand
+
+from shortener.views import click_log, redirect_counter
+
+
+class Command(BaseCommand):
+    help = 'Просит процессы сервера записать в базу накопленные в буферах ' \
+           'счётчики редиректов и события переходов (через запрос в общем ' \
+           'кеше SHORTENER_FLUSH_CACHE). Процесс выполняет запрос при ' \
+           'следующем переходе, не позже чем через ' \
+           'SHORTENER_FLUSH_CHECK_INTERVAL секунд.'
+
+    def handle(self, *args, **options):
+        if not redirect_counter.flush_request.is_shared():
+            self.stderr.write('Кеш SHORTENER_FLUSH_CACHE не общий для '
+                              'процессов: серверы не увидят запрос сброса.')
+        number = redirect_counter.flush_request.request()
+        self.stdout.write(f'Запрошен сброс буферов (запрос {number})')
+        # Буферы процесса команды обычно пусты, но могут быть заполнены,
+        # если команда вызвана из кода сервера (call_command)
+        flushed = redirect_counter.flush()
+        logged = click_log.flush()
+        if flushed or logged:
+            self.stdout.write(f'Записано переходов: {flushed}, событий '
+                              f'переходов: {logged}')
@@ -0,0 +1,82 @@
+import asyncio
+from statistics import quantiles
+from time import perf_counter
+from urllib.parse import urlsplit
+
+from django.core.management.base import BaseCommand, CommandError
+
+
+async def fetch(host: str, port: int, path: str) -> int:
+    """
+    Выполняет один GET-запрос (HTTP/1.1, Connection: close) и возвращает
+    код ответа.
+    """
+    reader, writer = await asyncio.open_connection(host, port)
+    try:
+        writer.write(f'GET {path} HTTP/1.1\r\nHost: {host}:{port}\r\n'
+                     f'Connection: close\r\n\r\n'.encode())
+        await writer.drain()
+        status_line = await reader.readline()
+        await reader.read()
+        return int(status_line.split()[1])
+    finally:
+        writer.close()
+
+
+class Command(BaseCommand):
+    help = 'Нагрузочный тест редиректов против запущенного локального ' \
+           'сервера: concurrency клиентов параллельно выполняют requests ' \
+           'запросов. Для сравнения WSGI и ASGI запустите тест сначала ' \
+           'против WSGI-сервера (например, gunicorn ' \
+           'short_url_project.wsgi), затем против ASGI-сервера (например, ' \
+           'uvicorn short_url_project.asgi:application) с тем же ключом.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--url', default='http://127.0.0.1:8000',
+                            help='Адрес запущенного сервера.')
+        parser.add_argument('--key', required=True,
+                            help='Ключ существующей короткой ссылки.')
+        parser.add_argument('--concurrency', type=int, default=1000,
+                            help='Количество одновременных клиентов.')
+        parser.add_argument('--requests', type=int, default=20000,
+                            help='Общее количество запросов.')
+
+    async def run(self, host, port, path, concurrency, requests):
+        latencies = []
+        errors = 0
+        remaining = iter(range(requests))
+
+        async def client():
+            nonlocal errors
+            for _ in remaining:
+                start = perf_counter()
+                try:
+                    status = await fetch(host, port, path)
+                except OSError:
+                    errors += 1
+                    continue
+                if status != 302:
+                    errors += 1
+                latencies.append(perf_counter() - start)
+
+        start = perf_counter()
+        await asyncio.gather(*(client() for _ in range(concurrency)))
+        return perf_counter() - start, latencies, errors
+
+    def handle(self, *args, **options):
+        url = urlsplit(options['url'])
+        if not url.hostname:
+            raise CommandError('Некорректный адрес сервера')
+        elapsed, latencies, errors = asyncio.run(self.run(
+            url.hostname, url.port or 80, '/' + options['key'],
+            options['concurrency'], options['requests']))
+        if len(latencies) < 2:
+            raise CommandError(f'Сервер не ответил (ошибок: {errors})')
+        p50, p95, p99 = (quantiles(latencies, n=100)[i] * 1000
+                         for i in (49, 94, 98))
+        self.stdout.write(f'{options["url"]}: {options["concurrency"]} '
+                          f'клиентов, {len(latencies)} ответов, '
+                          f'ошибок: {errors}')
+        self.stdout.write(f'{len(latencies) / elapsed:.0f} запросов/с, '
+                          f'p50 {p50:.1f} мс, p95 {p95:.1f} мс, '
+                          f'p99 {p99:.1f} мс')
@@ -0,0 +1,19 @@
+from django.core.management.base import BaseCommand
+
+from shortener.expiry import purge_expired
+from shortener.views import redirect_cache
+
+
+class Command(BaseCommand):
+    help = 'Удаляет короткие ссылки с истёкшим сроком действия и сбрасывает ' \
+           'их ключи в кеше редиректов. Предназначена для периодического ' \
+           'запуска (cron).'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=1000,
+                            help='Количество ссылок, удаляемых в одной '
+                                 'транзакции.')
+
+    def handle(self, *args, **options):
+        deleted = purge_expired(redirect_cache, options['batch_size'])
+        self.stdout.write(f'Удалено ссылок: {deleted}')
@@ -0,0 +1,55 @@
+from time import perf_counter
+
+from django.core.management.base import BaseCommand
+
+from shortener.bloom import BloomFilter
+from shortener.keys import base62_encode
+from shortener.views import link_filter
+
+
+class Command(BaseCommand):
+    help = 'Перестраивает фильтр Блума по ключам коротких ссылок во всех ' \
+           'процессах (через версию в общем кеше SHORTENER_BLOOM_CACHE). ' \
+           'С параметром --simulate строит фильтр на синтетических ' \
+           'ключах и измеряет его размер и долю ложноположительных ответов.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--simulate', type=int, default=0,
+                            help='Количество синтетических ключей '
+                                 '(например, 10000000).')
+        parser.add_argument('--probes', type=int, default=100000,
+                            help='Количество проверок отсутствующих ключей '
+                                 'при симуляции.')
+
+    def report(self, bloom, elapsed):
+        self.stdout.write(f'Ключей: {bloom.count}, битов: {bloom.size}, '
+                          f'хеш-функций: {bloom.hashes}')
+        self.stdout.write(f'Память: {bloom.memory / 2 ** 20:.1f} МБ, '
+                          f'построение: {elapsed:.1f} с')
+        self.stdout.write(f'Расчётная доля ложноположительных: '
+                          f'{bloom.expected_fp_rate():.4%}')
+
+    def handle(self, *args, **options):
+        count = options['simulate']
+        start = perf_counter()
+        if not count:
+            if not link_filter.is_shared():
+                self.stderr.write('Кеш SHORTENER_BLOOM_CACHE не общий для '
+                                  'процессов: серверы не увидят новую '
+                                  'версию фильтра.')
+            link_filter.invalidate()
+            # Фильтр строится в процессе команды только для отчёта
+            bloom = link_filter.rebuild()
+            self.report(bloom, perf_counter() - start)
+            return
+        bloom = BloomFilter(count, link_filter.fp_rate)
+        for number in range(count):
+            bloom.add(base62_encode(number))
+        self.report(bloom, perf_counter() - start)
+        probes = options['probes']
+        # Ключи из другого диапазона заведомо отсутствуют в фильтре
+        false_positives = sum(base62_encode(count + number) in bloom
+                              for number in range(probes))
+        self.stdout.write(f'Измеренная доля ложноположительных: '
+                          f'{false_positives / probes:.4%} '
+                          f'({false_positives} из {probes})')
@@ -0,0 +1,16 @@
+from django.core.management.base import BaseCommand
+
+from shortener.clicks import rollup_clicks
+
+
+class Command(BaseCommand):
+    help = 'Сворачивает новые события переходов в почасовую и посуточную ' \
+           'статистику. Предназначена для периодического запуска (cron).'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=10000,
+                            help='Количество событий в одной транзакции.')
+
+    def handle(self, *args, **options):
+        processed = rollup_clicks(options['batch_size'])
+        self.stdout.write(f'Обработано событий: {processed}')
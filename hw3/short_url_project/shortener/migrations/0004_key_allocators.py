@@ -0,0 +1,29 @@
+# Generated by Django 3.2.25 on 2026-10-18 13:13
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('shortener', '0003_urlshortener_redirect_count'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='KeyCounter',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('name', models.CharField(max_length=50, unique=True)),
+                ('value', models.BigIntegerField(default=0)),
+            ],
+        ),
+        migrations.CreateModel(
+            name='KeyPool',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('key', models.CharField(max_length=100, unique=True)),
+                ('claim', models.CharField(blank=True, db_index=True, max_length=32, null=True)),
+            ],
+        ),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 3.2.25 on 2026-10-18 13:15
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('shortener', '0004_key_allocators'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='urlshortener',
+            name='url_short',
+            field=models.CharField(max_length=100, unique=True),
+        ),
+    ]
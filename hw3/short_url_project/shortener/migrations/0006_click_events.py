@@ -0,0 +1,46 @@
+# Generated by Django 3.2.25 on 2026-10-18 13:16
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('shortener', '0005_url_short_unique'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ClickEvent',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('url_short', models.CharField(max_length=100)),
+                ('created_at', models.DateTimeField()),
+                ('referrer_host', models.CharField(blank=True, max_length=255)),
+            ],
+        ),
+        migrations.CreateModel(
+            name='ClickHourly',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('url_short', models.CharField(max_length=100)),
+                ('hour', models.DateTimeField()),
+                ('count', models.IntegerField(default=0)),
+            ],
+            options={
+                'unique_together': {('url_short', 'hour')},
+            },
+        ),
+        migrations.CreateModel(
+            name='ClickDaily',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('url_short', models.CharField(max_length=100)),
+                ('day', models.DateField()),
+                ('count', models.IntegerField(default=0)),
+            ],
+            options={
+                'unique_together': {('url_short', 'day')},
+            },
+        ),
+    ]
@@ -0,0 +1,47 @@
+# Generated by Django 3.2.25 on 2026-10-18 13:21
+
+from django.db import migrations, models
+
+from shortener.dedup import url_hash
+
+# Количество строк, обрабатываемых за один проход при заполнении хешей
+BATCH_SIZE = 1000
+
+
+def backfill_url_hash(apps, schema_editor):
+    """
+    Заполняет url_hash для уже существующих ссылок пачками по BATCH_SIZE
+    строк (по возрастанию id), чтобы не загружать всю таблицу в память.
+    """
+    UrlShortener = apps.get_model('shortener', 'UrlShortener')
+    last_id = 0
+    while True:
+        links = list(UrlShortener.objects.filter(id__gt=last_id)
+                     .order_by('id').only('id', 'url_original')
+                     [:BATCH_SIZE])
+        if not links:
+            return
+        for link in links:
+            link.url_hash = url_hash(link.url_original)
+        UrlShortener.objects.bulk_update(links, ['url_hash'])
+        last_id = links[-1].id
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('shortener', '0006_click_events'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='urlshortener',
+            name='url_hash',
+            field=models.CharField(blank=True, default='', max_length=64),
+        ),
+        migrations.AddIndex(
+            model_name='urlshortener',
+            index=models.Index(fields=['url_hash', 'user'], name='shortener_u_url_has_0cb5d6_idx'),
+        ),
+        migrations.RunPython(backfill_url_hash, migrations.RunPython.noop),
+    ]
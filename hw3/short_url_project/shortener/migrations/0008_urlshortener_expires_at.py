@@ -0,0 +1,18 @@
+# Generated by Django 3.2.25 on 2026-10-18 13:27
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('shortener', '0007_urlshortener_url_hash'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='urlshortener',
+            name='expires_at',
+            field=models.DateTimeField(blank=True, db_index=True, null=True),
+        ),
+    ]
@@ -1,11 +1,89 @@
 from django.db import models
 from django.conf import settings
 
+from shortener.dedup import url_hash
+
 
 class UrlShortener(models.Model):
     objects = models.Manager()  # необходимо для корректной работы Pycharm Community Edition
     url_original = models.CharField(max_length=256)
-    url_short = models.CharField(max_length=100)
+    url_short = models.CharField(max_length=100, unique=True)
     user = models.ForeignKey(settings.AUTH_USER_MODEL,
                              on_delete=models.SET_NULL, blank=True, null=True)
     redirect_count = models.IntegerField(null=True, default=0)
+    # SHA-256 нормализованного url_original для поиска повторных ссылок
+    url_hash = models.CharField(max_length=64, blank=True, default='')
+    # Момент, после которого ссылка недействительна (None - бессрочная).
+    # Индекс нужен для поиска истёкших ссылок командой purge_expired
+    expires_at = models.DateTimeField(null=True, blank=True, db_index=True)
+
+    class Meta:
+        indexes = [models.Index(fields=['url_hash', 'user'])]
+
+    def save(self, *args, **kwargs):
+        """
+        Перед сохранением вычисляет хеш нормализованного оригинального URL.
+        """
+        self.url_hash = url_hash(self.url_original)
+        super().save(*args, **kwargs)
+
+
+class KeyCounter(models.Model):
+    """
+    Именованный счётчик, из значений которого распределитель ключей
+    (shortener.keys.BlockAllocator) строит ключи коротких ссылок.
+    """
+    objects = models.Manager()
+    name = models.CharField(max_length=50, unique=True)
+    value = models.BigIntegerField(default=0)
+
+
+class KeyPool(models.Model):
+    """
+    Пул заранее сгенерированных свободных ключей коротких ссылок
+    (shortener.keys.PoolAllocator). Поле claim - метка процесса,
+    забирающего ключ из пула.
+    """
+    objects = models.Manager()
+    key = models.CharField(max_length=100, unique=True)
+    claim = models.CharField(max_length=32, null=True, blank=True,
+                             db_index=True)
+
+
+class ClickEvent(models.Model):
+    """
+    Событие перехода по короткой ссылке (журнал только для добавления).
+    События записываются пачками вне обработки запроса
+    (shortener.clicks.ClickLog) и периодически сворачиваются в таблицы
+    ClickHourly и ClickDaily командой manage.py rollup_clicks.
+    """
+    objects = models.Manager()
+    url_short = models.CharField(max_length=100)
+    created_at = models.DateTimeField()
+    referrer_host = models.CharField(max_length=255, blank=True)
+
+
+class ClickHourly(models.Model):
+    """
+    Количество переходов по ссылке за час.
+    """
+    objects = models.Manager()
+    url_short = models.CharField(max_length=100)
+    hour = models.DateTimeField()
+    count = models.IntegerField(default=0)
+
+    class Meta:
+        unique_together = ('url_short', 'hour')
+
+
+class ClickDaily(models.Model):
+    """
+    Количество переходов по ссылке за сутки.
+    """
+    objects = models.Manager()
+    url_short = models.CharField(max_length=100)
+    day = models.DateField()
+    count = models.IntegerField(default=0)
+
+    class Meta:
+        unique_together = ('url_short', 'day')
@@ -0,0 +1,26 @@
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from shortener.models import UrlShortener
+from shortener.views import link_filter, redirect_cache
+
+
+@receiver(post_save, sender=UrlShortener)
+@receiver(post_delete, sender=UrlShortener)
+def invalidate_redirect_cache(sender, instance, **kwargs):
+    """
+    При создании, изменении или удалении ссылки удаляет её ключ из кеша
+    редиректов, чтобы не отдавать устаревший оригинальный URL. Сохранения,
+    не затрагивающие поля url_original и url_short (например, обновление
+    счётчика редиректов), кеш не сбрасывают.
+    """
+    update_fields = kwargs.get('update_fields')
+    if update_fields and not {'url_original', 'url_short'} & update_fields:
+        return
+    redirect_cache.invalidate(instance.url_short)
+    if kwargs.get('created'):
+        # Новая ссылка сразу попадает в фильтр Блума этого процесса и в журнал
+        # фильтра в общем кеше, чтобы другие процессы её не отсеяли
+        link_filter.publish([instance.url_short])
+        redirect_cache.prime({instance.url_short: instance.url_original},
+                             instance.expires_at)
@@ -1,3 +1,640 @@
-from django.test import TestCase
+import json
+import time
+from importlib import import_module
+from concurrent.futures import ThreadPoolExecutor
+from datetime import date, datetime, timedelta
+from io import StringIO
+from shutil import rmtree
+from tempfile import mkdtemp
+from unittest import mock
 
-# Create your tests here.
+from django.apps import apps
+from django.conf import settings
+from django.contrib.auth.models import User
+from django.core.cache import cache
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.management import call_command
+from django.db import connection
+from django.test import RequestFactory, TestCase, TransactionTestCase, \
+    override_settings
+from django.test.utils import CaptureQueriesContext
+
+from shortener.bloom import ADDED_KEY, BloomFilter, LinkFilter
+from shortener.cache import CACHE_PREFIX, LRUCache
+from shortener.clicks import ClickLog, rollup_clicks
+from shortener.counters import RedirectCounter
+from shortener.dedup import normalize_url, url_hash
+from shortener.expiry import purge_expired
+from shortener.management.commands.bench_keys import seed_links
+from shortener.keys import BlockAllocator, PoolAllocator, \
+    SequenceAllocator, base62_encode
+from shortener.models import ClickDaily, ClickEvent, ClickHourly, \
+    UrlShortener
+from shortener.views import click_log, find_link, find_url, \
+    key_allocator, link_filter, redirect_cache, redirect_counter, \
+    url_handler
+
+
+class LRUCacheTest(TestCase):
+    def test_evicts_least_recently_used(self):
+        lru = LRUCache(max_size=2)
+        lru.set('a', 1)
+        lru.set('b', 2)
+        lru.get('a')
+        lru.set('c', 3)
+        self.assertEqual(lru.get('a'), 1)
+        self.assertIsNone(lru.get('b'))
+        self.assertEqual(len(lru), 2)
+
+    def test_expired_entry_is_miss(self):
+        lru = LRUCache(ttl=-1)
+        lru.set('a', 1)
+        self.assertIsNone(lru.get('a'))
+
+
+class RedirectCacheTest(TestCase):
+    def setUp(self):
+        cache.clear()
+        redirect_cache.clear_local()
+        self.addCleanup(click_log.flush)
+        self.addCleanup(redirect_counter.flush)
+        self.link = UrlShortener.objects.create(
+            url_original='http://example.com', url_short='abcde')
+
+    def test_warm_redirect_skips_lookup(self):
+        self.client.get('/abcde')
+        with self.assertNumQueries(0):
+            response = self.client.get('/abcde')
+        self.assertRedirects(response, 'http://example.com',
+                             fetch_redirect_response=False)
+
+    def test_delete_invalidates(self):
+        self.client.get('/abcde')
+        self.link.delete()
+        response = self.client.get('/abcde')
+        self.assertRedirects(response, '/', fetch_redirect_response=False)
+
+    def test_create_invalidates(self):
+        cache.set('shortener:url:new', 'http://stale.example.com')
+        UrlShortener.objects.create(url_original='http://fresh.example.com',
+                                    url_short='new')
+        self.assertEqual(redirect_cache.get('new'), 'http://fresh.example.com')
+
+
+class RedirectCounterTest(TestCase):
+    def setUp(self):
+        cache.clear()
+        redirect_cache.clear_local()
+        redirect_counter.flush()
+        self.link = UrlShortener.objects.create(
+            url_original='http://example.com', url_short='abcde')
+
+    def test_threshold_flushes_in_batches(self):
+        counter = RedirectCounter(UrlShortener, threshold=10, interval=3600)
+        UrlShortener.objects.create(url_original='http://example.org',
+                                    url_short='other')
+        with self.assertNumQueries(0):
+            for _ in range(4):
+                counter.incr('abcde')
+                counter.incr('other')
+        with CaptureQueriesContext(connection) as queries:
+            counter.incr('abcde')
+            counter.incr('other')
+        updates = [q for q in queries if q['sql'].startswith('UPDATE')]
+        self.assertEqual(len(updates), 1)  # одинаковое приращение
+        self.assertEqual(counter.pending(), 0)
+        self.assertEqual(
+            sorted(UrlShortener.objects.values_list('redirect_count',
+                                                    flat=True)), [5, 5])
+
+    @override_settings(SHORTENER_FLUSH_CACHE='default',
+                       SHORTENER_FLUSH_CHECK_INTERVAL=0)
+    def test_flush_command_reaches_buffers(self):
+        counter = RedirectCounter(UrlShortener, threshold=1000,
+                                  interval=3600)
+        log = ClickLog(threshold=1000, interval=3600)
+        request = RequestFactory().get('/abcde')
+        counter.incr('abcde')
+        log.add('abcde', request)
+        self.assertEqual((counter.pending(), log.pending()), (1, 1))
+        err = StringIO()
+        call_command('flush_redirects', stdout=StringIO(), stderr=err)
+        self.assertIn('SHORTENER_FLUSH_CACHE', err.getvalue())
+        counter.incr('abcde')
+        log.add('abcde', request)
+        self.assertEqual((counter.pending(), log.pending()), (0, 0))
+        self.link.refresh_from_db()
+        self.assertEqual(self.link.redirect_count, 2)
+        self.assertEqual(ClickEvent.objects.count(), 2)
+        # Запрос выполняется один раз
+        counter.incr('abcde')
+        self.assertEqual(counter.pending(), 1)
+
+
+@override_settings(SHORTENER_CLICK_LOG=False)
+class ConcurrentRedirectCounterTest(TransactionTestCase):
+    def setUp(self):
+        cache.clear()
+        redirect_cache.clear_local()
+        redirect_counter.flush()
+        self.addCleanup(redirect_counter.flush)
+        self.link = UrlShortener.objects.create(
+            url_original='http://example.com', url_short='abcde')
+
+    def test_concurrent_clicks_are_counted_exactly(self):
+        clicks = 500
+        request = RequestFactory().get('/abcde')
+        # Маленький порог: сбросы с F() идут параллельно с увеличениями
+        self.addCleanup(setattr, redirect_counter, 'threshold',
+                        redirect_counter.threshold)
+        self.addCleanup(setattr, redirect_counter, 'interval',
+                        redirect_counter.interval)
+        redirect_counter.threshold = 7
+        redirect_counter.interval = 3600
+
+        def click(_):
+            try:
+                return url_handler(request, 'abcde').status_code
+            finally:
+                connection.close()
+
+        with mock.patch.object(redirect_counter, 'flush',
+                               wraps=redirect_counter.flush) as flush, \
+                ThreadPoolExecutor(max_workers=16) as pool:
+            statuses = list(pool.map(click, range(clicks)))
+        self.assertEqual(statuses, [302] * clicks)
+        self.assertGreater(flush.call_count, 10)
+        redirect_counter.flush()
+        self.link.refresh_from_db()
+        self.assertEqual(self.link.redirect_count, clicks)
+
+
+class KeyAllocatorTest(TestCase):
+    def test_base62_encode(self):
+        self.assertEqual(base62_encode(0), '0')
+        self.assertEqual(base62_encode(61), 'Z')
+        self.assertEqual(base62_encode(62), '10')
+
+    def test_block_allocator_skips_taken_keys(self):
+        UrlShortener.objects.create(url_original='http://example.com',
+                                    url_short='2')
+        allocator = BlockAllocator(batch_size=5)
+        self.assertEqual(allocator.allocate_many(6),
+                         ['0', '1', '3', '4', '5', '6'])
+
+    def test_workers_get_disjoint_blocks(self):
+        first = BlockAllocator(batch_size=10).allocate_many(10)
+        second = BlockAllocator(batch_size=10).allocate_many(10)
+        self.assertFalse(set(first) & set(second))
+
+    def test_sequence_allocator(self):
+        allocator = SequenceAllocator()
+        self.assertEqual(allocator.allocate_many(3), ['0', '1', '2'])
+
+    def test_pool_allocator_keys_are_unique(self):
+        allocator = PoolAllocator(pool_size=50, batch_size=20)
+        keys = allocator.allocate_many(120)
+        self.assertEqual(len(set(keys)), 120)
+        self.assertFalse(UrlShortener.objects.filter(url_short__in=keys))
+
+    @override_settings(SHORTENER_DEDUP=False)
+    def test_create_link_is_single_insert(self):
+        user = User.objects.create_user('user', password='password')
+        self.client.force_login(user)
+        key_allocator.allocate()  # ключи уже зарезервированы
+        with CaptureQueriesContext(connection) as queries:
+            self.client.post('/shortener', {'url': 'http://example.com'})
+        link_queries = [q['sql'] for q in queries
+                        if 'shortener_' in q['sql']]
+        self.assertEqual(len(link_queries), 1)
+        self.assertTrue(link_queries[0].startswith('INSERT'))
+
+
+class BenchSeedTest(TestCase):
+    def test_seed_links_twice(self):
+        # Второй вызов получает тот же сдвиг: все ключи уже заняты,
+        # и пачка добавляется заново с другим сдвигом
+        with mock.patch('shortener.management.commands.bench_keys.randrange',
+                        side_effect=[0, 0, 5000]):
+            seed_links(0, 100)
+            seed_links(0, 100)
+        keys = list(UrlShortener.objects.values_list('url_short', flat=True))
+        self.assertEqual(len(keys), 200)
+        self.assertEqual(len(set(keys)), 200)
+        self.assertTrue(all(5 <= len(key) <= 7 for key in keys))
+
+    def test_seed_links_in_chunks(self):
+        seed_links(0, 250, chunk=100)
+        seed_links(250, 500, chunk=100)
+        self.assertEqual(UrlShortener.objects.count(), 500)
+
+
+class UrlLookupTest(TestCase):
+    def test_find_url(self):
+        UrlShortener.objects.create(url_original='http://example.com',
+                                    url_short='abcde')
+        self.assertEqual(find_url('abcde'), 'http://example.com')
+        self.assertFalse(find_url('missing'))
+
+    def test_lookup_uses_unique_index(self):
+        # План строится для запроса, который действительно выполняет
+        # find_link
+        with CaptureQueriesContext(connection) as queries:
+            find_link('abcde')
+        self.assertEqual(len(queries), 1)
+        with connection.cursor() as cur:
+            cur.execute('EXPLAIN QUERY PLAN ' + queries[0]['sql'])
+            plan = ' '.join(row[-1] for row in cur.fetchall())
+        self.assertIn('USING INDEX', plan)
+        self.assertIn('url_short=?', plan)
+        self.assertNotIn('SCAN', plan)
+        self.assertNotIn('TEMP B-TREE', plan)
+
+
+class BulkHandlerTest(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user('user', password='password')
+        self.client.force_login(self.user)
+
+    def read(self, response):
+        return b''.join(response.streaming_content).decode()
+
+    def test_csv_upload(self):
+        upload = SimpleUploadedFile(
+            'urls.csv', b'url\nhttp://a.example.com\nbad-url\n'
+                        b'https://b.example.com\n', content_type='text/csv')
+        with self.settings(SHORTENER_BULK_CHUNK_SIZE=2):
+            response = self.client.post('/shortener/bulk', {'file': upload})
+            lines = self.read(response).splitlines()
+        self.assertEqual(lines[0], 'original,short')
+        self.assertEqual(lines[2], 'bad-url,')
+        self.assertEqual(UrlShortener.objects.filter(user=self.user).count(),
+                         2)
+        for line in (lines[1], lines[3]):
+            original, short = line.split(',')
+            link = UrlShortener.objects.get(url_short=short.rsplit('/')[-1])
+            self.assertEqual(link.url_original, original)
+
+    def test_jsonl_body(self):
+        body = '{"url": "http://a.example.com"}\n"ftp://b.example.com"\n' \
+               'not json\n'
+        response = self.client.post('/shortener/bulk', body,
+                                    content_type='application/x-ndjson')
+        self.assertEqual(response['Content-Type'], 'application/x-ndjson')
+        rows = [json.loads(line)
+                for line in self.read(response).splitlines()]
+        self.assertEqual([row['original'] for row in rows],
+                         ['http://a.example.com', 'ftp://b.example.com',
+                          'not json'])
+        self.assertIsNone(rows[2]['short'])
+        self.assertEqual(UrlShortener.objects.count(), 2)
+
+    def test_jsonl_non_string_urls(self):
+        body = '{"url": null}\n{"url": 5}\n{"link": "x"}\n[1, 2]\n7\n' \
+               '{"url": "http://a.example.com"}\n'
+        response = self.client.post('/shortener/bulk', body,
+                                    content_type='application/x-ndjson')
+        rows = [json.loads(line)
+                for line in self.read(response).splitlines()]
+        self.assertEqual([row['original'] for row in rows],
+                         ['{"url": null}', '{"url": 5}', '{"link": "x"}',
+                          '[1, 2]', '7', 'http://a.example.com'])
+        self.assertEqual([row['short'] is None for row in rows],
+                         [True] * 5 + [False])
+        self.assertEqual(UrlShortener.objects.count(), 1)
+
+
+class ClickLogTest(TestCase):
+    def setUp(self):
+        cache.clear()
+        redirect_cache.clear_local()
+        redirect_counter.flush()
+        click_log.flush()
+        self.addCleanup(click_log.flush)
+        self.user = User.objects.create_user('user', password='password')
+        UrlShortener.objects.create(url_original='http://example.com',
+                                    url_short='abcde', user=self.user)
+
+    def add_events(self, url_key, *moments):
+        ClickEvent.objects.bulk_create(
+            ClickEvent(url_short=url_key, created_at=moment)
+            for moment in moments)
+
+    def test_redirect_does_not_write_events(self):
+        self.client.get('/abcde')
+        with self.assertNumQueries(0):
+            self.client.get('/abcde', HTTP_REFERER='https://news.example/a')
+        self.assertEqual(click_log.pending(), 2)
+        click_log.flush()
+        self.assertEqual(
+            list(ClickEvent.objects.values_list('referrer_host', flat=True)),
+            ['', 'news.example'])
+
+    def test_rollup(self):
+        self.add_events('abcde', datetime(2021, 11, 1, 10, 5),
+                        datetime(2021, 11, 1, 10, 55),
+                        datetime(2021, 11, 1, 11, 0),
+                        datetime(2021, 11, 2, 0, 30))
+        self.add_events('other', datetime(2021, 11, 1, 10, 30))
+        self.assertEqual(rollup_clicks(batch_size=2), 5)
+        self.assertEqual(
+            list(ClickHourly.objects.filter(url_short='abcde')
+                 .order_by('hour').values_list('hour', 'count')),
+            [(datetime(2021, 11, 1, 10), 2), (datetime(2021, 11, 1, 11), 1),
+             (datetime(2021, 11, 2, 0), 1)])
+        self.assertEqual(
+            list(ClickDaily.objects.order_by('url_short', 'day')
+                 .values_list('url_short', 'day', 'count')),
+            [('abcde', date(2021, 11, 1), 3), ('abcde', date(2021, 11, 2), 1),
+             ('other', date(2021, 11, 1), 1)])
+
+    def test_rollup_is_incremental(self):
+        self.add_events('abcde', datetime(2021, 11, 1, 10, 5))
+        rollup_clicks()
+        self.assertEqual(rollup_clicks(), 0)
+        self.add_events('abcde', datetime(2021, 11, 1, 10, 40))
+        self.assertEqual(rollup_clicks(), 1)
+        self.assertEqual(ClickHourly.objects.get().count, 2)
+        self.assertEqual(ClickDaily.objects.get().count, 2)
+
+    def test_stats_page_reads_rollups(self):
+        ClickDaily.objects.create(url_short='abcde', day=date.today(),
+                                  count=7)
+        self.client.force_login(self.user)
+        response = self.client.get('/stats/abcde')
+        self.assertContains(response, '<td>7</td>', html=True)
+
+
+class BloomFilterTest(TestCase):
+    def setUp(self):
+        # Общий кеш фильтра - отдельный файловый кеш для каждого теста
+        location = mkdtemp()
+        self.addCleanup(rmtree, location, True)
+        shared_cache = override_settings(CACHES={
+            'default': settings.CACHES['default'],
+            'shared': {
+                'BACKEND':
+                    'django.core.cache.backends.filebased.FileBasedCache',
+                'LOCATION': location,
+            },
+        }, SHORTENER_BLOOM_CACHE='shared')
+        shared_cache.enable()
+        self.addCleanup(shared_cache.disable)
+        cache.clear()
+        redirect_cache.clear_local()
+        self.addCleanup(click_log.flush)
+        self.addCleanup(redirect_counter.flush)
+        UrlShortener.objects.create(url_original='http://example.com',
+                                    url_short='abcde')
+        link_filter.rebuild()
+
+    def test_no_false_negatives(self):
+        bloom = BloomFilter(1000)
+        keys = [base62_encode(number) for number in range(1000)]
+        for key in keys:
+            bloom.add(key)
+        self.assertTrue(all(key in bloom for key in keys))
+        self.assertLess(bloom.expected_fp_rate(), 0.02)
+
+    def test_unknown_key_skips_database(self):
+        with self.assertNumQueries(0):
+            response = self.client.get('/missing')
+        self.assertRedirects(response, '/', fetch_redirect_response=False)
+
+    def test_new_link_is_added(self):
+        UrlShortener.objects.create(url_original='http://example.org',
+                                    url_short='fresh')
+        self.assertTrue(link_filter.might_contain('fresh'))
+        redirect_cache.clear_local()
+        cache.clear()
+        response = self.client.get('/fresh')
+        self.assertRedirects(response, 'http://example.org',
+                             fetch_redirect_response=False)
+
+    def test_link_from_other_process_is_found(self):
+        # Ссылка добавлена в базу и общий кеш, но не в фильтр этого процесса
+        UrlShortener.objects.bulk_create([UrlShortener(
+            url_original='http://example.org', url_short='remote')])
+        redirect_cache.prime({'remote': 'http://example.org'})
+        redirect_cache.clear_local()
+        response = self.client.get('/remote')
+        self.assertRedirects(response, 'http://example.org',
+                             fetch_redirect_response=False)
+
+    def test_link_published_by_other_process(self):
+        other = LinkFilter(link_filter.loader, link_filter.count_loader)
+        UrlShortener.objects.bulk_create([UrlShortener(
+            url_original='http://example.org', url_short='remote')])
+        seq = link_filter.seq
+        other.publish(['remote'])
+        self.assertTrue(link_filter.might_contain('remote'))
+        self.assertEqual(link_filter.seq, seq + 1)
+        self.assertFalse(link_filter.might_contain('missing'))
+
+    def test_expired_journal_falls_back_to_database(self):
+        other = LinkFilter(link_filter.loader, link_filter.count_loader)
+        other.publish(['remote'])
+        link_filter.shared.delete(ADDED_KEY.format(link_filter.seq + 1))
+        self.assertTrue(link_filter.might_contain('missing'))
+
+    @override_settings(SHORTENER_BLOOM_CACHE='default')
+    def test_process_local_cache_falls_back_to_database(self):
+        self.assertFalse(link_filter.is_shared())
+        self.assertTrue(link_filter.might_contain('missing'))
+
+    def test_rebuilds_do_not_overlap(self):
+        running = []
+        overlaps = []
+
+        def loader():
+            running.append(1)
+            overlaps.append(len(running))
+            time.sleep(0.01)
+            running.pop()
+            return iter(['abcde'])
+
+        bloom_filter = LinkFilter(loader, lambda: 1)
+        with ThreadPoolExecutor(4) as executor:
+            for _ in range(8):
+                executor.submit(bloom_filter.rebuild)
+        self.assertEqual(max(overlaps), 1)
+
+    def test_background_thread_builds_filter(self):
+        bloom_filter = LinkFilter(lambda: iter(['abcde']), lambda: 1)
+        bloom_filter.start()
+        for _ in range(100):
+            if bloom_filter.filter is not None:
+                break
+            time.sleep(0.01)
+        self.assertIn('abcde', bloom_filter.filter)
+        self.assertFalse(bloom_filter.might_contain('missing'))
+
+    def test_rebuild_command_bumps_version(self):
+        UrlShortener.objects.bulk_create([UrlShortener(
+            url_original='http://example.org', url_short='loaded')])
+        self.assertFalse(link_filter.might_contain('loaded'))
+        call_command('rebuild_bloom', stdout=StringIO())
+        self.assertTrue(link_filter.might_contain('loaded'))
+
+
+class DedupTest(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user('user', password='password')
+        self.client.force_login(self.user)
+
+    def test_normalize_url(self):
+        cases = [
+            ('HTTP://Example.COM', 'http://example.com/'),
+            ('http://example.com:80/a/', 'http://example.com/a'),
+            ('https://example.com:443', 'https://example.com/'),
+            ('https://example.com:8443/', 'https://example.com:8443/'),
+            ('ftp://example.com:21/file', 'ftp://example.com/file'),
+            ('http://example.com/A/B//', 'http://example.com/A/B'),
+            ('http://example.com/?', 'http://example.com/'),
+            ('http://example.com./?q=1', 'http://example.com/?q=1'),
+            ('http://user:pw@Example.com:80', 'http://user:pw@example.com/'),
+            ('http://[::1]:80/x', 'http://[::1]/x'),
+        ]
+        for url, expected in cases:
+            with self.subTest(url=url):
+                self.assertEqual(normalize_url(url), expected)
+        self.assertEqual(url_hash('http://example.com'),
+                         url_hash('HTTP://EXAMPLE.COM:80/'))
+        self.assertEqual(len(url_hash('http://example.com')), 64)
+
+    def shorten(self, url):
+        response = self.client.post('/shortener', {'url': url})
+        return response.context['short_url']
+
+    def test_same_url_returns_existing_key(self):
+        first = self.shorten('http://example.com/page/')
+        self.assertEqual(self.shorten('http://EXAMPLE.com:80/page'), first)
+        self.assertEqual(UrlShortener.objects.count(), 1)
+
+    def test_other_user_gets_new_key(self):
+        first = self.shorten('http://example.com')
+        self.client.force_login(User.objects.create_user('other'))
+        self.assertNotEqual(self.shorten('http://example.com'), first)
+
+    @override_settings(SHORTENER_DEDUP=False)
+    def test_dedup_disabled(self):
+        self.assertNotEqual(self.shorten('http://example.com'),
+                            self.shorten('http://example.com'))
+
+    def test_backfill_migration(self):
+        migration = import_module(
+            'shortener.migrations.0007_urlshortener_url_hash')
+        UrlShortener.objects.bulk_create(
+            UrlShortener(url_original=f'http://example.com/{i}',
+                         url_short=f'k{i}') for i in range(5))
+        UrlShortener.objects.update(url_hash='')
+        self.addCleanup(setattr, migration, 'BATCH_SIZE',
+                        migration.BATCH_SIZE)
+        migration.BATCH_SIZE = 2
+        migration.backfill_url_hash(apps, None)
+        for link in UrlShortener.objects.all():
+            self.assertEqual(link.url_hash, url_hash(link.url_original))
+
+
+@override_settings(ROOT_URLCONF='short_url_project.urls_asgi')
+class AsyncRedirectTest(TestCase):
+    def setUp(self):
+        cache.clear()
+        redirect_cache.clear_local()
+        redirect_counter.flush()
+        click_log.flush()
+        self.addCleanup(click_log.flush)
+        self.addCleanup(redirect_counter.flush)
+        UrlShortener.objects.create(url_original='http://example.com',
+                                    url_short='abcde')
+
+    async def test_redirect(self):
+        response = await self.async_client.get('/abcde')
+        self.assertEqual(response.status_code, 302)
+        self.assertEqual(response['Location'], 'http://example.com')
+        self.assertEqual(redirect_counter.pending(), 1)
+
+    async def test_unknown_key(self):
+        response = await self.async_client.get('/missing')
+        self.assertEqual(response['Location'], '/')
+
+    def test_sync_views_keep_working(self):
+        self.client.force_login(User.objects.create_user('user'))
+        response = self.client.post('/shortener',
+                                    {'url': 'http://example.org'})
+        self.assertTrue(response.context['short_url'])
+
+
+class ExpiringLinkTest(TestCase):
+    now = datetime(2021, 11, 1, 12, 0)
+
+    def setUp(self):
+        cache.clear()
+        redirect_cache.clear_local()
+        self.addCleanup(click_log.flush)
+        self.addCleanup(redirect_counter.flush)
+        self.freeze(self.now)
+        UrlShortener.objects.create(url_original='http://example.com',
+                                    url_short='abcde',
+                                    expires_at=self.now + timedelta(hours=1))
+
+    def freeze(self, moment):
+        patcher = mock.patch('django.utils.timezone.now',
+                             return_value=moment)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def test_expired_link_is_miss(self):
+        response = self.client.get('/abcde')
+        self.assertRedirects(response, 'http://example.com',
+                             fetch_redirect_response=False)
+        self.freeze(self.now + timedelta(hours=1))
+        with self.assertNumQueries(0):
+            response = self.client.get('/abcde')
+        self.assertRedirects(response, '/', fetch_redirect_response=False)
+        self.assertFalse(find_url('abcde'))
+
+    def test_handler_sets_ttl(self):
+        self.client.force_login(User.objects.create_user('user'))
+        response = self.client.post('/shortener', {'url': 'http://example.org',
+                                                   'ttl': '2'})
+        link = UrlShortener.objects.get(
+            url_short=response.context['short_url'].rsplit('/')[-1])
+        self.assertEqual(link.expires_at, self.now + timedelta(hours=2))
+        response = self.client.post('/shortener', {'url': 'http://example.org',
+                                                   'ttl': '-1'})
+        self.assertFalse(response.context['short_url'])
+        self.assertEqual(UrlShortener.objects.count(), 2)
+
+    def test_purge_in_batches(self):
+        UrlShortener.objects.bulk_create(
+            UrlShortener(url_original=f'http://example.com/{i}',
+                         url_short=f'old{i}',
+                         expires_at=self.now + timedelta(minutes=i))
+            for i in range(4))
+        UrlShortener.objects.create(url_original='http://example.org',
+                                    url_short='forever')
+        self.client.get('/abcde')
+        self.freeze(self.now + timedelta(hours=1))
+        with CaptureQueriesContext(connection) as queries:
+            self.assertEqual(purge_expired(redirect_cache, batch_size=2), 5)
+        deletes = [q for q in queries if q['sql'].startswith('DELETE')]
+        self.assertEqual(len(deletes), 3)
+        self.assertEqual(
+            list(UrlShortener.objects.values_list('url_short', flat=True)),
+            ['forever'])
+        self.assertIsNone(cache.get(CACHE_PREFIX + 'abcde'))
+        self.assertTrue(redirect_cache.cached('forever'))
+        call_command('purge_expired', stdout=StringIO())
+        self.assertEqual(UrlShortener.objects.count(), 1)
+
+    def test_purge_uses_index(self):
+        query, params = UrlShortener.objects.filter(
+            expires_at__lte=self.now).order_by('expires_at').values(
+            'id', 'url_short').query.sql_with_params()
+        with connection.cursor() as cur:
+            cur.execute('EXPLAIN QUERY PLAN ' + query, params)
+            plan = ' '.join(row[-1] for row in cur.fetchall())
+        self.assertIn('USING INDEX', plan)
+        self.assertIn('expires_at', plan)
+        self.assertNotIn('TEMP B-TREE', plan)  # без сортировки
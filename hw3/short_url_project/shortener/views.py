@@ -1,12 +1,25 @@
-from django.shortcuts import render, redirect
+from django.shortcuts import render, redirect, get_object_or_404
 from django.contrib.auth.forms import UserCreationForm
 from django.contrib.auth.decorators import login_required
 from django.contrib.auth import logout
-from django.http import HttpResponseRedirect
+from django.http import HttpResponseRedirect, HttpResponseNotAllowed, \
+    StreamingHttpResponse
+from asgiref.sync import sync_to_async
+from django.conf import settings
 from django.db import connection
-from random import choice, randrange
-from string import ascii_letters, digits
-from shortener.models import UrlShortener
+from django.db.models import Q
+from django.utils import timezone
+from datetime import timedelta
+import asyncio
+from shortener.bulk import is_jsonl, read_csv, read_jsonl, shorten_stream, \
+    text_lines
+from shortener.bloom import LinkFilter
+from shortener.cache import RedirectCache
+from shortener.clicks import ClickLog
+from shortener.counters import RedirectCounter
+from shortener.dedup import url_hash
+from shortener.keys import get_allocator
+from shortener.models import ClickDaily, ClickHourly, UrlShortener
 
 
 def create_user(request):
@@ -33,22 +46,51 @@ def logout_user(request):
     return redirect('/')
 
 
+def find_link(url_key: str):
+    """
+    Функция ищет действующую (без срока действия или с неистёкшим сроком)
+    короткую ссылку с ключом url_key по уникальному индексу на url_short
+    и возвращает пару (оригинальный URL, срок действия) для кеша редиректов.
+    :param url_key: Искомый ключ короткого URL.
+    :return: Пара (оригинальный URL, срок действия или None) или None.
+    """
+    return UrlShortener.objects.filter(
+        Q(expires_at__isnull=True) | Q(expires_at__gt=timezone.now()),
+        url_short=url_key).values_list('url_original', 'expires_at').first()
+
+
 def find_url(url_key: str):
     """
     Функция ищет ключ (случайная последовательность символов после адреса хоста)
     короткого URL в таблице url_shortener и возвращает соответствующий ему
-    оригинальный URL или значение False при ненахождении объекта поиска.
+    оригинальный URL или значение False при ненахождении объекта поиска
+    (ссылки с истёкшим сроком действия не находятся).
     :param url_key: Искомый ключ короткого URL.
     :return: Оригинальный URL или значение False.
     """
-    try:
-        with connection.cursor() as cur:
-            query = 'SELECT * FROM shortener_urlshortener WHERE url_short = %s'
-            cur.execute(query, [url_key])
-            record = cur.fetchone()
-        return record[1]
-    except:
-        return False
+    link = find_link(url_key)
+    return link[0] if link else False
+
+
+def all_url_keys():
+    """
+    Функция возвращает итератор по всем ключам коротких ссылок, читая их
+    из базы порциями (для построения фильтра Блума).
+    """
+    return UrlShortener.objects.values_list('url_short', flat=True) \
+        .iterator(chunk_size=10000)
+
+
+# Read-through кеш ключ -> оригинальный URL, поверх функции find_link
+redirect_cache = RedirectCache(find_link)
+# Фильтр Блума по ключам ссылок для отсева несуществующих ключей
+link_filter = LinkFilter(all_url_keys, UrlShortener.objects.count)
+# Буферизированные счётчики редиректов
+redirect_counter = RedirectCounter(UrlShortener)
+# Буферизированный журнал событий переходов
+click_log = ClickLog()
+# Распределитель свободных ключей для новых коротких ссылок
+key_allocator = get_allocator()
 
 
 def check_url(url_txt: str) -> bool:
@@ -61,23 +103,38 @@ def check_url(url_txt: str) -> bool:
     return url_txt.startswith(('http://', 'https://', 'ftp://'))
 
 
-def random_url(min_=5, max_=8) -> str:
+def parse_ttl(value: str):
     """
-    Функция генерирует случайную последовательность цифр и букв.
-    Минимальная длина ключа - min_ символов, максимальная - max_ символов.
-    Также производится проверка сгенерированной последовательности
-    на уникальность - через поиск в базе данных, с использованием рекурсии.
-    :param: min_: Минимальная длина случайной последовательности.
-            max_: Максимальная длина случайной последовательности.
-    :return: Случайная последовательность букв и цифр.
+    Функция переводит срок действия ссылки из поля ttl формы (целое
+    количество часов) в момент истечения срока.
+    :param value: Значение поля ttl (пустое - бессрочная ссылка).
+    :return: Момент истечения срока, None для бессрочной ссылки
+    или False, если значение некорректно.
     """
-    dictionary = ascii_letters + digits
-    pass_length = randrange(min_, max_)
-    random_str = ''.join(choice(dictionary) for _ in range(pass_length))
-    if find_url(random_str):
-        return random_url(min_, max_)
-    else:
-        return random_str
+    value = (value or '').strip()
+    if not value:
+        return None
+    if not value.isdigit() or int(value) == 0:
+        return False
+    try:
+        return timezone.now() + timedelta(hours=int(value))
+    except OverflowError:
+        return False
+
+
+def find_duplicate(url_original: str, user):
+    """
+    Функция ищет уже созданную пользователем user бессрочную короткую ссылку
+    на тот же (после нормализации) оригинальный URL - по индексу
+    (url_hash, user).
+    :param url_original: Оригинальный URL.
+    :param user: Пользователь, создающий ссылку.
+    :return: Ключ существующей короткой ссылки или None.
+    """
+    return UrlShortener.objects.filter(
+        url_hash=url_hash(url_original), user=user,
+        expires_at__isnull=True).values_list(
+        'url_short', flat=True).first()
 
 
 @login_required(login_url='accounts/login')
@@ -85,53 +142,192 @@ def handler(request):
     """
     Функция-обработчик при получении метода POST считывает строку из поля
     url формы файла index.html, проверяет её на допустимые схемы (http,
-    https, ftp). При прохождении проверки создаёт короткий URL, записывает его
-    вместе с соответствующим оригинальным URL и ссылкой на пользователя,
-    добавившего эту ссылку, в базу данных, затем возвращает html страничку
-    с короткой ссылкой на оригинальный сайт. Если проверка не прошла - выдаёт
-    предупреждение про несоответствие схемы.
+    https, ftp). При прохождении проверки получает свободный ключ от
+    распределителя key_allocator (без поиска ключа в базе данных),
+    записывает его вместе с соответствующим оригинальным URL и ссылкой
+    на пользователя, добавившего эту ссылку, в базу данных, затем возвращает
+    html страничку с короткой ссылкой на оригинальный сайт. Необязательное
+    поле ttl задаёт срок действия ссылки в часах. В режиме SHORTENER_DEDUP
+    для URL, который этот пользователь уже сокращал бессрочно, бессрочная
+    ссылка не создаётся заново, а возвращается существующая. Если проверка
+    не прошла - выдаёт предупреждение про несоответствие схемы или срока.
     При получении другого метода (GET), выдаёт пустую страничку index.html.
     Функция доступна только аутентифицированным пользователям. Если пользователь
     не авторизирован, происходит переадресация на страницу авторизации.
     """
     if request.method == 'POST':
         url_original = request.POST.get('url').lower()
+        expires_at = parse_ttl(request.POST.get('ttl'))
         message = ''
         short_url = ''
-        if check_url(url_original):
-            url_key = random_url()
+        if expires_at is False:
+            message = 'Срок действия ссылки должен быть целым положительным ' \
+                      'количеством часов.'
+        elif check_url(url_original):
             user_auth = request.user
-            u = UrlShortener(url_original=url_original, url_short=url_key,
-                             user=user_auth)
-            u.save()
+            url_key = None
+            if getattr(settings, 'SHORTENER_DEDUP', False) and \
+                    expires_at is None:
+                url_key = find_duplicate(url_original, user_auth)
+            if url_key is None:
+                url_key = key_allocator.allocate()
+                u = UrlShortener(url_original=url_original, url_short=url_key,
+                                 user=user_auth, expires_at=expires_at)
+                u.save()
             short_url = ''.join(('http://', request.get_host(), '/', url_key))
         else:
             message = 'Ваш URL не прошел проверку. Допускаются следующие ' \
                       'схемы: http, https, ftp.'
         return render(request, 'index.html', {'message': message,
                                               'current_url': url_original,
+                                              'ttl': request.POST.get('ttl'),
                                               'short_url': short_url})
     else:
         return render(request, 'index.html')
 
 
+@login_required(login_url='accounts/login')
+def bulk_handler(request):
+    """
+    Функция-обработчик массового сокращения ссылок. Принимает методом POST
+    загруженный файл (поле file формы) или тело запроса в формате CSV
+    (URL в первой колонке) либо JSON Lines (объекты с ключом url).
+    URL проверяются функцией check_url, ключи для них выделяются пачками
+    распределителем key_allocator, ссылки записываются через bulk_create
+    порциями. Ответ - StreamingHttpResponse с парами (оригинальный URL,
+    короткий URL) в том же формате, что и запрос; для URL, не прошедших
+    проверку, короткий URL пустой. Вход читается построчно, поэтому память
+    не зависит от размера загрузки.
+    """
+    if request.method != 'POST':
+        return HttpResponseNotAllowed(['POST'])
+    upload = request.FILES.get('file')
+    if upload is not None:
+        jsonl = is_jsonl(upload.content_type or '', upload.name)
+        stream = upload
+    else:
+        jsonl = is_jsonl(request.content_type or '')
+        stream = request
+    lines = text_lines(stream)
+    urls = read_jsonl(lines) if jsonl else read_csv(lines)
+    user = request.user
+    host = request.get_host()
+
+    def create_links(chunk):
+        urls_original = [url.strip().lower() for url in chunk]
+        valid = [url for url in urls_original if check_url(url)]
+        keys = key_allocator.allocate_many(len(valid))
+        UrlShortener.objects.bulk_create(
+            UrlShortener(url_original=url_original, url_short=url_key,
+                         user=user, url_hash=url_hash(url_original))
+            for url_original, url_key in zip(valid, keys))
+        # bulk_create не отправляет сигналы post_save
+        link_filter.publish(keys)
+        redirect_cache.prime(dict(zip(keys, valid)))
+        keys = iter(keys)
+        return [''.join(('http://', host, '/', next(keys)))
+                if check_url(url_original) else None
+                for url_original in urls_original]
+
+    content_type = 'application/x-ndjson' if jsonl else 'text/csv'
+    return StreamingHttpResponse(shorten_stream(urls, create_links, jsonl),
+                                 content_type=content_type)
+
+
 def url_handler(request, url_key):
     """
     Функция-обработчик, которая при переходе по ссылке с ключом вида
-    http://localhost:8000/<url_key> ищет ключ в базе. Если ключ не найден,
-    перенаправляет (производит HTTP редирект) на главную страницу.
+    http://localhost:8000/<url_key> ищет ключ в базе. Если ключ не найден
+    или срок действия ссылки истёк, перенаправляет (производит HTTP редирект)
+    на главную страницу.
+    Ключи, которых точно нет (по фильтру Блума link_filter и кешу),
+    отсеиваются без обращения к базе данных.
     Если найден, редиректит на полный URL, сохраненный под данным ключом,
     а также увеличивает счётчик редиректов redirect_count на 1.
+    Оригинальный URL берётся из кеша redirect_cache, к базе данных
+    обращение происходит только при промахе кеша. Счётчик увеличивается
+    в буфере redirect_counter, событие перехода добавляется в буфер
+    click_log; оба записываются в базу пачками.
+    """
+    if not link_filter.might_contain(url_key) and \
+            not redirect_cache.cached(url_key):
+        return HttpResponseRedirect('/')
+    url_original = redirect_cache.get(url_key)
+    if url_original:
+        redirect_counter.incr(url_key)
+        click_log.add(url_key, request)
+        return HttpResponseRedirect(url_original)
+    else:
+        return HttpResponseRedirect('/')
+
+
+# Отложенные задачи сброса буферов (ссылки хранятся, чтобы задачи
+# не были удалены сборщиком мусора до завершения)
+background_tasks = set()
+
+
+def defer(func):
     """
-    if find_url(url_key):
-        u = UrlShortener.objects.get(url_short=url_key)
-        u.redirect_count += 1
-        u.save()
-        return HttpResponseRedirect(find_url(url_key))
+    Функция запускает синхронную функцию func (сброс буфера в базу данных)
+    в отдельном потоке, не дожидаясь её завершения. После выполнения
+    соединение потока с базой данных закрывается.
+    """
+    def run():
+        try:
+            func()
+        finally:
+            connection.close()
+
+    task = asyncio.ensure_future(sync_to_async(run, thread_sensitive=False)())
+    background_tasks.add(task)
+    task.add_done_callback(background_tasks.discard)
+
+
+async def url_handler_async(request, url_key):
+    """
+    Асинхронный вариант url_handler для ASGI (см. short_url_project/asgi.py).
+    Попадания в фильтр Блума и LRU-кеш процесса обслуживаются без
+    блокирующих вызовов; обращения к кешу Django и базе данных выполняются
+    в потоках пула через sync_to_async(thread_sensitive=False), чтобы
+    запросы не выстраивались в очередь к одному общему потоку. Счётчик
+    и событие перехода добавляются в буферы, а их запись в базу
+    выполняется отложенно, после ответа.
+    """
+    if not await link_filter.amight_contain(url_key) and \
+            not await sync_to_async(redirect_cache.cached,
+                                    thread_sensitive=False)(url_key):
+        return HttpResponseRedirect('/')
+    url_original = await redirect_cache.aget(url_key)
+    if url_original:
+        if redirect_counter.incr(url_key, flush=False):
+            defer(redirect_counter.flush)
+        if click_log.add(url_key, request, flush=False):
+            defer(click_log.flush)
+        return HttpResponseRedirect(url_original)
     else:
         return HttpResponseRedirect('/')
 
 
+@login_required(login_url='accounts/login')
+def link_stats(request, url_key):
+    """
+    Функция-обработчик страницы статистики переходов по короткой ссылке.
+    Читает только заранее свёрнутые почасовые (за последние сутки) и
+    посуточные (за последние 30 дней) суммы из таблиц ClickHourly
+    и ClickDaily, без просмотра сырых событий. Доступна только автору ссылки.
+    """
+    link = get_object_or_404(UrlShortener, url_short=url_key,
+                             user=request.user)
+    now = timezone.now()
+    hourly = ClickHourly.objects.filter(
+        url_short=url_key, hour__gte=now - timedelta(days=1)).order_by('hour')
+    daily = ClickDaily.objects.filter(
+        url_short=url_key, day__gte=(now - timedelta(days=30)).date()
+    ).order_by('day')
+    return render(request, 'stats.html', {'link': link, 'hourly': hourly,
+                                          'daily': daily})
+
+
 def start(request):
     """
     Функция-обработчик, которая производит проверку аутентификации пользователя.
@@ -0,0 +1,27 @@
+from contextlib import contextmanager
+
+from django.db import connection
+from django.test.utils import setup_test_environment, \
+    teardown_test_environment
+
+
+@contextmanager
+def test_database(name=None):
+    """
+    Контекстный менеджер для бенчмарков: создаёт отдельную тестовую базу
+    данных (как при запуске manage.py test), чтобы не засорять рабочую
+    db.sqlite3, и удаляет её после завершения замеров. Также настраивается
+    тестовое окружение, чтобы можно было использовать тестовый клиент.
+    :param name: Имя файла тестовой базы; по умолчанию тестовая база
+    SQLite создаётся в памяти.
+    """
+    setup_test_environment()
+    old_name = connection.settings_dict['NAME']
+    if name is not None:
+        connection.settings_dict['TEST']['NAME'] = str(name)
+    connection.creation.create_test_db(verbosity=0, autoclobber=True)
+    try:
+        yield connection
+    finally:
+        connection.creation.destroy_test_db(old_name, verbosity=0)
+        teardown_test_environment()
@@ -0,0 +1,159 @@
+import json
+from pathlib import Path
+from time import perf_counter
+
+from django.conf import settings
+from django.contrib.auth.models import User
+from django.core.cache import caches
+from django.db import connection
+from django.test import Client
+from django.urls import URLResolver, get_resolver, reverse
+
+from blog.models import Post
+
+# Файл с допустимым количеством запросов и временем SQL для каждого URL
+BUDGETS_FILE = Path(__file__).resolve().parent / 'query_budgets.json'
+# Количество авторов и постов в тестовых данных: на первой странице списка
+# все посты разных авторов, поэтому запрос автора для каждого поста (N+1)
+# сразу превышает бюджет
+FIXTURE_AUTHORS = 6
+FIXTURE_POSTS = 12
+# Параметры GET-запроса для URL, которым они нужны
+URL_PARAMS = {'post_search': {'q': 'пост'}}
+# Бюджет времени SQL при обновлении бюджетов - измеренное время с запасом
+# TIME_MARGIN, но не меньше MIN_TIME_BUDGET_MS (у самых быстрых страниц
+# время сравнимо с погрешностью измерения)
+TIME_MARGIN = 3
+MIN_TIME_BUDGET_MS = 2.0
+# Количество измерений каждого URL: время SQL - наименьшее из них, чтобы
+# случайная задержка машины не выглядела превышением бюджета
+MEASURE_RUNS = 3
+
+
+class QueryRecorder:
+    """
+    Обёртка выполнения запросов (connection.execute_wrapper), считающая
+    запросы и суммарное время их выполнения.
+    """
+
+    def __init__(self):
+        self.count = 0
+        self.seconds = 0.0
+
+    def __call__(self, execute, sql, params, many, context):
+        start = perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.count += 1
+            self.seconds += perf_counter() - start
+
+
+def seed() -> User:
+    """
+    Функция создаёт тестовые данные: авторов и посты (через save(), чтобы
+    работали сигналы и поисковый индекс). Первый автор - пользователь,
+    от имени которого выполняются запросы, ему принадлежит первый пост.
+    :return: Пользователь для запросов.
+    """
+    authors = [User.objects.create_user(f'author{i}', password='password',
+                                        is_staff=True, is_superuser=i == 0)
+               for i in range(FIXTURE_AUTHORS)]
+    for i in range(FIXTURE_POSTS):
+        Post.objects.create(title=f'Пост {i}', text=f'Текст поста {i}. ' * 50,
+                            created_by=authors[i % FIXTURE_AUTHORS])
+    return authors[0]
+
+
+def url_cases(user) -> list:
+    """
+    Функция перечисляет все URL корневого URLconf: для каждого шаблона -
+    пара (имя, URL). Параметр pk заполняется id первого поста пользователя,
+    подключённые URLconf (админка) проверяются по странице index.
+    """
+    pk = Post.objects.filter(created_by=user).order_by('pk')[0].pk
+    cases = []
+    for pattern in get_resolver().url_patterns:
+        if isinstance(pattern, URLResolver):
+            name = pattern.namespace
+            url = reverse(f'{name}:index')
+        else:
+            name = pattern.name or str(pattern.pattern)
+            url = reverse(pattern.name, kwargs={
+                key: pk for key in pattern.pattern.converters})
+        cases.append((name, url))
+    return cases
+
+
+def measure(user, name: str, url: str) -> dict:
+    """
+    Функция выполняет GET-запрос от имени пользователя с пустым кешем
+    (худший случай) MEASURE_RUNS раз и возвращает код ответа, наибольшее
+    количество запросов к базе и наименьшее суммарное время SQL (мс).
+    """
+    queries, seconds = 0, None
+    for _ in range(MEASURE_RUNS):
+        caches[getattr(settings, 'BLOG_CACHE_ALIAS', 'default')].clear()
+        client = Client()
+        client.force_login(user)
+        recorder = QueryRecorder()
+        with connection.execute_wrapper(recorder):
+            response = client.get(url, URL_PARAMS.get(name, {}))
+        queries = max(queries, recorder.count)
+        seconds = min(recorder.seconds, seconds or recorder.seconds)
+    return {'url': url, 'status': response.status_code, 'queries': queries,
+            'sql_ms': round(seconds * 1000, 2)}
+
+
+def load_budgets(path=BUDGETS_FILE) -> dict:
+    with open(path, encoding='utf-8') as budgets:
+        return json.load(budgets)
+
+
+def save_budgets(report: dict, path=BUDGETS_FILE):
+    """
+    Функция записывает бюджеты по отчёту: количество запросов - как
+    измерено, время SQL - с запасом TIME_MARGIN, но не меньше
+    MIN_TIME_BUDGET_MS.
+    """
+    budgets = {name: {'queries': result['queries'],
+                      'sql_ms': max(round(result['sql_ms'] * TIME_MARGIN, 1),
+                                    MIN_TIME_BUDGET_MS)}
+               for name, result in report.items()}
+    with open(path, 'w', encoding='utf-8') as out:
+        json.dump(budgets, out, ensure_ascii=False, indent=2, sort_keys=True)
+        out.write('\n')
+
+
+def check_budgets(user, budgets: dict) -> dict:
+    """
+    Функция измеряет все URL и сравнивает результаты с бюджетами.
+    :param user: Пользователь для запросов (результат seed()).
+    :param budgets: Бюджеты {имя: {'queries': ..., 'sql_ms': ...}}.
+    :return: Отчёт {имя: результат measure с бюджетом и списком
+    нарушений violations}. URL без бюджета считается нарушением.
+    """
+    report = {}
+    for name, url in url_cases(user):
+        result = measure(user, name, url)
+        budget = budgets.get(name)
+        violations = []
+        if budget is None:
+            violations.append('нет бюджета')
+        else:
+            for key in ('queries', 'sql_ms'):
+                if result[key] > budget[key]:
+                    violations.append(f'{key}: {result[key]} > '
+                                      f'{budget[key]}')
+        result.update(budget=budget, violations=violations)
+        report[name] = result
+    return report
+
+
+def write_report(report: dict, stream):
+    """
+    Функция записывает отчёт в формате JSON с сортировкой ключей, чтобы
+    отчёты разных коммитов можно было сравнивать через diff.
+    """
+    stream.write(json.dumps(report, ensure_ascii=False, indent=2,
+                            sort_keys=True) + '\n')
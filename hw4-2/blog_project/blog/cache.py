@@ -0,0 +1,90 @@
+from uuid import uuid4
+
+from django.conf import settings
+from django.core.cache import caches
+from django.core.cache.backends.dummy import DummyCache
+from django.core.cache.backends.locmem import LocMemCache
+from django.template.loader import render_to_string
+
+# Префикс ключей блога в кеше Django
+CACHE_PREFIX = 'blog:'
+
+
+class VersionedCache:
+    """
+    Кеш записей, относящихся к объекту (посту или автору), с версией
+    объекта в ключе: blog:<name>:<id>:<версия>:<part>. При изменении
+    объекта версия заменяется новой случайной строкой (bump), и записи
+    со старой версией больше никогда не читаются, а со временем вытесняются
+    из кеша. Если запись с версией вытеснена, создаётся новая версия,
+    поэтому устаревшая запись не может снова стать видимой.
+    """
+
+    def __init__(self, name: str, alias=None, timeout=None):
+        self.name = name
+        self.alias = alias or getattr(settings, 'BLOG_CACHE_ALIAS', 'default')
+        self.timeout = timeout or getattr(settings, 'BLOG_CACHE_TIMEOUT',
+                                          3600)
+
+    @property
+    def cache(self):
+        return caches[self.alias]
+
+    def is_shared(self) -> bool:
+        """
+        Возвращает True, если кеш виден всем процессам: только тогда
+        bump из команды управления сбрасывает записи сервера.
+        """
+        return not isinstance(self.cache, (LocMemCache, DummyCache))
+
+    def version_key(self, obj_id) -> str:
+        return f'{CACHE_PREFIX}{self.name}:{obj_id}:version'
+
+    def version(self, obj_id) -> str:
+        """
+        Возвращает текущую версию объекта, при отсутствии создаёт её.
+        """
+        key = self.version_key(obj_id)
+        version = self.cache.get(key)
+        if version is None:
+            self.cache.add(key, uuid4().hex, None)
+            version = self.cache.get(key)
+        return version
+
+    def key(self, obj_id, part='') -> str:
+        return f'{CACHE_PREFIX}{self.name}:{obj_id}:{self.version(obj_id)}:' \
+               f'{part}'
+
+    def get(self, obj_id, part=''):
+        return self.cache.get(self.key(obj_id, part))
+
+    def set(self, obj_id, value, part=''):
+        self.cache.set(self.key(obj_id, part), value, self.timeout)
+
+    def bump(self, obj_id):
+        """
+        Делает недоступными все записи объекта obj_id.
+        """
+        self.cache.set(self.version_key(obj_id), uuid4().hex, None)
+
+
+# Отрисованное содержимое постов: (id автора, время изменения, html)
+# по id поста
+post_cache = VersionedCache('post')
+# Страницы списков постов авторов по id автора и курсору страницы
+author_cache = VersionedCache('author')
+
+
+def render_post(post) -> tuple:
+    """
+    Функция отрисовывает содержимое поста (шаблон post_body.html)
+    и сохраняет его в кеше post_cache вместе с id автора, который нужен
+    для проверки прав на редактирование без загрузки поста, и временем
+    изменения поста (валидатор условного GET).
+    :param post: Пост.
+    :return: Тройка (id автора, время изменения, html).
+    """
+    rendered = (post.created_by_id, post.updated_at,
+                render_to_string('post_body.html', {'object': post}))
+    post_cache.set(post.pk, rendered)
+    return rendered
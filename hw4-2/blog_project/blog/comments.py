@@ -0,0 +1,94 @@
+from django.db import transaction
+from django.db.models import F
+from django.template.loader import render_to_string
+from django.utils import timezone
+
+from blog.cache import post_cache
+from blog.models import MAX_COMMENT_DEPTH, PATH_SEGMENT, Comment, Post
+
+# Цифры 36-ричной системы для сегментов пути (по возрастанию кодов
+# символов, поэтому строки сегментов сравниваются как числа)
+DIGITS = '0123456789abcdefghijklmnopqrstuvwxyz'
+
+
+def path_segment(comment_id: int) -> str:
+    """
+    Функция кодирует id комментария в сегмент пути: PATH_SEGMENT цифр
+    36-ричной системы с ведущими нулями. Ответы на один комментарий
+    упорядочиваются по id, то есть по времени создания.
+    """
+    digits = []
+    while comment_id:
+        comment_id, digit = divmod(comment_id, 36)
+        digits.append(DIGITS[digit])
+    return ''.join(reversed(digits)).rjust(PATH_SEGMENT, '0')
+
+
+def add_comment(post, text: str, author=None, parent=None) -> Comment:
+    """
+    Функция добавляет комментарий к посту (ответ на parent, если он
+    указан) в одной транзакции: вставка, запись пути (для него нужен id
+    комментария) и увеличение счётчика комментариев поста. Время
+    изменения поста обновляется, чтобы сменились валидаторы условного
+    GET страниц поста и списков. Ответ на комментарий наибольшей
+    глубины MAX_COMMENT_DEPTH становится ответом на его родителя.
+    :param post: Пост.
+    :param text: Текст комментария.
+    :param author: Автор или None.
+    :param parent: Комментарий, на который дан ответ, или None.
+    :return: Созданный комментарий.
+    """
+    parent_path = parent.path if parent is not None else ''
+    if len(parent_path) >= PATH_SEGMENT * MAX_COMMENT_DEPTH:
+        parent_path = parent_path[:-PATH_SEGMENT]
+    with transaction.atomic():
+        comment = Comment(post=post, text=text, created_by=author)
+        comment.save()
+        comment.path = parent_path + path_segment(comment.pk)
+        Comment.objects.filter(pk=comment.pk).update(path=comment.path)
+        Post.objects.filter(pk=post.pk).update(
+            comment_count=F('comment_count') + 1, updated_at=timezone.now())
+    return comment
+
+
+class ThreadComment:
+    """
+    Комментарий в ветке обсуждения для шаблона comments.html: поля
+    комментария, имя автора и глубина вложенности.
+    """
+
+    def __init__(self, pk, path, text, created_at, author):
+        self.pk = pk
+        self.text = text
+        self.created_at = created_at
+        self.author = author
+        self.depth = len(path) // PATH_SEGMENT - 1
+
+
+def load_thread(post_id: int) -> list:
+    """
+    Функция загружает все комментарии поста одним запросом по индексу
+    (post, path) в порядке обхода дерева в глубину: каждый комментарий
+    идёт сразу после своего родителя и предыдущих ответов на него.
+    :param post_id: id поста.
+    :return: Список ThreadComment.
+    """
+    rows = Comment.objects.filter(post_id=post_id).order_by('path') \
+        .values_list('pk', 'path', 'text', 'created_at',
+                     'created_by__username')
+    return [ThreadComment(*row) for row in rows]
+
+
+def render_comments(post_id: int) -> str:
+    """
+    Функция отрисовывает ветку обсуждения поста (шаблон comments.html)
+    и сохраняет её в кеше post_cache. Дерево выводится одним циклом по
+    плоскому списку: отступ комментария задаётся его глубиной, поэтому
+    рекурсивное включение шаблонов не нужно.
+    :param post_id: id поста.
+    :return: html ветки обсуждения.
+    """
+    html = render_to_string('comments.html', {
+        'comments': load_thread(post_id), 'post_id': post_id})
+    post_cache.set(post_id, html, 'comments')
+    return html
@@ -0,0 +1,131 @@
+from functools import wraps
+from hashlib import md5
+
+from django.conf import settings
+from django.core.cache import caches
+from django.db import transaction
+from django.utils import timezone
+from django.utils.cache import patch_cache_control
+from django.views.decorators.http import condition
+
+from blog.cache import CACHE_PREFIX, post_cache
+from blog.models import Post
+
+# Ключ кеша со временем последнего удаления поста (общий и по id автора)
+DELETED_KEY = f'{CACHE_PREFIX}deleted_at'
+
+
+def make_etag(*parts) -> str:
+    """
+    Функция строит ETag из частей, от которых зависит содержимое страницы.
+    """
+    return md5(repr(parts).encode()).hexdigest()
+
+
+def deleted_key(author_id=None) -> str:
+    return DELETED_KEY if author_id is None else f'{DELETED_KEY}:{author_id}'
+
+
+def deleted_at(author_id=None):
+    """
+    Функция возвращает время последнего удаления поста (любого или автора
+    author_id). Если время неизвестно (запись вытеснена из кеша или сервер
+    перезапущен), им становится текущее время: Last-Modified может только
+    увеличиться, и устаревшая страница не будет подтверждена ответом 304.
+    """
+    cache = caches[getattr(settings, 'BLOG_CACHE_ALIAS', 'default')]
+    key = deleted_key(author_id)
+    value = cache.get(key)
+    if value is None:
+        cache.add(key, timezone.now(), None)
+        value = cache.get(key)
+    return value
+
+
+def mark_deleted(author_id=None):
+    """
+    Функция запоминает время удаления поста автора author_id. Внутри
+    транзакции время запоминается ещё раз после её фиксации, чтобы
+    страница, прочитанная до фиксации, не получила более позднюю отметку.
+    :param author_id: id автора удалённого поста или None.
+    """
+    cache = caches[getattr(settings, 'BLOG_CACHE_ALIAS', 'default')]
+
+    def mark():
+        now = timezone.now()
+        cache.set(deleted_key(), now, None)
+        if author_id is not None:
+            cache.set(deleted_key(author_id), now, None)
+
+    mark()
+    transaction.on_commit(mark)
+
+
+def post_validators(request, pk):
+    """
+    Функция вычисляет валидаторы страницы поста по времени его последнего
+    изменения: из кеша post_cache, а при промахе - запросом одного поля
+    по первичному ключу. Страница зависит от пользователя (ссылки
+    редактирования для автора), поэтому в ETag входит id пользователя.
+    :return: Пара (ETag, Last-Modified) или (None, None), если поста нет.
+    """
+    rendered = post_cache.get(pk)
+    if rendered is not None:
+        updated_at = rendered[1]
+    else:
+        updated_at = Post.objects.filter(pk=pk).values_list(
+            'updated_at', flat=True).first()
+    if updated_at is None:
+        return None, None
+    return make_etag(pk, updated_at, request.user.pk), updated_at
+
+
+def list_validators(request, paginator, author_id=None):
+    """
+    Функция вычисляет валидаторы страницы списка постов по тому же окну
+    курсорной пагинации, что и сама страница: id и время изменения
+    per_page + 1 постов, прочитанных по индексу. Новый пост, удаление
+    и изменение поста на странице меняют ETag. Last-Modified - наибольшее
+    время изменения постов окна или время последнего удаления (удаление
+    сдвигает окно, не меняя времени изменения оставшихся постов).
+    :param paginator: CursorPaginator списка.
+    :param author_id: id автора для списка постов автора.
+    :return: Пара (ETag, Last-Modified).
+    """
+    cursor = request.GET.get('page')
+    _, window = paginator.window(cursor)
+    rows = list(window.values_list('pk', 'updated_at'))
+    last_modified = max([updated_at for _, updated_at in rows] +
+                        [deleted_at(author_id)])
+    return make_etag(cursor, rows, request.user.pk), last_modified
+
+
+def conditional_view(validators):
+    """
+    Декоратор условного GET: валидаторы (ETag, Last-Modified) вычисляются
+    функцией validators один раз за запрос, и если у клиента актуальная
+    копия, ответ 304 возвращается без вызова представления и отрисовки
+    шаблонов. Ответы помечаются private, no-cache: браузер хранит копию,
+    но перед показом всегда проверяет её условным запросом.
+    :param validators: Функция (request, *args, **kwargs) -> (ETag,
+    Last-Modified).
+    """
+    def get_validators(request, *args, **kwargs):
+        if not hasattr(request, '_blog_validators'):
+            request._blog_validators = validators(request, *args, **kwargs)
+        return request._blog_validators
+
+    def decorator(view):
+        conditional = condition(
+            etag_func=lambda *args, **kwargs: get_validators(
+                *args, **kwargs)[0],
+            last_modified_func=lambda *args, **kwargs: get_validators(
+                *args, **kwargs)[1])(view)
+
+        @wraps(view)
+        def inner(request, *args, **kwargs):
+            response = conditional(request, *args, **kwargs)
+            patch_cache_control(response, private=True, no_cache=True)
+            return response
+        return inner
+    return decorator
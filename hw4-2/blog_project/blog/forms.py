@@ -1,8 +1,18 @@
 from django import forms
-from .models import Post
+from .models import Comment, Post
 
 
 class PostForm(forms.ModelForm):
     class Meta:
         model = Post
         fields = ['title', 'text']
+
+
+class CommentForm(forms.ModelForm):
+    # id комментария, на который дан ответ (в пределах целого SQLite)
+    parent = forms.IntegerField(required=False, widget=forms.HiddenInput,
+                                min_value=1, max_value=2 ** 63 - 1)
+
+    class Meta:
+        model = Comment
+        fields = ['text']
@@ -0,0 +1,97 @@
+from time import perf_counter
+
+from django.core.management.base import BaseCommand
+from django.db import connection
+from django.template.loader import render_to_string
+from django.test import Client
+from django.utils import timezone
+
+from blog.bench import test_database
+from blog.comments import add_comment, load_thread, path_segment
+from blog.management.commands.bench_slugs import QueryCounter
+from blog.models import PATH_SEGMENT, Comment, Post
+
+INSERT_COMMENT = 'INSERT INTO blog_comment (id, post_id, created_at, text, ' \
+                 'path) VALUES (%s, %s, %s, %s, %s)'
+
+
+def seed_comments(post, count: int, depth: int):
+    """
+    Создаёт count комментариев к посту: цепочки ответов глубиной depth,
+    каждый комментарий - ответ на последний комментарий предыдущего
+    уровня.
+    """
+    now = timezone.now()
+    last_paths = ['']
+    rows = []
+    for pk in range(1, count + 1):
+        level = (pk - 1) % depth
+        path = last_paths[level] + path_segment(pk)
+        del last_paths[level + 1:]
+        last_paths.append(path)
+        rows.append((pk, post.pk, now, f'Комментарий {pk}', path))
+    with connection.cursor() as cur:
+        cur.executemany(INSERT_COMMENT, rows)
+    Post.objects.filter(pk=post.pk).update(comment_count=count)
+
+
+def naive_thread(post_id: int, path='') -> list:
+    """
+    Загрузка ветки "как при ссылке на родителя": отдельный запрос ответов
+    для каждого комментария (рекурсивный обход).
+    """
+    children = Comment.objects.filter(
+        post_id=post_id, path__startswith=path).extra(
+        where=['LENGTH(path) = %s'], params=[len(path) + PATH_SEGMENT]
+    ).order_by('path').values_list('path', flat=True)
+    thread = []
+    for child in children:
+        thread.append(child)
+        thread.extend(naive_thread(post_id, child))
+    return thread
+
+
+class Command(BaseCommand):
+    help = 'Измеряет загрузку и отрисовку ветки комментариев поста ' \
+           '(по умолчанию 50 000 комментариев с вложенностью 20 уровней) ' \
+           'и добавление комментария (на временной тестовой базе данных).'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--comments', type=int, default=50000,
+                            help='Количество комментариев.')
+        parser.add_argument('--depth', type=int, default=20,
+                            help='Глубина вложенности.')
+
+    def timed(self, name: str, func):
+        queries = QueryCounter()
+        with connection.execute_wrapper(queries):
+            start = perf_counter()
+            result = func()
+            elapsed = perf_counter() - start
+        self.stdout.write(f'{name:<38} {elapsed * 1000:>9.1f} мс, '
+                          f'запросов: {queries.count}')
+        return result
+
+    def handle(self, *args, **options):
+        with test_database():
+            post = Post.objects.create(title='Обсуждение', text='текст')
+            seed_comments(post, options['comments'], options['depth'])
+            thread = self.timed('загрузка ветки (путь)',
+                                lambda: load_thread(post.pk))
+            naive = self.timed('загрузка ветки (запрос на комментарий)',
+                               lambda: naive_thread(post.pk))
+            assert len(naive) == len(thread) == options['comments']
+            html = self.timed('отрисовка comments.html', lambda: (
+                render_to_string('comments.html', {
+                    'comments': thread, 'post_id': post.pk})))
+            self.stdout.write(f'размер html: {len(html) / 2 ** 20:.1f} МБ, '
+                              f'глубина: {max(c.depth for c in thread) + 1}')
+            deepest = Comment.objects.order_by('-path')[0]
+            self.timed('add_comment на глубине '
+                       f'{deepest.depth + 2}',
+                       lambda: add_comment(post, 'ответ', parent=deepest))
+            client = Client()
+            self.timed('страница поста, промах кеша',
+                       lambda: client.get(f'/post/{post.pk}/'))
+            self.timed('страница поста из кеша',
+                       lambda: client.get(f'/post/{post.pk}/'))
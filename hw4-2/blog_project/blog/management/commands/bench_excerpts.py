@@ -0,0 +1,68 @@
+from time import perf_counter
+
+from django.contrib.auth.models import AnonymousUser, User
+from django.core.management.base import BaseCommand
+from django.db import connection
+from django.shortcuts import render
+from django.test import RequestFactory
+
+from blog.bench import test_database
+from blog.models import Post
+from blog.pagination import CursorPaginator
+from blog.views import list_queryset
+
+
+def fetched_bytes(queryset) -> int:
+    """
+    Выполняет SQL-запрос набора записей напрямую и возвращает суммарный
+    размер полученных значений в байтах (строки - в UTF-8).
+    """
+    query, params = queryset.query.sql_with_params()
+    with connection.cursor() as cur:
+        cur.execute(query, params)
+        return sum(len(str(value).encode()) for row in cur.fetchall()
+                   for value in row if value is not None)
+
+
+class Command(BaseCommand):
+    help = 'Сравнивает объём загружаемых данных и время отрисовки ' \
+           'страницы списка постов с полными текстами и с анонсами ' \
+           '(на временной тестовой базе данных).'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--posts', type=int, default=1000,
+                            help='Количество постов.')
+        parser.add_argument('--size', type=int, default=100,
+                            help='Размер текста поста (КБ).')
+        parser.add_argument('--per-page', type=int, default=50,
+                            help='Количество постов на странице.')
+        parser.add_argument('--repeat', type=int, default=20,
+                            help='Количество повторов замера.')
+
+    def handle(self, *args, **options):
+        text = ('Длинный текст поста. ' * 100000)[:options['size'] * 512]
+        per_page = options['per_page']
+        request = RequestFactory().get('/')
+        request.user = AnonymousUser()
+        with test_database():
+            author = User.objects.create(username='author')
+            posts = []
+            for i in range(options['posts']):
+                post = Post(title=f'Пост {i}', text=text, slug=f'post-{i}',
+                            created_by=author)
+                post.update_summary()
+                posts.append(post)
+            Post.objects.bulk_create(posts, batch_size=100)
+            for name, queryset in (('полные посты', Post.objects.all()),
+                                   ('анонсы', list_queryset())):
+                page = queryset.order_by('-created_at', '-pk')[:per_page]
+                size = fetched_bytes(page)
+                paginator = CursorPaginator(queryset, per_page)
+                start = perf_counter()
+                for _ in range(options['repeat']):
+                    response = render(request, 'home.html', {
+                        'page_obj': paginator.get_page(None)})
+                latency = (perf_counter() - start) / options['repeat']
+                assert response.status_code == 200
+                self.stdout.write(f'{name:<13} {size / 1024:>9.1f} КБ '
+                                  f'на страницу, {latency * 1000:>7.1f} мс')
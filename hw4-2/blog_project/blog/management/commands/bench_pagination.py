@@ -0,0 +1,94 @@
+from datetime import timedelta
+from time import perf_counter
+
+from django.contrib.auth.models import AnonymousUser, User
+from django.core.management.base import BaseCommand
+from django.core.paginator import Paginator
+from django.db import connection
+from django.shortcuts import render
+from django.test import RequestFactory
+from django.utils import timezone
+
+from blog.bench import test_database
+from blog.models import Post
+from blog.pagination import NEXT, encode_cursor
+from blog.views import post_author_list, post_list
+
+
+def seed_posts(count: int, authors: list, chunk=50000):
+    """
+    Добавляет count постов (created_at растёт на секунду с каждым постом,
+    авторы чередуются) пачками через executemany, минуя ORM.
+    """
+    query = 'INSERT INTO blog_post (title, text, slug, created_by_id, ' \
+            'created_at) VALUES (%s, %s, %s, %s, %s)'
+    start = timezone.now() - timedelta(seconds=count)
+    with connection.cursor() as cur:
+        for offset in range(0, count, chunk):
+            cur.executemany(query, [
+                (f'Пост {i}', 'текст', f'post-{i}',
+                 authors[i % len(authors)].pk,
+                 start + timedelta(seconds=i))
+                for i in range(offset, min(offset + chunk, count))])
+
+
+def offset_view(request, queryset, number):
+    """
+    Исходный вариант списка: Paginator с COUNT(*) и OFFSET.
+    """
+    page_obj = Paginator(queryset.order_by('-created_at'), 5).get_page(number)
+    return render(request, 'home.html', {'page_obj': page_obj})
+
+
+class Command(BaseCommand):
+    help = 'Сравнивает время отрисовки первой и глубокой страницы списков ' \
+           'постов с пагинацией через OFFSET и с курсорной пагинацией ' \
+           '(на временной тестовой базе данных).'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--posts', type=int, default=1000000,
+                            help='Количество постов.')
+        parser.add_argument('--page', type=int, default=10000,
+                            help='Номер глубокой страницы.')
+        parser.add_argument('--repeat', type=int, default=20,
+                            help='Количество повторов каждого замера.')
+
+    def measure(self, func, repeat):
+        start = perf_counter()
+        for _ in range(repeat):
+            response = func()
+        assert response.status_code == 200
+        return (perf_counter() - start) / repeat * 1000
+
+    def handle(self, *args, **options):
+        factory = RequestFactory()
+        repeat = options['repeat']
+        with test_database():
+            authors = [User.objects.create(username=f'author{i}')
+                       for i in range(10)]
+            seed_posts(options['posts'], authors)
+            author = authors[0]
+            lists = (
+                ('post_list', Post.objects.all(), post_list,
+                 AnonymousUser()),
+                ('post_author_list', Post.objects.filter(created_by=author),
+                 post_author_list, author),
+            )
+            for name, queryset, view, user in lists:
+                for number in (1, options['page']):
+                    cursor = ''
+                    if number > 1:
+                        cursor = encode_cursor(NEXT, queryset.order_by(
+                            '-created_at', '-pk')[(number - 1) * 5 - 1])
+                    request = factory.get('/', {'page': number})
+                    request.user = user
+                    offset = self.measure(
+                        lambda: offset_view(request, queryset, number),
+                        repeat)
+                    cursor_request = factory.get('/', {'page': cursor})
+                    cursor_request.user = user
+                    keyset = self.measure(lambda: view(cursor_request),
+                                          repeat)
+                    self.stdout.write(
+                        f'{name:<17} страница {number:>6}: OFFSET '
+                        f'{offset:>8.2f} мс, курсор {keyset:>6.2f} мс')
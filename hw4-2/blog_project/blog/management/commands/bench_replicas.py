@@ -0,0 +1,88 @@
+from pathlib import Path
+from tempfile import TemporaryDirectory
+from threading import Event, Thread
+from time import perf_counter
+
+from django.core.management.base import BaseCommand
+from django.db import connections
+from django.test import Client, override_settings
+
+from blog.bench import test_database
+from blog.models import Post
+from blog.replication import Replicator, replicate
+from blog.timing import percentile
+
+
+class Command(BaseCommand):
+    help = 'Измеряет чтение главной страницы несколькими потоками при ' \
+           'одновременной записи постов: все запросы к основной базе и ' \
+           'чтение с реплики, обновляемой backup API (на временных ' \
+           'файлах баз данных).'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--readers', type=int, default=4,
+                            help='Количество читающих потоков.')
+        parser.add_argument('--seconds', type=float, default=10,
+                            help='Длительность каждого замера (с).')
+        parser.add_argument('--posts', type=int, default=10000,
+                            help='Количество постов в базе.')
+        parser.add_argument('--interval', type=float, default=1,
+                            help='Период репликации (с).')
+
+    def reader(self, stop: Event, latencies: list):
+        client = Client()
+        while not stop.is_set():
+            start = perf_counter()
+            response = client.get('/')
+            latencies.append(perf_counter() - start)
+            assert response.status_code == 200
+        connections.close_all()
+
+    def writer(self, stop: Event, written: list):
+        while not stop.is_set():
+            Post.objects.create(title='Новый пост', text='текст')
+            written.append(1)
+        connections.close_all()
+
+    def run(self, readers: int, seconds: float):
+        stop = Event()
+        latencies, written = [], []
+        threads = [Thread(target=self.reader, args=(stop, latencies))
+                   for _ in range(readers)]
+        threads.append(Thread(target=self.writer, args=(stop, written)))
+        for thread in threads:
+            thread.start()
+        stop.wait(seconds)
+        stop.set()
+        for thread in threads:
+            thread.join()
+        return sorted(latencies), len(written)
+
+    def handle(self, *args, **options):
+        with TemporaryDirectory() as tmp, \
+                test_database(Path(tmp, 'primary.sqlite3')):
+            replica = connections['replica'].settings_dict
+            replica_name, replica['NAME'] = replica['NAME'], str(
+                Path(tmp, 'replica.sqlite3'))
+            Post.objects.bulk_create(
+                Post(title=f'Пост {i}', text='текст', slug=f'post-{i}')
+                for i in range(options['posts']))
+            replicate(['replica'])
+            for name, aliases in (('основная база', []),
+                                  ('реплика', ['replica'])):
+                replicator = Replicator(options['interval'], aliases)
+                with override_settings(BLOG_REPLICAS=aliases):
+                    if aliases:
+                        replicator.start()
+                    latencies, written = self.run(options['readers'],
+                                                  options['seconds'])
+                    if aliases:
+                        replicator.stop()
+                seconds = options['seconds']
+                self.stdout.write(
+                    f'{name:<14} чтение {len(latencies) / seconds:>6.0f} '
+                    f'запросов/с, p50 {percentile(latencies, 50) * 1000:>6.1f}'
+                    f' мс, p95 {percentile(latencies, 95) * 1000:>6.1f} мс, '
+                    f'запись {written / seconds:>5.0f} постов/с')
+            connections['replica'].close()
+            replica['NAME'] = replica_name
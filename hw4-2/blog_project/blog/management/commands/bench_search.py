@@ -0,0 +1,83 @@
+from random import choice, randrange, seed
+from time import perf_counter
+
+from django.core.management.base import BaseCommand
+from django.db import connection
+from django.db.models import Q
+
+from blog.bench import test_database
+from blog.models import Post
+from blog.search import rebuild_index, search_posts
+
+# Слоги для генерации словаря случайных слов
+SYLLABLES = ['ка', 'ро', 'ми', 'ту', 'ле', 'на', 'зо', 'вы', 'пе', 'ду',
+             'ри', 'со', 'ба', 'ге', 'лю', 'ча']
+
+
+def seed_posts(count: int, vocabulary: list, words=60, chunk=20000):
+    """
+    Добавляет count постов из случайных слов словаря vocabulary (первые
+    слова словаря встречаются чаще) пачками через executemany, минуя ORM.
+    """
+    query = 'INSERT INTO blog_post (title, text, slug, created_at) ' \
+            "VALUES (%s, %s, %s, datetime('now'))"
+
+    def word():
+        return vocabulary[min(randrange(len(vocabulary)),
+                              randrange(len(vocabulary)))]
+
+    with connection.cursor() as cur:
+        for offset in range(0, count, chunk):
+            cur.executemany(query, [
+                (' '.join(word() for _ in range(5)).capitalize(),
+                 ' '.join(word() for _ in range(words)) + '.',
+                 f'post-{i}')
+                for i in range(offset, min(offset + chunk, count))])
+
+
+class Command(BaseCommand):
+    help = 'Сравнивает время поиска постов через icontains и через ' \
+           'полнотекстовый индекс FTS5 (на временной тестовой базе данных).'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--posts', type=int, default=500000,
+                            help='Количество постов.')
+        parser.add_argument('--repeat', type=int, default=5,
+                            help='Количество повторов каждого замера.')
+
+    def measure(self, func, repeat):
+        start = perf_counter()
+        for _ in range(repeat):
+            result = func()
+        return (perf_counter() - start) / repeat * 1000, result
+
+    def handle(self, *args, **options):
+        seed(0)
+        vocabulary = sorted({''.join(choice(SYLLABLES)
+                                     for _ in range(randrange(2, 5)))
+                             for _ in range(20000)}, key=len)
+        repeat = options['repeat']
+        with test_database():
+            start = perf_counter()
+            seed_posts(options['posts'], vocabulary)
+            self.stdout.write(f'Вставка {options["posts"]} постов: '
+                              f'{perf_counter() - start:.1f} с')
+            start = perf_counter()
+            rebuild_index()
+            self.stdout.write(f'Построение индекса FTS5: '
+                              f'{perf_counter() - start:.1f} с')
+            for label, word in (
+                    ('частое слово', vocabulary[0]),
+                    ('редкое слово', vocabulary[len(vocabulary) // 2]),
+                    ('нет совпадений', 'несуществующее')):
+                queryset = Post.objects.filter(
+                    Q(title__icontains=word) | Q(text__icontains=word))
+                icontains, count = self.measure(
+                    lambda: (len(queryset.order_by('-created_at')[:10]),
+                             queryset.count())[1], repeat)
+                fts, page = self.measure(lambda: search_posts(word),
+                                         repeat)
+                self.stdout.write(
+                    f'{label:<15} ({word}, {count} постов): icontains '
+                    f'{icontains:>8.1f} мс, FTS5 {fts:>6.1f} мс '
+                    f'({len(page)} на странице)')
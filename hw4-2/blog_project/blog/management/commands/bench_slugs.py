@@ -0,0 +1,85 @@
+from random import randint
+from time import perf_counter
+
+from django.core.management.base import BaseCommand
+from django.db import connection, models
+from pytils.translit import slugify
+
+from blog.bench import test_database
+from blog.models import Post
+from blog.slugs import allocate_slugs
+
+
+def legacy_save(post):
+    """
+    Сохранение поста с исходной схемой выбора слага: проверка каждого
+    варианта отдельным запросом и дописывание случайного суффикса.
+    """
+    post.slug = slugify(post.title)
+    while Post.objects.filter(slug=post.slug).exists():
+        post.slug = f'{post.slug}-{randint(1, 100)}'
+    models.Model.save(post)
+
+
+class QueryCounter:
+    """
+    Обёртка выполнения запросов (connection.execute_wrapper), считающая
+    запросы без сохранения их текста.
+    """
+
+    def __init__(self):
+        self.count = 0
+
+    def __call__(self, execute, sql, params, many, context):
+        self.count += 1
+        return execute(sql, params, many, context)
+
+
+class Command(BaseCommand):
+    help = 'Измеряет скорость создания постов с одинаковым заголовком: ' \
+           'исходный подбор слага, Post.save с поиском следующего суффикса ' \
+           'одним запросом и пакетный allocate_slugs с bulk_create ' \
+           '(на временной тестовой базе данных).'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--posts', type=int, default=10000,
+                            help='Количество создаваемых постов.')
+        parser.add_argument('--batch-size', type=int, default=1000,
+                            help='Размер пачки для bulk_create.')
+
+    def bulk_save(self, count, batch_size):
+        for offset in range(0, count, batch_size):
+            titles = ['Одинаковый заголовок'] * min(batch_size,
+                                                    count - offset)
+            Post.objects.bulk_create(
+                Post(title=title, text='текст', slug=slug)
+                for title, slug in zip(titles,
+                                       allocate_slugs(Post.objects, titles)))
+
+    def handle(self, *args, **options):
+        count = options['posts']
+        schemes = (
+            ('исходный', lambda: [legacy_save(Post(
+                title='Одинаковый заголовок', text='текст'))
+                for _ in range(count)]),
+            ('Post.save', lambda: [Post(
+                title='Одинаковый заголовок', text='текст').save()
+                for _ in range(count)]),
+            ('allocate_slugs', lambda: self.bulk_save(
+                count, options['batch_size'])),
+        )
+        with test_database():
+            for name, create in schemes:
+                Post.objects.all().delete()
+                queries = QueryCounter()
+                with connection.execute_wrapper(queries):
+                    start = perf_counter()
+                    create()
+                    elapsed = perf_counter() - start
+                slugs = Post.objects.values_list('slug', flat=True)
+                lengths = [len(slug) for slug in slugs]
+                self.stdout.write(
+                    f'{name:<15} {count / elapsed:>8.0f} постов/с, '
+                    f'{queries.count / count:.2f} запросов на пост, '
+                    f'длина слага: средняя {sum(lengths) / count:.1f}, '
+                    f'максимальная {max(lengths)}')
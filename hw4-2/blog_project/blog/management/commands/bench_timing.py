@@ -0,0 +1,86 @@
+from time import perf_counter
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.template import engines
+from django.test import Client, override_settings
+
+from blog.bench import test_database
+from blog.models import Post
+from blog.timing import TimedTemplate
+
+# Middleware замера времени в settings.MIDDLEWARE
+TIMING_MIDDLEWARE = 'blog.timing.ServerTimingMiddleware'
+
+
+def configurations():
+    """
+    Возвращает настройки для сравнения: проект без замера времени
+    (стандартный DjangoTemplates, без middleware), замер выключен,
+    замер включён.
+    """
+    plain_templates = [dict(settings.TEMPLATES[0], BACKEND=(
+        'django.template.backends.django.DjangoTemplates'))]
+    plain_middleware = [name for name in settings.MIDDLEWARE
+                        if name != TIMING_MIDDLEWARE]
+    return (('без замера', {'TEMPLATES': plain_templates,
+                            'MIDDLEWARE': plain_middleware}),
+            ('выключен', {'BLOG_SERVER_TIMING': False}),
+            ('включён', {'BLOG_SERVER_TIMING': True}))
+
+
+class Command(BaseCommand):
+    help = 'Сравнивает время обработки запроса главной страницы без ' \
+           'замера времени, с выключенным и с включённым ' \
+           'ServerTimingMiddleware, а также время вызова render ' \
+           'шаблона без замера (на временной тестовой базе данных).'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--requests', type=int, default=500,
+                            help='Количество запросов в одном замере.')
+        parser.add_argument('--rounds', type=int, default=5,
+                            help='Количество замеров (берётся лучший).')
+
+    def time_requests(self, count: int) -> float:
+        client = Client()
+        client.get('/')
+        start = perf_counter()
+        for _ in range(count):
+            client.get('/')
+        return (perf_counter() - start) / count
+
+    def time_render(self, template, count: int) -> float:
+        start = perf_counter()
+        for _ in range(count):
+            template.render({})
+        return (perf_counter() - start) / count
+
+    def handle(self, *args, **options):
+        count = options['requests']
+        with test_database():
+            Post.objects.bulk_create(
+                Post(title=f'Пост {i}', text='текст', slug=f'post-{i}')
+                for i in range(20))
+            best = {}
+            # Конфигурации чередуются в каждом раунде, чтобы фоновая
+            # нагрузка одинаково влияла на все замеры
+            for _ in range(options['rounds']):
+                for name, overrides in configurations():
+                    with override_settings(**overrides):
+                        latency = self.time_requests(count)
+                    best[name] = min(best.get(name, latency), latency)
+            for name, latency in best.items():
+                overhead = (latency / best['без замера'] - 1) * 100
+                self.stdout.write(f'{name:<11} {latency * 1e6:>8.1f} мкс на '
+                                  f'запрос ({overhead:+.1f}%)')
+            template = engines.all()[0].from_string('{{ value }}')
+            plain = template.template
+            assert isinstance(template, TimedTemplate)
+            render = min(self.time_render(plain, count * 10)
+                         for _ in range(options['rounds']))
+            timed = min(self.time_render(template, count * 10)
+                        for _ in range(options['rounds']))
+            self.stdout.write(f'render шаблона: {render * 1e9:.0f} нс, '
+                              f'через TimedTemplate без замера '
+                              f'{timed * 1e9:.0f} нс '
+                              f'({(timed - render) * 1e9:+.0f} нс)')
@@ -0,0 +1,90 @@
+import json
+import resource
+import subprocess
+import sys
+from pathlib import Path
+from tempfile import TemporaryDirectory
+from time import perf_counter
+
+from django.conf import settings
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand
+
+from blog.bench import test_database
+from blog.transfer import export_posts, import_posts
+
+# Количество авторов в сгенерированном файле
+AUTHORS = 100
+
+
+def write_posts(path, count: int, size: int):
+    """
+    Записывает в файл count постов в формате export_posts: заголовки
+    повторяются (общие основы слагов), авторы - AUTHORS пользователей.
+    """
+    text = ('Текст импортируемого поста. ' * 1000)[:size]
+    with open(path, 'w', encoding='utf-8') as stream:
+        for i in range(count):
+            stream.write(json.dumps({
+                'title': f'Импорт {i % 1000}', 'text': f'{i} {text}',
+                'author': f'author{i % AUTHORS}',
+                'created_at': '2021-11-01T12:00:00+00:00'},
+                ensure_ascii=False) + '\n')
+
+
+def peak_rss() -> float:
+    """
+    Возвращает пиковый размер резидентной памяти процесса (МБ, Linux).
+    """
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+
+class Command(BaseCommand):
+    help = 'Измеряет скорость и пиковый расход памяти import_posts ' \
+           'и export_posts для разного количества постов. Каждый замер ' \
+           'выполняется в отдельном процессе на временной тестовой базе ' \
+           'в файле.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--posts', type=int, nargs='+',
+                            default=[1000, 10000, 100000],
+                            help='Количество постов для замеров.')
+        parser.add_argument('--size', type=int, default=1000,
+                            help='Размер текста поста (символов).')
+        parser.add_argument('--worker', action='store_true',
+                            help='Выполнить один замер в текущем процессе '
+                                 '(используется самим бенчмарком).')
+
+    def measure(self, count: int, size: int):
+        settings.DEBUG = False
+        with TemporaryDirectory() as tmp:
+            source, target = Path(tmp, 'in.jsonl'), Path(tmp, 'out.jsonl')
+            write_posts(source, count, size)
+            with test_database(Path(tmp, 'bench.sqlite3')):
+                User.objects.bulk_create(User(username=f'author{i}')
+                                         for i in range(AUTHORS))
+                start = perf_counter()
+                with open(source, encoding='utf-8') as stream:
+                    imported, _ = import_posts(stream)
+                import_time = perf_counter() - start
+                start = perf_counter()
+                with open(target, 'w', encoding='utf-8') as stream:
+                    exported = export_posts(stream)
+                export_time = perf_counter() - start
+        assert imported == exported == count
+        self.stdout.write(f'{count:>9} постов: '
+                          f'импорт {count / import_time:>7.0f} постов/с, '
+                          f'экспорт {count / export_time:>7.0f} постов/с, '
+                          f'пик RSS {peak_rss():>6.1f} МБ')
+
+    def handle(self, *args, **options):
+        if options['worker']:
+            for count in options['posts']:
+                self.measure(count, options['size'])
+            return
+        for count in options['posts']:
+            result = subprocess.run(
+                [sys.executable, sys.argv[0], 'bench_transfer', '--worker',
+                 '--posts', str(count), '--size', str(options['size'])],
+                capture_output=True, text=True, check=True)
+            self.stdout.write(result.stdout.rstrip())
@@ -0,0 +1,36 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from blog.bench import test_database
+from blog.budget import check_budgets, load_budgets, save_budgets, seed, \
+    write_report
+
+
+class Command(BaseCommand):
+    help = 'Выполняет все URL проекта на тестовых данных (на временной ' \
+           'тестовой базе данных), сравнивает количество запросов и время ' \
+           'SQL с бюджетами из blog/query_budgets.json и выводит отчёт JSON.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--report', '-o', default='-',
+                            help='Файл для отчёта (по умолчанию - stdout).')
+        parser.add_argument('--update', action='store_true',
+                            help='Записать измеренные значения как новые '
+                                 'бюджеты.')
+
+    def handle(self, *args, **options):
+        with test_database():
+            user = seed()
+            if options['update']:
+                save_budgets(check_budgets(user, {}))
+            report = check_budgets(user, load_budgets())
+        if options['report'] == '-':
+            write_report(report, self.stdout)
+        else:
+            with open(options['report'], 'w', encoding='utf-8') as stream:
+                write_report(report, stream)
+        failed = {name: result['violations']
+                  for name, result in report.items() if result['violations']}
+        if failed:
+            raise CommandError('Превышены бюджеты запросов: ' + '; '.join(
+                f'{name} ({", ".join(violations)})'
+                for name, violations in sorted(failed.items())))
@@ -0,0 +1,24 @@
+from django.core.management.base import BaseCommand
+
+from blog.transfer import EXPORT_CHUNK_SIZE, export_posts
+
+
+class Command(BaseCommand):
+    help = 'Выгружает посты в формате JSON Lines (один пост на строку) ' \
+           'потоково, без загрузки всех постов в память.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--output', '-o', default='-',
+                            help='Файл для записи (по умолчанию - stdout).')
+        parser.add_argument('--chunk-size', type=int,
+                            default=EXPORT_CHUNK_SIZE,
+                            help='Количество строк, читаемых из базы '
+                                 'за один раз.')
+
+    def handle(self, *args, **options):
+        if options['output'] == '-':
+            count = export_posts(self.stdout, options['chunk_size'])
+        else:
+            with open(options['output'], 'w', encoding='utf-8') as stream:
+                count = export_posts(stream, options['chunk_size'])
+        self.stderr.write(f'Выгружено постов: {count}')
@@ -0,0 +1,37 @@
+import sys
+
+from django.core.management.base import BaseCommand, CommandError
+
+from blog.cache import author_cache
+from blog.transfer import IMPORT_BATCH_SIZE, import_posts
+
+
+class Command(BaseCommand):
+    help = 'Загружает посты из файла JSON Lines (формат export_posts) ' \
+           'пачками через bulk_create.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('input', help='Файл для чтения (- для stdin).')
+        parser.add_argument('--batch-size', type=int,
+                            default=IMPORT_BATCH_SIZE,
+                            help='Количество постов в одной пачке.')
+
+    def handle(self, *args, **options):
+        if not author_cache.is_shared():
+            self.stderr.write('Кеш BLOG_CACHE_ALIAS не общий для процессов: '
+                              'сервер будет показывать старые списки постов '
+                              'авторов до истечения BLOG_CACHE_TIMEOUT.')
+        try:
+            if options['input'] == '-':
+                count, missing = import_posts(sys.stdin,
+                                              options['batch_size'])
+            else:
+                with open(options['input'], encoding='utf-8') as stream:
+                    count, missing = import_posts(stream,
+                                                  options['batch_size'])
+        except (OSError, ValueError) as exc:
+            raise CommandError(exc)
+        if missing:
+            self.stderr.write(f'Авторы не найдены, посты импортированы без '
+                              f'автора: {", ".join(sorted(missing))}')
+        self.stdout.write(f'Импортировано постов: {count}')
@@ -0,0 +1,14 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from blog.search import rebuild_index, search_enabled
+
+
+class Command(BaseCommand):
+    help = 'Полностью перестраивает полнотекстовый индекс постов (FTS5).'
+
+    def handle(self, *args, **options):
+        if not search_enabled():
+            raise CommandError('Полнотекстовый поиск поддерживается только '
+                               'для SQLite')
+        count = rebuild_index()
+        self.stdout.write(f'Проиндексировано постов: {count}')
@@ -0,0 +1,31 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from blog.replication import Replicator, replicate
+from blog.routers import replicas
+
+
+class Command(BaseCommand):
+    help = 'Копирует основную базу SQLite в реплики BLOG_REPLICAS через ' \
+           'backup API: один раз (--once) или периодически, пока команда ' \
+           'не будет остановлена.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--once', action='store_true',
+                            help='Скопировать один раз и завершиться.')
+        parser.add_argument('--interval', type=float,
+                            help='Период копирования (с), по умолчанию - '
+                                 'BLOG_REPLICATION_INTERVAL.')
+
+    def handle(self, *args, **options):
+        if not replicas():
+            raise CommandError('Реплики не настроены (BLOG_REPLICAS)')
+        if options['once']:
+            aliases = replicate()
+            self.stdout.write(f'Скопировано в: {", ".join(aliases)}')
+            return
+        replicator = Replicator(options['interval'])
+        replicator.start()
+        try:
+            replicator.join()
+        except KeyboardInterrupt:
+            replicator.stop()
@@ -0,0 +1,20 @@
+# Generated by Django 3.2.25 on 2026-10-18 13:33
+
+import blog.slugs
+from django.db import migrations, models
+import django.db.models.expressions
+import django.db.models.functions.text
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('blog', '0004_alter_post_slug'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='post',
+            index=models.Index(blog.slugs.SlugStem('slug'), django.db.models.functions.text.Length('slug'), django.db.models.expressions.F('slug'), name='blog_post_slug_stem'),
+        ),
+    ]
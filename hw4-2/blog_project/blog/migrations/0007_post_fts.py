@@ -0,0 +1,36 @@
+from django.db import migrations
+
+from blog.search import FTS_TABLE
+
+
+def create_fts_table(apps, schema_editor):
+    """
+    Создаёт полнотекстовый индекс FTS5 по заголовкам и текстам постов
+    и заполняет его существующими постами. FTS5 есть только в SQLite,
+    для других баз данных поиск отключён.
+    """
+    if schema_editor.connection.vendor != 'sqlite':
+        return
+    schema_editor.execute(
+        f"CREATE VIRTUAL TABLE {FTS_TABLE} USING fts5("
+        f"title, text, tokenize='unicode61 remove_diacritics 2')")
+    schema_editor.execute(
+        f'INSERT INTO {FTS_TABLE} (rowid, title, text) '
+        f'SELECT id, title, text FROM blog_post')
+
+
+def drop_fts_table(apps, schema_editor):
+    if schema_editor.connection.vendor != 'sqlite':
+        return
+    schema_editor.execute(f'DROP TABLE IF EXISTS {FTS_TABLE}')
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('blog', '0006_post_list_indexes'),
+    ]
+
+    operations = [
+        migrations.RunPython(create_fts_table, drop_fts_table),
+    ]
@@ -0,0 +1,49 @@
+# Generated by Django 3.2.25 on 2026-10-18 13:44
+
+from django.db import migrations, models
+
+from blog.summary import count_words, make_excerpt
+
+# Количество постов, обрабатываемых за один проход при заполнении анонсов
+BATCH_SIZE = 500
+
+
+def backfill_excerpts(apps, schema_editor):
+    """
+    Заполняет анонсы и количество слов для существующих постов пачками
+    по BATCH_SIZE постов (по возрастанию id), загружая только id и текст,
+    чтобы не держать в памяти всю таблицу.
+    """
+    Post = apps.get_model('blog', 'Post')
+    last_id = 0
+    while True:
+        posts = list(Post.objects.filter(id__gt=last_id).order_by('id')
+                     .only('id', 'text')[:BATCH_SIZE])
+        if not posts:
+            return
+        for post in posts:
+            post.excerpt = make_excerpt(post.text)
+            post.word_count = count_words(post.text)
+        Post.objects.bulk_update(posts, ['excerpt', 'word_count'])
+        last_id = posts[-1].id
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('blog', '0007_post_fts'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='post',
+            name='excerpt',
+            field=models.CharField(blank=True, default='', max_length=300),
+        ),
+        migrations.AddField(
+            model_name='post',
+            name='word_count',
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.RunPython(backfill_excerpts, migrations.RunPython.noop),
+    ]
@@ -1,11 +1,22 @@
-from random import randint
-
-from django.db import models
+from django.db import IntegrityError, models, transaction
+from django.db.models import F
+from django.db.models.functions import Length
 from django.conf import settings
 from django.urls import reverse
-# Стандартный slugify django не поддерживает кириллицу, для её поддержки
-# используется пакет pytils, который необходимо доустановить
-from pytils.translit import slugify
+
+from blog.slugs import SLUG_MAX_LENGTH, SlugStem, next_slug
+from blog.summary import EXCERPT_LENGTH, count_words, make_excerpt
+
+# Количество попыток сохранить новый пост, если выбранный слаг успел занять
+# параллельный запрос
+SLUG_ATTEMPTS = 5
+# Счётчики, которые меняются только запросами UPDATE с F-выражениями
+# и не перезаписываются при сохранении поста через save()
+COUNTER_FIELDS = ('comment_count',)
+# Длина сегмента пути комментария (id в 36-ричной системе с ведущими
+# нулями) и наибольшая глубина вложенности комментариев
+PATH_SEGMENT = 8
+MAX_COMMENT_DEPTH = 32
 
 
 class Post(models.Model):
@@ -14,11 +25,30 @@ class Post(models.Model):
     objects = models.Manager()
     title = models.CharField(max_length=256)
     text = models.TextField()
-    slug = models.SlugField(max_length=70, unique=True)
+    slug = models.SlugField(max_length=SLUG_MAX_LENGTH, unique=True)
     created_by = models.ForeignKey(settings.AUTH_USER_MODEL,
                                    on_delete=models.SET_NULL, blank=True,
                                    null=True)
     created_at = models.DateTimeField(auto_now_add=True)
+    # Время последнего изменения - валидатор условных GET-запросов
+    # (blog.conditional)
+    updated_at = models.DateTimeField(auto_now=True)
+    # Анонс и количество слов вычисляются при сохранении, чтобы списки
+    # постов не загружали полный текст
+    excerpt = models.CharField(max_length=EXCERPT_LENGTH, blank=True,
+                               default='')
+    word_count = models.PositiveIntegerField(default=0)
+    # Количество комментариев (blog.comments.add_comment)
+    comment_count = models.PositiveIntegerField(default=0)
+
+    class Meta:
+        # Индекс для поиска следующего свободного суффикса слага
+        # (blog.slugs.last_suffix) и индексы для курсорной пагинации списков
+        # постов (blog.pagination.CursorPaginator)
+        indexes = [models.Index(SlugStem('slug'), Length('slug'), F('slug'),
+                                name='blog_post_slug_stem'),
+                   models.Index(fields=['created_at']),
+                   models.Index(fields=['created_by', 'created_at'])]
 
     def get_absolute_url(self):
         """
@@ -28,18 +58,74 @@ class Post(models.Model):
         """
         return reverse('post_detail', args=[str(self.pk)])
 
+    def update_summary(self):
+        """
+        Вычисляет анонс и количество слов по тексту поста. Вызывается
+        в save(); при создании постов через bulk_create - явно.
+        """
+        self.excerpt = make_excerpt(self.text)
+        self.word_count = count_words(self.text)
+
     def save(self, *args, **kwargs):
         """
         Метод отвечает за автоматическую генерацию поля slug модели, с помощью
         переопределения метода save(). Слаг генерируется из атрибута title
         только один раз при создании нового объекта. Атрибут __class__ содержит
-        ссылку на класс, к которому принадлежит экземпляр (self). Также
-        проводится проверка на уникальность сгенерированного слага и
-        при необходимости проводится его уникализация.
-        """
-        if not self.pk:
-            self.slug = slugify(self.title)
-            ref_class = self.__class__
-            while ref_class.objects.filter(slug=self.slug).exists():
-                self.slug = f'{self.slug}-{randint(1, 100)}'
-        super(Post, self).save(*args, **kwargs)
+        ссылку на класс, к которому принадлежит экземпляр (self). Свободный
+        слаг (следующий числовой суффикс) находится одним запросом функцией
+        next_slug; если его успел занять параллельный запрос, уникальный
+        индекс вызывает IntegrityError и слаг выбирается заново.
+        Перед сохранением пересчитываются анонс и количество слов.
+        При сохранении существующего поста счётчики COUNTER_FIELDS
+        не записываются.
+        """
+        self.update_summary()
+        if self.pk:
+            if not self._state.adding and kwargs.get('update_fields') is None:
+                # Счётчики COUNTER_FIELDS могли измениться после загрузки
+                # поста, поэтому они не сохраняются
+                kwargs['update_fields'] = [
+                    field.name for field in self._meta.concrete_fields
+                    if not field.primary_key and
+                    field.name not in COUNTER_FIELDS]
+            return super(Post, self).save(*args, **kwargs)
+        ref_class = self.__class__
+        for attempt in range(SLUG_ATTEMPTS):
+            self.slug = next_slug(ref_class.objects, self.title)
+            try:
+                with transaction.atomic():
+                    return super(Post, self).save(*args, **kwargs)
+            except IntegrityError:
+                if attempt + 1 == SLUG_ATTEMPTS or \
+                        not ref_class.objects.filter(slug=self.slug).exists():
+                    raise
+
+
+class Comment(models.Model):
+    """
+    Комментарий к посту. Дерево комментариев хранится материализованным
+    путём: path - пути родителей и сегмент самого комментария (id
+    в 36-ричной системе, PATH_SEGMENT символов). Сортировка по path
+    по индексу (post, path) даёт обход дерева в глубину, поэтому вся
+    ветка обсуждения загружается одним запросом.
+    """
+    objects = models.Manager()
+    post = models.ForeignKey(Post, on_delete=models.CASCADE,
+                             related_name='comments')
+    created_by = models.ForeignKey(settings.AUTH_USER_MODEL,
+                                   on_delete=models.SET_NULL, blank=True,
+                                   null=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+    text = models.TextField()
+    path = models.CharField(max_length=PATH_SEGMENT * MAX_COMMENT_DEPTH,
+                            blank=True, default='')
+
+    class Meta:
+        indexes = [models.Index(fields=['post', 'path'])]
+
+    @property
+    def depth(self) -> int:
+        """
+        Глубина вложенности: 0 - ответ на пост.
+        """
+        return len(self.path) // PATH_SEGMENT - 1
@@ -0,0 +1,146 @@
+from base64 import urlsafe_b64decode, urlsafe_b64encode
+from binascii import Error as DecodeError
+from datetime import datetime
+
+from django.db.models import Q
+
+# Направления перехода, записываемые в курсор
+NEXT = 'n'
+PREVIOUS = 'p'
+# Допустимый диапазон id поста в курсоре: целое SQLite (знаковое 64-битное)
+MIN_PK = -2 ** 63
+MAX_PK = 2 ** 63 - 1
+
+
+def encode_cursor(direction: str, post) -> str:
+    """
+    Функция кодирует курсор страницы: направление перехода и ключ
+    (created_at, id) граничного поста.
+    :param direction: NEXT или PREVIOUS.
+    :param post: Последний (для NEXT) или первый (для PREVIOUS) пост
+    текущей страницы.
+    :return: Строка курсора для параметра page.
+    """
+    raw = f'{direction}{post.created_at.isoformat()}|{post.pk}'
+    return urlsafe_b64encode(raw.encode()).decode().rstrip('=')
+
+
+def decode_cursor(cursor: str):
+    """
+    Функция разбирает строку курсора.
+    :param cursor: Строка курсора из параметра page.
+    :return: Тройка (направление, created_at, id).
+    :raise ValueError: Если курсор некорректен (в том числе id вне
+    диапазона целых SQLite).
+    """
+    try:
+        raw = urlsafe_b64decode(cursor + '=' * (-len(cursor) % 4)).decode()
+    except (DecodeError, UnicodeDecodeError) as exc:
+        raise ValueError(cursor) from exc
+    direction, (created_at, pk) = raw[:1], raw[1:].split('|')
+    pk = int(pk)
+    if direction not in (NEXT, PREVIOUS) or not MIN_PK <= pk <= MAX_PK:
+        raise ValueError(cursor)
+    return direction, datetime.fromisoformat(created_at), pk
+
+
+class CursorPage:
+    """
+    Страница курсорной пагинации. Повторяет ту часть интерфейса
+    django.core.paginator.Page, которую использует шаблон home.html:
+    вместо номеров соседних страниц next_page_number и
+    previous_page_number возвращают курсоры.
+    """
+
+    def __init__(self, object_list, next_cursor=None, previous_cursor=None):
+        self.object_list = object_list
+        self.next_cursor = next_cursor
+        self.previous_cursor = previous_cursor
+
+    def __iter__(self):
+        return iter(self.object_list)
+
+    def __len__(self):
+        return len(self.object_list)
+
+    def __getitem__(self, index):
+        return self.object_list[index]
+
+    def has_next(self) -> bool:
+        return self.next_cursor is not None
+
+    def has_previous(self) -> bool:
+        return self.previous_cursor is not None
+
+    def has_other_pages(self) -> bool:
+        return self.has_next() or self.has_previous()
+
+    def next_page_number(self) -> str:
+        return self.next_cursor
+
+    def previous_page_number(self) -> str:
+        return self.previous_cursor
+
+
+class CursorPaginator:
+    """
+    Курсорная (keyset) пагинация постов в порядке убывания
+    (created_at, id). Вместо OFFSET страница начинается с условия
+    "ключ меньше ключа последнего поста предыдущей страницы", поэтому
+    запрос читает по индексу только per_page + 1 строк независимо от
+    номера страницы, а COUNT(*) не выполняется. Лишняя строка нужна,
+    чтобы узнать, есть ли следующая страница.
+    """
+
+    def __init__(self, queryset, per_page: int):
+        self.queryset = queryset
+        self.per_page = per_page
+
+    def window(self, cursor):
+        """
+        Возвращает направление перехода из курсора (None - первая страница,
+        в том числе для некорректного курсора) и запрос per_page + 1 постов
+        страницы в порядке чтения индекса. Запрос используется и для
+        получения страницы, и для вычисления валидаторов условного GET
+        (blog.conditional).
+        """
+        try:
+            direction, created_at, pk = decode_cursor(cursor or '')
+        except (ValueError, OverflowError):
+            direction = None
+        if direction is None:
+            queryset = self.queryset.order_by('-created_at', '-pk')
+        elif direction == NEXT:
+            # created_at <= x - диапазон по индексу, второе условие
+            # отсеивает посты с тем же created_at
+            queryset = self.queryset.filter(
+                Q(created_at__lt=created_at) | Q(pk__lt=pk),
+                created_at__lte=created_at).order_by('-created_at', '-pk')
+        else:
+            queryset = self.queryset.filter(
+                Q(created_at__gt=created_at) | Q(pk__gt=pk),
+                created_at__gte=created_at).order_by('created_at', 'pk')
+        return direction, queryset[:self.per_page + 1]
+
+    def get_page(self, cursor) -> CursorPage:
+        """
+        Возвращает страницу по курсору из параметра page. Без курсора
+        или с некорректным курсором (например, номером страницы из старой
+        ссылки) возвращается первая страница.
+        """
+        direction, queryset = self.window(cursor)
+        posts = list(queryset)
+        if direction is None:
+            more, previous = len(posts) > self.per_page, False
+        elif direction == NEXT:
+            more, previous = len(posts) > self.per_page, True
+        else:
+            previous, more = len(posts) > self.per_page, True
+            posts = posts[:self.per_page][::-1]
+        posts = posts[:self.per_page]
+        if not posts:
+            return CursorPage(posts)
+        return CursorPage(
+            posts,
+            encode_cursor(NEXT, posts[-1]) if more else None,
+            encode_cursor(PREVIOUS, posts[0]) if previous else None)
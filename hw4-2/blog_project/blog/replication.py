@@ -0,0 +1,62 @@
+import logging
+import sqlite3
+from threading import Event, Thread
+
+from django.conf import settings
+from django.db import DEFAULT_DB_ALIAS, connections
+
+from blog.routers import replicas
+
+logger = logging.getLogger('blog.replication')
+
+
+def replicate(aliases=None) -> list:
+    """
+    Функция копирует основную базу SQLite в файлы реплик через backup API
+    SQLite (локальная замена репликации для разработки и бенчмарков).
+    База копируется за один шаг: при пошаговом копировании запись в базу
+    из другого соединения начинала бы копирование заново. Если реплику
+    в этот момент читают, backup повторяет попытку, пока чтение
+    не закончится.
+    :param aliases: Алиасы реплик, по умолчанию - BLOG_REPLICAS.
+    :return: Список скопированных алиасов.
+    """
+    aliases = replicas() if aliases is None else aliases
+    primary = connections[DEFAULT_DB_ALIAS]
+    primary.ensure_connection()
+    for alias in aliases:
+        target = sqlite3.connect(connections[alias].settings_dict['NAME'])
+        try:
+            primary.connection.backup(target)
+        finally:
+            target.close()
+    return list(aliases)
+
+
+class Replicator(Thread):
+    """
+    Фоновый поток, копирующий основную базу в реплики каждые interval
+    секунд (BLOG_REPLICATION_INTERVAL).
+    """
+
+    def __init__(self, interval=None, aliases=None):
+        super().__init__(daemon=True)
+        self.interval = interval or getattr(
+            settings, 'BLOG_REPLICATION_INTERVAL', 2)
+        self.aliases = aliases
+        self._stopped = Event()
+
+    def run(self):
+        try:
+            while not self._stopped.is_set():
+                try:
+                    replicate(self.aliases)
+                except sqlite3.Error:
+                    logger.exception('Ошибка копирования базы в реплики')
+                self._stopped.wait(self.interval)
+        finally:
+            connections.close_all()
+
+    def stop(self):
+        self._stopped.set()
+        self.join()
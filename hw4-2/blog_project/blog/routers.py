@@ -0,0 +1,128 @@
+import random
+from contextlib import contextmanager
+from contextvars import ContextVar
+from functools import wraps
+
+from django.conf import settings
+from django.db import DEFAULT_DB_ALIAS
+
+# Cookie, закрепляющая чтение пользователя за основной базой после записи
+PIN_COOKIE = 'blog_primary'
+# Безопасные (только читающие) HTTP-методы
+SAFE_METHODS = ('GET', 'HEAD')
+
+
+class RoutingState:
+    """
+    Состояние маршрутизации запросов к базам данных для одного
+    HTTP-запроса: разрешено ли читать с реплик и была ли запись.
+    """
+
+    def __init__(self, pinned=False):
+        self.pinned = pinned
+        self.replica_reads = False
+        self.wrote = False
+
+
+# Состояние текущего HTTP-запроса; None - вне запроса (команды, shell),
+# тогда все запросы идут в основную базу
+current_state = ContextVar('blog_routing_state', default=None)
+
+
+def replicas() -> list:
+    return getattr(settings, 'BLOG_REPLICAS', [])
+
+
+class ReplicaRouter:
+    """
+    Маршрутизатор баз данных: запись всегда в основную базу (default),
+    чтение - с одной из реплик BLOG_REPLICAS, но только внутри
+    представлений, помеченных replica_reads, пока запрос ничего
+    не записал, и если пользователь не закреплён за основной базой после
+    своей записи (PrimaryPinMiddleware).
+    """
+
+    def db_for_read(self, model, **hints):
+        state = current_state.get()
+        if state is None or not state.replica_reads or state.wrote:
+            return DEFAULT_DB_ALIAS
+        aliases = replicas()
+        return random.choice(aliases) if aliases else DEFAULT_DB_ALIAS
+
+    def db_for_write(self, model, **hints):
+        state = current_state.get()
+        if state is not None:
+            state.wrote = True
+        return DEFAULT_DB_ALIAS
+
+    def allow_relation(self, obj1, obj2, **hints):
+        # Реплики - копии основной базы, связи между объектами допустимы
+        return True
+
+    def allow_migrate(self, db, app_label, model_name=None, **hints):
+        # Схема реплик копируется вместе с данными (blog.replication)
+        return db not in replicas()
+
+
+class PrimaryPinMiddleware:
+    """
+    Middleware закрепления за основной базой: если запрос что-то записал
+    в базу, в ответе ставится cookie PIN_COOKIE на BLOG_PRIMARY_PIN_SECONDS
+    секунд. Пока cookie есть, все чтения пользователя идут в основную
+    базу, и он видит свои изменения, даже если реплики ещё отстают.
+    Время закрепления должно быть больше задержки репликации.
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        state = RoutingState(pinned=PIN_COOKIE in request.COOKIES)
+        token = current_state.set(state)
+        try:
+            response = self.get_response(request)
+        finally:
+            current_state.reset(token)
+        if state.wrote:
+            response.set_cookie(
+                PIN_COOKIE, '1', samesite='Lax', httponly=True,
+                max_age=getattr(settings, 'BLOG_PRIMARY_PIN_SECONDS', 10))
+        return response
+
+
+def replica_reads(view):
+    """
+    Декоратор представления, которое только читает данные: GET- и
+    HEAD-запросы пользователей, не закреплённых за основной базой,
+    читают с реплик.
+    """
+    @wraps(view)
+    def wrapper(request, *args, **kwargs):
+        state = current_state.get()
+        if state is None or state.pinned or request.method not in \
+                SAFE_METHODS:
+            return view(request, *args, **kwargs)
+        state.replica_reads = True
+        try:
+            return view(request, *args, **kwargs)
+        finally:
+            state.replica_reads = False
+    return wrapper
+
+
+@contextmanager
+def use_primary():
+    """
+    Контекстный менеджер: чтения внутри блока идут в основную базу.
+    Используется при заполнении кеша: запись, построенная по данным
+    отстающей реплики, осталась бы в кеше под новой версией объекта.
+    """
+    state = current_state.get()
+    if state is None or not state.replica_reads:
+        yield
+        return
+    state.replica_reads = False
+    try:
+        yield
+    finally:
+        state.replica_reads = True
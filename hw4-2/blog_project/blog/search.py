@@ -0,0 +1,155 @@
+import re
+
+from django.db import connection, transaction
+from django.utils.html import escape
+from django.utils.safestring import mark_safe
+
+from blog.pagination import CursorPage
+
+# Полнотекстовый индекс FTS5 по заголовкам и текстам постов (создаётся
+# миграцией 0007_post_fts, только для SQLite)
+FTS_TABLE = 'blog_post_fts'
+# Веса полей title и text для ранжирования bm25
+TITLE_WEIGHT = 10.0
+TEXT_WEIGHT = 1.0
+# Количество слов во фрагменте текста с найденными словами
+SNIPPET_WORDS = 16
+# Временные метки начала и конца найденного слова во фрагменте: фрагмент
+# экранируется целиком, затем метки заменяются на теги <mark>
+MARK_START = '\x02'
+MARK_END = '\x03'
+# Наибольший номер страницы результатов: OFFSET больших номеров не влезает
+# в целое SQLite, а дальние страницы всё равно требуют ранжировать всё
+MAX_PAGE = 1000
+
+SEARCH_QUERY = f'''
+    SELECT p.id, p.title, p.created_at,
+        snippet({FTS_TABLE}, 1, %s, %s, '…', {SNIPPET_WORDS})
+    FROM {FTS_TABLE}
+    JOIN blog_post p ON p.id = {FTS_TABLE}.rowid
+    WHERE {FTS_TABLE} MATCH %s
+    ORDER BY bm25({FTS_TABLE}, {TITLE_WEIGHT}, {TEXT_WEIGHT})
+    LIMIT %s OFFSET %s
+'''
+
+
+def search_enabled() -> bool:
+    """
+    Функция проверяет, поддерживается ли полнотекстовый поиск (FTS5 есть
+    только в SQLite).
+    """
+    return connection.vendor == 'sqlite'
+
+
+def index_post(post):
+    """
+    Функция добавляет пост в полнотекстовый индекс или обновляет его
+    запись в индексе.
+    :param post: Пост.
+    """
+    if not search_enabled():
+        return
+    with transaction.atomic(), connection.cursor() as cur:
+        cur.execute(f'DELETE FROM {FTS_TABLE} WHERE rowid = %s', [post.pk])
+        cur.execute(f'INSERT INTO {FTS_TABLE} (rowid, title, text) '
+                    f'VALUES (%s, %s, %s)', [post.pk, post.title, post.text])
+
+
+def unindex_post(post_id: int):
+    """
+    Функция удаляет пост из полнотекстового индекса.
+    :param post_id: id поста.
+    """
+    if not search_enabled():
+        return
+    with connection.cursor() as cur:
+        cur.execute(f'DELETE FROM {FTS_TABLE} WHERE rowid = %s', [post_id])
+
+
+def index_posts_after(post_id: int) -> int:
+    """
+    Функция добавляет в полнотекстовый индекс посты с id больше post_id
+    одним запросом INSERT ... SELECT (для постов, созданных через
+    bulk_create без сигналов).
+    :param post_id: Наибольший id поста, уже попавшего в индекс.
+    :return: Количество проиндексированных постов.
+    """
+    if not search_enabled():
+        return 0
+    with connection.cursor() as cur:
+        cur.execute(f'INSERT INTO {FTS_TABLE} (rowid, title, text) '
+                    f'SELECT id, title, text FROM blog_post WHERE id > %s',
+                    [post_id])
+        return cur.rowcount
+
+
+def rebuild_index() -> int:
+    """
+    Функция полностью перестраивает полнотекстовый индекс по таблице
+    постов в одной транзакции и оптимизирует его (слияние сегментов).
+    :return: Количество проиндексированных постов.
+    """
+    with transaction.atomic(), connection.cursor() as cur:
+        cur.execute(f'DELETE FROM {FTS_TABLE}')
+        cur.execute(f'INSERT INTO {FTS_TABLE} (rowid, title, text) '
+                    f'SELECT id, title, text FROM blog_post')
+        count = cur.rowcount
+    with connection.cursor() as cur:
+        cur.execute(f"INSERT INTO {FTS_TABLE} ({FTS_TABLE}) "
+                    f"VALUES ('optimize')")
+    return count
+
+
+def match_query(text: str) -> str:
+    """
+    Функция строит запрос FTS5 из введённой пользователем строки: каждое
+    слово берётся в кавычки (синтаксис FTS5 в пользовательском вводе
+    не интерпретируется) и ищется как префикс, чтобы находились и другие
+    формы слова; все слова должны присутствовать в посте.
+    :param text: Строка поиска.
+    :return: Запрос для MATCH или пустая строка, если слов нет.
+    """
+    return ' '.join(f'"{word}"*' for word in re.findall(r'\w+', text))
+
+
+class SearchResult:
+    """
+    Найденный пост: id, заголовок, дата создания и фрагмент текста
+    с выделенными найденными словами.
+    """
+
+    def __init__(self, pk, title, created_at, snippet):
+        self.pk = pk
+        self.title = title
+        # Запрос выполняется без ORM, поэтому строка из SQLite переводится
+        # в datetime конвертером бэкенда
+        self.created_at = connection.ops.convert_datetimefield_value(
+            created_at, None, connection)
+        self.snippet = mark_safe(escape(snippet).replace(
+            MARK_START, '<mark>').replace(MARK_END, '</mark>'))
+
+
+def search_posts(text: str, page=1, per_page=10) -> CursorPage:
+    """
+    Функция ищет посты по строке text в полнотекстовом индексе
+    и возвращает страницу результатов, упорядоченных по bm25 (совпадения
+    в заголовке весят больше). Вместо COUNT(*) выбирается на одну запись
+    больше, чтобы узнать, есть ли следующая страница; курсорами страницы
+    служат номера соседних страниц.
+    :param text: Строка поиска.
+    :param page: Номер страницы (приводится к диапазону 1..MAX_PAGE).
+    :param per_page: Количество результатов на странице.
+    :return: Страница с объектами SearchResult.
+    """
+    page = min(max(page, 1), MAX_PAGE)
+    query = match_query(text)
+    if not query or not search_enabled():
+        return CursorPage([])
+    with connection.cursor() as cur:
+        cur.execute(SEARCH_QUERY, [MARK_START, MARK_END, query, per_page + 1,
+                                   (page - 1) * per_page])
+        rows = cur.fetchall()
+    results = [SearchResult(*row) for row in rows[:per_page]]
+    return CursorPage(results,
+                      str(page + 1) if len(rows) > per_page else None,
+                      str(page - 1) if page > 1 else None)
@@ -0,0 +1,69 @@
+from django.db import transaction
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from blog.cache import author_cache, post_cache
+from blog.conditional import mark_deleted
+from blog.models import Comment, Post
+from blog.search import index_post, unindex_post
+
+
+@receiver(post_save, sender=Post)
+@receiver(post_delete, sender=Post)
+def invalidate_post_cache(sender, instance, **kwargs):
+    """
+    При создании, изменении или удалении поста меняет версии поста и его
+    автора в кеше, чтобы отрисованный пост и страницы списка постов автора
+    были построены заново. Если изменение сделано внутри транзакции, версии
+    меняются ещё раз после её фиксации: иначе параллельный запрос мог бы
+    успеть сохранить в кеш данные, прочитанные до фиксации.
+    """
+    # После удаления у экземпляра обнуляется pk, поэтому id запоминаются
+    post_id, author_id = instance.pk, instance.created_by_id
+
+    def bump():
+        post_cache.bump(post_id)
+        if author_id is not None:
+            author_cache.bump(author_id)
+
+    bump()
+    transaction.on_commit(bump)
+
+
+@receiver(post_save, sender=Post)
+def update_search_index(sender, instance, **kwargs):
+    """
+    Добавляет новый или изменённый пост в полнотекстовый индекс.
+    Сохранения, не затрагивающие заголовок и текст, индекс не меняют.
+    """
+    update_fields = kwargs.get('update_fields')
+    if update_fields and not {'title', 'text'} & update_fields:
+        return
+    index_post(instance)
+
+
+@receiver(post_delete, sender=Post)
+def remove_from_search_index(sender, instance, **kwargs):
+    """
+    Удаляет пост из полнотекстового индекса.
+    """
+    unindex_post(instance.pk)
+
+
+@receiver(post_delete, sender=Post)
+def remember_deletion(sender, instance, **kwargs):
+    """
+    Запоминает время удаления поста для Last-Modified списков постов.
+    """
+    mark_deleted(instance.created_by_id)
+
+
+@receiver(post_save, sender=Comment)
+def invalidate_comment_cache(sender, instance, created, **kwargs):
+    """
+    При добавлении комментария меняет версии поста (в кеше поста хранится
+    ветка обсуждения) и его автора (счётчик комментариев в списке постов
+    автора).
+    """
+    if created:
+        invalidate_post_cache(Post, instance.post)
@@ -0,0 +1,108 @@
+from collections import Counter
+
+from django.db import connections, router
+from django.db.models import CharField, Func
+# Стандартный slugify django не поддерживает кириллицу, для её поддержки
+# используется пакет pytils, который необходимо доустановить
+from pytils.translit import slugify
+
+# Максимальная длина слага (Post.slug) и место, оставляемое под суффикс "-N"
+SLUG_MAX_LENGTH = 70
+SUFFIX_LENGTH = 10
+# Слаг для заголовков, из которых не получилось ни одного символа слага
+DEFAULT_SLUG = 'post'
+
+
+def base_slug(title: str) -> str:
+    """
+    Функция строит базовый слаг из заголовка поста, укорачивая его так,
+    чтобы с числовым суффиксом он поместился в поле slug.
+    :param title: Заголовок поста.
+    :return: Базовый слаг.
+    """
+    slug = slugify(title)[:SLUG_MAX_LENGTH - SUFFIX_LENGTH].strip('-')
+    return slug or DEFAULT_SLUG
+
+
+class SlugStem(Func):
+    """
+    Основа слага - слаг без цифр в конце: RTRIM(slug, '0123456789').
+    У слагов base-1, base-2, ... общая основа "base-". Набор цифр записан
+    в шаблон литералом, чтобы выражение в запросе совпадало с выражением
+    индекса blog_post_slug_stem.
+    """
+    function = 'RTRIM'
+    template = "%(function)s(%(expressions)s, '0123456789')"
+    output_field = CharField()
+
+
+def last_suffix(queryset, base: str):
+    """
+    Функция одним запросом находит наибольший числовой суффикс среди слагов
+    вида base-N. Первый подзапрос проверяет сам base по уникальному индексу
+    на slug, второй берёт первую запись индекса (основа слага, длина, слаг)
+    с основой "base-" в порядке убывания длины и слага: суффиксы без ведущих
+    нулей с большим числом длиннее, а при равной длине больше как строки.
+    Оба подзапроса - поиск по индексу, время не зависит от количества
+    постов с таким же заголовком.
+    :param queryset: Набор записей с полем slug.
+    :param base: Базовый слаг.
+    :return: Наибольший занятый суффикс (0 - занят только сам base)
+    или None, если не заняты ни base, ни слаги base-N.
+    """
+    # Суффикс ищется в базе, куда будет записан пост (а не в базе для
+    # чтения): реплика может не содержать последних слагов
+    db = queryset._db or router.db_for_write(queryset.model)
+    table = connections[db].ops.quote_name(queryset.model._meta.db_table)
+    stem = base + '-'
+    query = f'''
+        SELECT
+            (SELECT 1 FROM {table} WHERE slug = %s),
+            (SELECT slug FROM {table}
+             WHERE RTRIM(slug, '0123456789') = %s
+                AND SUBSTR(slug, %s, 1) <> '0'
+             ORDER BY LENGTH(slug) DESC, slug DESC LIMIT 1)
+    '''
+    with connections[db].cursor() as cur:
+        cur.execute(query, [base, stem, len(stem) + 1])
+        taken, slug = cur.fetchone()
+    if slug and len(slug) > len(stem):
+        return int(slug[len(stem):])
+    return 0 if taken else None
+
+
+def next_slug(queryset, title: str) -> str:
+    """
+    Функция возвращает свободный слаг для заголовка title: базовый слаг,
+    если он не занят, иначе базовый слаг со следующим свободным числовым
+    суффиксом (base-1, base-2, ...).
+    :param queryset: Набор записей с полем slug.
+    :param title: Заголовок поста.
+    :return: Свободный слаг.
+    """
+    base = base_slug(title)
+    last = last_suffix(queryset, base)
+    return base if last is None else f'{base}-{last + 1}'
+
+
+def allocate_slugs(queryset, titles: list) -> list:
+    """
+    Функция распределяет свободные слаги для пачки заголовков (например,
+    при импорте): для каждого различного базового слага выполняется один
+    запрос, одинаковые заголовки внутри пачки получают последовательные
+    суффиксы.
+    :param queryset: Набор записей с полем slug.
+    :param titles: Заголовки постов.
+    :return: Слаги в том же порядке, что и заголовки.
+    """
+    bases = [base_slug(title) for title in titles]
+    last = {base: last_suffix(queryset, base) for base in Counter(bases)}
+    slugs = []
+    for base in bases:
+        if last[base] is None:
+            last[base] = 0
+            slugs.append(base)
+        else:
+            last[base] += 1
+            slugs.append(f'{base}-{last[base]}')
+    return slugs
@@ -0,0 +1,25 @@
+from django.utils.text import Truncator
+
+# Количество слов и максимальная длина (символов) анонса поста
+EXCERPT_WORDS = 40
+EXCERPT_LENGTH = 300
+
+
+def make_excerpt(text: str) -> str:
+    """
+    Функция строит анонс поста для списков: первые EXCERPT_WORDS слов
+    текста, но не длиннее EXCERPT_LENGTH символов.
+    :param text: Текст поста.
+    :return: Анонс.
+    """
+    return Truncator(Truncator(text).words(EXCERPT_WORDS)).chars(
+        EXCERPT_LENGTH)
+
+
+def count_words(text: str) -> int:
+    """
+    Функция считает количество слов в тексте поста.
+    :param text: Текст поста.
+    :return: Количество слов.
+    """
+    return len(text.split())
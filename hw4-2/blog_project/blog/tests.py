@@ -1,3 +1,735 @@
-from django.test import TestCase
+import json
+import re
+import sqlite3
+from base64 import urlsafe_b64encode
+from contextlib import closing, nullcontext
+from datetime import datetime, timedelta, timezone
+from io import StringIO
+from importlib import import_module
+from pathlib import Path
+from tempfile import TemporaryDirectory
+from unittest import mock
 
-# Create your tests here.
+from django.apps import apps
+from django.contrib.auth.models import User
+from django.core.cache import cache
+from django.core.management import CommandError, call_command
+from django.db import connection, connections
+from django.test import TestCase, TransactionTestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+
+from blog.budget import MIN_TIME_BUDGET_MS, TIME_MARGIN, check_budgets, \
+    load_budgets, save_budgets, seed
+from blog.models import MAX_COMMENT_DEPTH, Comment, Post
+from blog.cache import author_cache, post_cache
+from blog.comments import add_comment, load_thread, path_segment
+from blog.pagination import CursorPaginator, decode_cursor
+from blog.replication import replicate
+from blog.routers import PIN_COOKIE, RoutingState, current_state
+from blog.search import MAX_PAGE, search_posts
+from blog.slugs import SLUG_MAX_LENGTH, allocate_slugs, last_suffix, \
+    next_slug
+from blog.timing import percentile
+
+
+class SlugTest(TestCase):
+    def create(self, title):
+        return Post.objects.create(title=title, text='текст')
+
+    def test_same_title_gets_next_suffix(self):
+        slugs = [self.create('Привет, мир').slug for _ in range(12)]
+        self.assertEqual(slugs[:3], ['privet-mir', 'privet-mir-1',
+                                     'privet-mir-2'])
+        self.assertEqual(slugs[-1], 'privet-mir-11')
+
+    def test_single_select_per_post(self):
+        self.create('Привет')
+        with CaptureQueriesContext(connection) as queries:
+            self.create('Привет')
+        selects = [q for q in queries if q['sql'].lstrip().startswith(
+            'SELECT')]
+        self.assertEqual(len(selects), 1)
+
+    def test_unrelated_slugs_are_ignored(self):
+        Post.objects.bulk_create(
+            Post(title=slug, text='текст', slug=slug)
+            for slug in ('post', 'post-7', 'post-007', 'post-word',
+                         'post-word-30', 'post-20-itogi', 'posts-99'))
+        self.assertEqual(self.create('Post').slug, 'post-8')
+        self.assertEqual(self.create('Post word').slug, 'post-word-31')
+
+    def test_long_title_fits(self):
+        first, second = self.create('слово ' * 50), self.create('слово ' * 50)
+        self.assertFalse(first.slug.endswith('-'))
+        self.assertEqual(second.slug, first.slug + '-1')
+        self.assertLessEqual(len(second.slug), SLUG_MAX_LENGTH)
+
+    def test_collision_is_retried(self):
+        self.create('Гонка')
+        with mock.patch('blog.models.next_slug',
+                        side_effect=['gonka', 'gonka-1']):
+            self.assertEqual(self.create('Гонка').slug, 'gonka-1')
+
+    def test_allocate_slugs(self):
+        self.create('Импорт')
+        self.assertEqual(
+            allocate_slugs(Post.objects, ['Импорт', 'Другой', 'Импорт',
+                                          'Другой']),
+            ['import-1', 'drugoj', 'import-2', 'drugoj-1'])
+
+    def test_suffix_lookup_uses_index(self):
+        self.assertIsNone(last_suffix(Post.objects, 'post'))
+        with CaptureQueriesContext(connection) as queries:
+            last_suffix(Post.objects, 'post')
+        with connection.cursor() as cur:
+            cur.execute('EXPLAIN QUERY PLAN ' + queries[0]['sql'])
+            plan = ' '.join(row[-1] for row in cur.fetchall())
+        self.assertIn('blog_post_slug_stem', plan)
+        self.assertNotIn('SCAN blog_post', plan)
+
+
+class PaginationTest(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user('user', password='password')
+        start = datetime(2021, 11, 1, tzinfo=timezone.utc)
+        for i in range(12):
+            post = Post.objects.create(title=f'Пост {i}', text='текст',
+                                       created_by=self.user)
+            # Посты 4-7 созданы в одну и ту же секунду
+            Post.objects.filter(pk=post.pk).update(
+                created_at=start + timedelta(seconds=4 if 4 <= i <= 7 else i))
+
+    def titles(self, page):
+        return [post.title for post in page]
+
+    def walk(self, cursor=None):
+        paginator = CursorPaginator(Post.objects.all(), 5)
+        pages = [paginator.get_page(cursor)]
+        while pages[-1].has_next():
+            pages.append(paginator.get_page(pages[-1].next_page_number()))
+        return paginator, pages
+
+    def test_pages_cover_all_posts_in_order(self):
+        _, pages = self.walk()
+        expected = [post.title for post in
+                    Post.objects.order_by('-created_at', '-pk')]
+        self.assertEqual([title for page in pages
+                          for title in self.titles(page)], expected)
+        self.assertEqual([len(page) for page in pages], [5, 5, 2])
+        self.assertFalse(pages[0].has_previous())
+
+    def test_previous_page(self):
+        paginator, pages = self.walk()
+        previous = paginator.get_page(pages[2].previous_page_number())
+        self.assertEqual(self.titles(previous), self.titles(pages[1]))
+        first = paginator.get_page(previous.previous_page_number())
+        self.assertEqual(self.titles(first), self.titles(pages[0]))
+        self.assertFalse(first.has_previous())
+
+    def test_invalid_cursor_is_first_page(self):
+        paginator, pages = self.walk()
+        for cursor in ('3', 'bm90IGEgY3Vyc29y', None):
+            self.assertEqual(self.titles(paginator.get_page(cursor)),
+                             self.titles(pages[0]))
+
+    def test_out_of_range_cursor_is_first_page(self):
+        paginator, pages = self.walk()
+        post = pages[0][0]
+        for pk in (2 ** 63, -2 ** 63 - 1, 10 ** 30):
+            raw = f'n{post.created_at.isoformat()}|{pk}'.encode()
+            cursor = urlsafe_b64encode(raw).decode().rstrip('=')
+            with self.assertRaises(ValueError):
+                decode_cursor(cursor)
+            self.assertEqual(self.titles(paginator.get_page(cursor)),
+                             self.titles(pages[0]))
+        self.client.force_login(self.user)
+        self.assertEqual(self.client.get('/', {'page': cursor}).status_code,
+                         200)
+
+    def test_views_skip_count(self):
+        self.client.force_login(self.user)
+        for url in ('/', '/post/author_posts/'):
+            response = self.client.get(url)
+            cursor = re.search(r'\?page=([\w-]+)',
+                               response.content.decode()).group(1)
+            with CaptureQueriesContext(connection) as queries:
+                response = self.client.get(url, {'page': cursor})
+            self.assertContains(response, 'Previous')
+            self.assertFalse([q for q in queries if 'COUNT(' in q['sql']])
+            self.assertFalse([q for q in queries if 'OFFSET' in q['sql']])
+
+    def test_author_list_uses_index(self):
+        queryset = Post.objects.filter(
+            created_by=self.user,
+            created_at__lte=datetime(2021, 11, 1, tzinfo=timezone.utc)
+        ).order_by('-created_at', '-pk')[:6]
+        query, params = queryset.query.sql_with_params()
+        with connection.cursor() as cur:
+            cur.execute('EXPLAIN QUERY PLAN ' + query, params)
+            plan = ' '.join(row[-1] for row in cur.fetchall())
+        self.assertIn('created_by_id=? AND created_at<?', plan)
+        self.assertNotIn('TEMP B-TREE', plan)
+
+
+class PostCacheTest(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.user = User.objects.create_user('user', password='password')
+        self.post = Post.objects.create(title='Заголовок', text='Старый текст',
+                                        created_by=self.user)
+        self.url = f'/post/{self.post.pk}/'
+
+    def test_cached_detail_skips_database(self):
+        self.client.get(self.url)
+        with self.assertNumQueries(0):
+            response = self.client.get(self.url)
+        self.assertContains(response, 'Старый текст')
+        self.assertNotContains(response, 'Редактирование')
+
+    def test_edit_is_visible_on_next_request(self):
+        self.client.force_login(self.user)
+        self.assertContains(self.client.get(self.url), 'Редактирование')
+        self.client.post(f'{self.url}edit/', {'title': 'Заголовок',
+                                              'text': 'Новый текст'})
+        response = self.client.get(self.url)
+        self.assertContains(response, 'Новый текст')
+        self.assertNotContains(response, 'Старый текст')
+
+    def test_model_save_invalidates(self):
+        self.client.get(self.url)
+        self.post.text = 'Изменён из админки'
+        self.post.save()
+        self.assertContains(self.client.get(self.url), 'Изменён из админки')
+
+    def test_delete_invalidates(self):
+        self.client.get(self.url)
+        self.client.force_login(self.user)
+        # Форма подтверждения всегда содержит поле csrfmiddlewaretoken
+        self.client.post(f'{self.url}delete/', {'confirm': 'yes'})
+        self.assertEqual(self.client.get(self.url).status_code, 404)
+
+    def test_evicted_version_hides_old_entries(self):
+        self.client.get(self.url)
+        cache.delete(post_cache.version_key(self.post.pk))
+        Post.objects.filter(pk=self.post.pk).update(text='Без сигналов')
+        self.assertContains(self.client.get(self.url), 'Без сигналов')
+
+    def test_author_list_is_invalidated(self):
+        self.client.force_login(self.user)
+        self.client.get('/post/author_posts/')
+        self.assertContains(self.client.get('/post/author_posts/'),
+                            'Заголовок')
+        Post.objects.create(title='Свежий пост', text='текст',
+                            created_by=self.user)
+        self.assertContains(self.client.get('/post/author_posts/'),
+                            'Свежий пост')
+
+
+class SearchTest(TestCase):
+    def setUp(self):
+        self.create('Кошки', 'Рассказ о домашних животных.')
+        self.create('Собаки', 'Собаки дружат с кошками <b>иногда</b>.')
+        self.create('Погода', 'Сегодня солнечно.')
+
+    def create(self, title, text):
+        return Post.objects.create(title=title, text=text)
+
+    def titles(self, query, page=1, per_page=10):
+        return [post.title for post in search_posts(query, page, per_page)]
+
+    def test_title_match_ranks_first(self):
+        self.assertEqual(self.titles('кошк'), ['Кошки', 'Собаки'])
+        self.assertEqual(self.titles('СОЛНЕЧНО'), ['Погода'])
+        self.assertEqual(self.titles('кошки погода'), [])
+
+    def test_snippet_is_escaped_and_marked(self):
+        snippet = search_posts('иногда')[0].snippet
+        self.assertIn('<mark>иногда</mark>', snippet)
+        self.assertIn('&lt;b&gt;', snippet)
+
+    def test_query_syntax_is_not_interpreted(self):
+        self.assertEqual(self.titles('"погода OR (NEAR'), [])
+        self.assertEqual(self.titles('!!!'), [])
+
+    def test_index_follows_changes(self):
+        post = Post.objects.get(title='Погода')
+        post.text = 'Идёт дождь.'
+        post.save()
+        self.assertEqual(self.titles('солнечно'), [])
+        self.assertEqual(self.titles('дождь'), ['Погода'])
+        post.delete()
+        self.assertEqual(self.titles('дождь'), [])
+
+    def test_pagination(self):
+        for i in range(3):
+            self.create(f'Кошки {i}', 'текст')
+        first = search_posts('кошки', per_page=2)
+        self.assertTrue(first.has_next())
+        last = search_posts('кошки', int(first.next_page_number()), 2)
+        self.assertEqual(len(last), 2)
+        self.assertTrue(search_posts('кошки', 3, 2).has_previous())
+        self.assertFalse(search_posts('кошки', 3, 2).has_next())
+
+    def test_page_is_clamped(self):
+        self.assertEqual(self.titles('кошк', 0), ['Кошки', 'Собаки'])
+        huge = search_posts('кошки', 10 ** 30)
+        self.assertEqual(len(huge), 0)
+        self.assertEqual(huge.previous_page_number(), str(MAX_PAGE - 1))
+        for page in (str(10 ** 30), '-5', '1e400', '9' * 5000):
+            response = self.client.get('/search/',
+                                       {'q': 'кошки', 'page': page})
+            self.assertEqual(response.status_code, 200)
+
+    def test_view_and_rebuild(self):
+        Post.objects.bulk_create([Post(title='Без сигналов', text='текст',
+                                       slug='bez-signalov')])
+        self.assertEqual(self.titles('сигналов'), [])
+        call_command('rebuild_search_index', stdout=StringIO())
+        response = self.client.get('/search/', {'q': 'сигналов'})
+        self.assertContains(response, 'Без сигналов')
+
+
+class ExcerptTest(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user('user', password='password')
+
+    def test_summary_is_computed_on_save(self):
+        post = Post.objects.create(title='Пост', text='слово ' * 1000,
+                                   created_by=self.user)
+        self.assertEqual(post.word_count, 1000)
+        self.assertEqual(post.excerpt, 'слово ' * 39 + 'слово…')
+        post.text = 'Короткий текст'
+        post.save()
+        post.refresh_from_db()
+        self.assertEqual((post.excerpt, post.word_count),
+                         ('Короткий текст', 2))
+
+    def test_list_skips_text_and_author_queries(self):
+        for i in range(5):
+            Post.objects.create(title=f'Пост {i}', text='полный текст ' * 100,
+                                created_by=User.objects.create(
+                                    username=f'author{i}'))
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get('/')
+        # Запрос валидаторов условного GET и запрос страницы
+        self.assertEqual(len(queries), 2)
+        self.assertNotIn('JOIN', queries[0]['sql'])
+        self.assertIn('JOIN "auth_user"', queries[1]['sql'])
+        self.assertNotIn('"blog_post"."text"', queries[1]['sql'])
+        self.assertContains(response, 'author4')
+        self.assertContains(response, 'слов: 200')
+
+    def test_backfill_migration(self):
+        migration = import_module('blog.migrations.0008_post_excerpt')
+        Post.objects.bulk_create(
+            Post(title=f'Пост {i}', text=f'текст номер {i}', slug=f'p{i}')
+            for i in range(5))
+        self.addCleanup(setattr, migration, 'BATCH_SIZE',
+                        migration.BATCH_SIZE)
+        migration.BATCH_SIZE = 2
+        migration.backfill_excerpts(apps, None)
+        for post in Post.objects.all():
+            self.assertEqual(post.excerpt, post.text)
+            self.assertEqual(post.word_count, 3)
+
+
+class ConditionalGetTest(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.user = User.objects.create_user('user', password='password')
+        self.posts = [Post.objects.create(title=f'Пост {i}', text='текст',
+                                          created_by=self.user)
+                      for i in range(3)]
+        self.url = f'/post/{self.posts[0].pk}/'
+
+    def revalidate(self, url):
+        """
+        Повторяет запрос с валидаторами из первого ответа.
+        """
+        response = self.client.get(url)
+        return lambda: self.client.get(
+            url, HTTP_IF_NONE_MATCH=response['ETag'],
+            HTTP_IF_MODIFIED_SINCE=response['Last-Modified'])
+
+    def test_unchanged_pages_are_not_rendered(self):
+        self.client.force_login(self.user)
+        for url in (self.url, '/', '/post/author_posts/'):
+            response = self.revalidate(url)()
+            self.assertEqual(response.status_code, 304)
+            self.assertEqual(response.templates, [])
+            self.assertIn('private', response['Cache-Control'])
+
+    def test_edit(self):
+        detail, home = self.revalidate(self.url), self.revalidate('/')
+        self.client.force_login(self.user)
+        self.client.post(f'{self.url}edit/', {'title': 'Пост 0',
+                                              'text': 'Новый текст'})
+        self.client.logout()
+        self.assertContains(detail(), 'Новый текст')
+        self.assertEqual(home().status_code, 200)
+
+    def test_delete(self):
+        detail, home = self.revalidate(self.url), self.revalidate('/')
+        self.posts[2].delete()
+        self.assertEqual(home().status_code, 200)
+        self.assertEqual(detail().status_code, 304)
+        self.posts[0].delete()
+        self.assertEqual(detail().status_code, 404)
+
+    def test_delete_without_etag(self):
+        response = self.client.get('/')
+        later = datetime.now(timezone.utc) + timedelta(seconds=10)
+        with mock.patch('django.utils.timezone.now', return_value=later):
+            self.posts[1].delete()
+        response = self.client.get(
+            '/', HTTP_IF_MODIFIED_SINCE=response['Last-Modified'])
+        self.assertEqual(response.status_code, 200)
+
+    def test_new_post(self):
+        self.client.force_login(self.user)
+        home, author = self.revalidate('/'), self.revalidate(
+            '/post/author_posts/')
+        Post.objects.create(title='Свежий пост', text='текст',
+                            created_by=self.user)
+        self.assertContains(home(), 'Свежий пост')
+        self.assertContains(author(), 'Свежий пост')
+
+    def test_etag_depends_on_user(self):
+        etag = self.client.get(self.url)['ETag']
+        self.client.force_login(self.user)
+        response = self.client.get(self.url, HTTP_IF_NONE_MATCH=etag)
+        self.assertContains(response, 'Редактирование')
+
+
+class TransferTest(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.user = User.objects.create_user('user', password='password')
+        self.posts = [Post.objects.create(title='Одинаковый',
+                                          text=f'текст {i}',
+                                          created_by=self.user)
+                      for i in range(3)]
+        self.posts.append(Post.objects.create(title='Без автора',
+                                              text='сирота'))
+
+    def export(self, **options):
+        out = StringIO()
+        call_command('export_posts', stdout=out, stderr=StringIO(), **options)
+        return out.getvalue()
+
+    def test_round_trip(self):
+        dump = self.export(chunk_size=2)
+        self.assertEqual(len(dump.splitlines()), 4)
+        created = [post.created_at for post in self.posts]
+        Post.objects.all().delete()
+        with mock.patch('sys.stdin', StringIO(dump)):
+            call_command('import_posts', '-', batch_size=3, stdout=StringIO())
+        posts = list(Post.objects.order_by('pk'))
+        self.assertEqual([post.slug for post in posts],
+                         ['odinakovyij', 'odinakovyij-1', 'odinakovyij-2',
+                          'bez-avtora'])
+        self.assertEqual([post.created_at for post in posts], created)
+        self.assertEqual([post.created_by for post in posts],
+                         [self.user] * 3 + [None])
+        self.assertEqual(posts[3].excerpt, 'сирота')
+        self.assertEqual(search_posts('сирота')[0].pk, posts[3].pk)
+
+    def test_import_appends_with_free_slugs(self):
+        dump = self.export()
+        with mock.patch('sys.stdin', StringIO(dump)), \
+                CaptureQueriesContext(connection) as queries:
+            call_command('import_posts', '-', stdout=StringIO())
+        self.assertEqual(Post.objects.count(), 8)
+        self.assertEqual(Post.objects.filter(
+            slug__startswith='odinakovyij').count(), 6)
+        inserts = [q for q in queries if q['sql'].startswith(
+            'INSERT INTO "blog_post"')]
+        self.assertEqual(len(inserts), 1)
+        # Пользователи запрашиваются один раз на пачку
+        self.assertEqual(len([q for q in queries
+                              if 'FROM "auth_user"' in q['sql']]), 1)
+
+    def test_missing_author_and_bad_line(self):
+        lines = '{"title": "Пост", "text": "текст", "author": "nobody"}\n\n'
+        err = StringIO()
+        with mock.patch('sys.stdin', StringIO(lines)):
+            call_command('import_posts', '-', stdout=StringIO(), stderr=err)
+        self.assertIn('nobody', err.getvalue())
+        self.assertIsNone(Post.objects.get(slug='post').created_by)
+        with mock.patch('sys.stdin', StringIO('{"title": "Пост"}\n')), \
+                self.assertRaisesMessage(CommandError, 'Строка 1'):
+            call_command('import_posts', '-', stdout=StringIO())
+
+
+    def test_committed_batches_reset_author_cache(self):
+        author_cache.set(self.user.pk, 'старая страница')
+        lines = '{"title": "Новый", "text": "текст", "author": "user"}\n' \
+                'не JSON\n'
+        with mock.patch('sys.stdin', StringIO(lines)), \
+                self.assertRaisesMessage(CommandError, 'Строка 2'):
+            call_command('import_posts', '-', batch_size=1,
+                         stdout=StringIO())
+        self.assertTrue(Post.objects.filter(title='Новый').exists())
+        self.assertIsNone(author_cache.get(self.user.pk))
+
+    @override_settings(CACHES={'default': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache'}})
+    def test_process_local_cache_is_reported(self):
+        err = StringIO()
+        with mock.patch('sys.stdin', StringIO('')):
+            call_command('import_posts', '-', stdout=StringIO(), stderr=err)
+        self.assertIn('BLOG_CACHE_ALIAS', err.getvalue())
+
+
+class QueryBudgetTest(TestCase):
+    def setUp(self):
+        self.user = seed()
+
+    def test_views_within_budgets(self):
+        report = check_budgets(self.user, load_budgets())
+        self.assertEqual(set(report), set(load_budgets()))
+        for name, result in report.items():
+            self.assertEqual(result['violations'], [], name)
+            self.assertLess(result['status'], 400, name)
+
+    def test_n_plus_one_is_caught(self):
+        with mock.patch('blog.views.list_queryset', Post.objects.all):
+            report = check_budgets(self.user, load_budgets())
+        self.assertTrue(report['home']['violations'])
+        self.assertGreaterEqual(report['home']['queries'],
+                                report['home']['budget']['queries'] + 5)
+
+    def test_time_budget_follows_measurement(self):
+        report = {'fast': {'queries': 2, 'sql_ms': 0.1},
+                  'slow': {'queries': 3, 'sql_ms': 4.0}}
+        with TemporaryDirectory() as tmp:
+            path = Path(tmp) / 'budgets.json'
+            save_budgets(report, path)
+            budgets = load_budgets(path)
+        self.assertEqual(budgets, {
+            'fast': {'queries': 2, 'sql_ms': MIN_TIME_BUDGET_MS},
+            'slow': {'queries': 3, 'sql_ms': 4.0 * TIME_MARGIN}})
+
+    def test_report_is_written(self):
+        out = StringIO()
+        with mock.patch('blog.management.commands.check_query_budgets.'
+                        'test_database', nullcontext), \
+                mock.patch('blog.management.commands.check_query_budgets.'
+                           'seed', return_value=self.user):
+            call_command('check_query_budgets', stdout=out)
+        self.assertEqual(json.loads(out.getvalue())['home']['url'], '/')
+
+
+@override_settings(BLOG_SERVER_TIMING=True, BLOG_TIMING_SAMPLE_RATE=1.0,
+                   BLOG_TIMING_LOG_EVERY=3)
+class ServerTimingTest(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.post = Post.objects.create(title='Пост', text='текст')
+
+    def timings(self, response):
+        return {name: float(duration) for name, duration in re.findall(
+            r'(\w+);dur=([\d.]+)', response['Server-Timing'])}
+
+    def test_header(self):
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get('/')
+        self.assertIn(f'desc="{len(queries)} queries"',
+                      response['Server-Timing'])
+        timings = self.timings(response)
+        self.assertGreater(timings['tpl'], 0)
+        self.assertGreaterEqual(timings['total'],
+                                timings['db'] + timings['tpl'])
+
+    def test_not_modified_skips_templates(self):
+        etag = self.client.get(f'/post/{self.post.pk}/')['ETag']
+        response = self.client.get(f'/post/{self.post.pk}/',
+                                   HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 304)
+        self.assertEqual(self.timings(response)['tpl'], 0)
+
+    @override_settings(BLOG_SERVER_TIMING=False)
+    def test_disabled(self):
+        self.assertNotIn('Server-Timing', self.client.get('/'))
+
+    def test_route_percentiles_are_logged(self):
+        with self.assertLogs('blog.timing') as logs:
+            for _ in range(3):
+                self.client.get('/')
+        self.assertEqual(len(logs.records), 1)
+        self.assertIn('home n=3 total p50/p95/p99=', logs.output[0])
+
+    def test_percentile(self):
+        values = list(range(1, 101))
+        self.assertEqual([percentile(values, p) for p in (50, 95, 99)],
+                         [50, 95, 99])
+        self.assertEqual(percentile([7], 99), 7)
+
+
+@override_settings(BLOG_REPLICAS=['replica'])
+class ReplicaRouterTest(TransactionTestCase):
+    # В тестах реплика - зеркало default (другое соединение с той же
+    # базой), поэтому данные фиксируются, а не остаются в транзакции теста
+    databases = {'default', 'replica'}
+
+    def setUp(self):
+        cache.clear()
+        self.user = User.objects.create_user('user', password='password')
+        self.post = Post.objects.create(title='Пост', text='текст',
+                                        created_by=self.user)
+
+    def tearDown(self):
+        # Удаление через ORM убирает посты и из полнотекстового индекса
+        Post.objects.all().delete()
+
+    def get(self, url):
+        """
+        Выполняет запрос и возвращает ответ и количество запросов
+        к основной базе и к реплике.
+        """
+        with CaptureQueriesContext(connections['default']) as primary, \
+                CaptureQueriesContext(connections['replica']) as replica:
+            response = self.client.get(url)
+        return response, len(primary), len(replica)
+
+    def test_read_views_use_replica(self):
+        response, primary, replica = self.get('/')
+        self.assertContains(response, 'Пост')
+        self.assertEqual((primary, replica > 0), (0, True))
+        _, primary, replica = self.get('/search/?q=пост')
+        self.assertEqual(replica, 0)
+
+    def test_cache_is_filled_from_primary(self):
+        response, primary, replica = self.get(f'/post/{self.post.pk}/')
+        self.assertContains(response, 'текст')
+        # Валидатор условного GET - с реплики, пост и ветка комментариев -
+        # из основной базы
+        self.assertEqual((primary, replica), (2, 1))
+
+    def test_write_pins_user_to_primary(self):
+        self.client.force_login(self.user)
+        response = self.client.post(f'/post/{self.post.pk}/edit/',
+                                    {'title': 'Пост', 'text': 'Новый текст'})
+        self.assertIn(PIN_COOKIE, response.cookies)
+        response, _, replica = self.get('/post/author_posts/')
+        self.assertContains(response, 'Пост')
+        self.assertEqual(replica, 0)
+        self.client.cookies.pop(PIN_COOKIE)
+        _, _, replica = self.get('/post/author_posts/')
+        self.assertGreater(replica, 0)
+
+    def test_reads_without_request_use_primary(self):
+        self.assertEqual(Post.objects.all().db, 'default')
+        state = RoutingState()
+        state.replica_reads = True
+        token = current_state.set(state)
+        try:
+            self.assertEqual(Post.objects.all().db, 'replica')
+            with CaptureQueriesContext(connections['default']) as queries:
+                self.assertEqual(next_slug(Post.objects, 'Пост'), 'post-1')
+            self.assertEqual(len(queries), 1)
+        finally:
+            current_state.reset(token)
+
+    def test_replicate(self):
+        with TemporaryDirectory() as tmp:
+            path = Path(tmp, 'replica.sqlite3')
+            with mock.patch.dict(connections['replica'].settings_dict,
+                                 NAME=str(path)):
+                self.assertEqual(replicate(), ['replica'])
+            with closing(sqlite3.connect(path)) as replica:
+                self.assertEqual(replica.execute(
+                    'SELECT title FROM blog_post').fetchall(), [('Пост',)])
+
+
+class CommentTest(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.user = User.objects.create_user('user', password='password')
+        self.post = Post.objects.create(title='Пост', text='текст',
+                                        created_by=self.user)
+        self.url = f'/post/{self.post.pk}/'
+
+    def tree(self):
+        first = add_comment(self.post, 'первый', self.user)
+        second = add_comment(self.post, 'второй')
+        reply = add_comment(self.post, 'ответ', parent=first)
+        add_comment(self.post, 'ответ на ответ', parent=reply)
+        add_comment(self.post, 'второй ответ', parent=first)
+        return second
+
+    def test_thread_is_depth_first(self):
+        self.tree()
+        thread = load_thread(self.post.pk)
+        self.assertEqual([(c.text, c.depth) for c in thread],
+                         [('первый', 0), ('ответ', 1), ('ответ на ответ', 2),
+                          ('второй ответ', 1), ('второй', 0)])
+        self.assertEqual(thread[0].author, 'user')
+
+    def test_thread_is_one_indexed_query(self):
+        self.tree()
+        with CaptureQueriesContext(connection) as queries:
+            load_thread(self.post.pk)
+        self.assertEqual(len(queries), 1)
+        with connection.cursor() as cur:
+            cur.execute('EXPLAIN QUERY PLAN ' + queries[0]['sql'])
+            plan = ' '.join(row[-1] for row in cur.fetchall())
+        self.assertIn('blog_commen_post_id', plan)
+        self.assertNotIn('TEMP B-TREE', plan)
+
+    def test_segments_sort_as_numbers(self):
+        self.assertEqual(path_segment(35), '0000000z')
+        self.assertLess(path_segment(35), path_segment(36))
+        self.assertLess(path_segment(36 ** 5), path_segment(36 ** 5 + 1))
+
+    def test_depth_is_limited(self):
+        comment = None
+        for _ in range(MAX_COMMENT_DEPTH + 2):
+            comment = add_comment(self.post, 'глубже', parent=comment)
+        self.assertEqual(comment.depth, MAX_COMMENT_DEPTH - 1)
+
+    def test_count_survives_post_save(self):
+        stale = Post.objects.get(pk=self.post.pk)
+        self.tree()
+        stale.text = 'Изменённый текст'
+        stale.save()
+        self.post.refresh_from_db()
+        self.assertEqual(self.post.comment_count, 5)
+        self.assertEqual(self.post.text, 'Изменённый текст')
+
+    def test_view(self):
+        etag = self.client.get(self.url)['ETag']
+        self.client.force_login(self.user)
+        response = self.client.post(f'{self.url}comment/',
+                                    {'text': 'Комментарий'})
+        comment = Comment.objects.get()
+        self.assertRedirects(response, f'{self.url}#comment-{comment.pk}',
+                             fetch_redirect_response=False)
+        form = self.client.get(f'{self.url}comment/',
+                               {'parent': comment.pk})
+        self.assertContains(form, f'value="{comment.pk}"')
+        self.client.post(f'{self.url}comment/', {'text': 'Ответ',
+                                                 'parent': comment.pk})
+        self.client.logout()
+        response = self.client.get(self.url, HTTP_IF_NONE_MATCH=etag)
+        self.assertContains(response, 'Ответ')
+        self.assertContains(response, 'margin-left: 1em')
+        self.assertContains(self.client.get('/'), 'комментариев: 2')
+
+    def test_parent_from_other_post(self):
+        other = Post.objects.create(title='Другой', text='текст')
+        comment = add_comment(other, 'чужой')
+        self.client.force_login(self.user)
+        response = self.client.post(f'{self.url}comment/',
+                                    {'text': 'Ответ', 'parent': comment.pk})
+        self.assertEqual(response.status_code, 404)
+        self.assertEqual(Comment.objects.filter(post=self.post).count(), 0)
+
+    def test_parent_out_of_range(self):
+        self.client.force_login(self.user)
+        for parent in (10 ** 23, 2 ** 63, 0, -1):
+            response = self.client.post(f'{self.url}comment/',
+                                        {'text': 'Ответ', 'parent': parent})
+            self.assertEqual(response.status_code, 200)
+            self.assertTrue(response.context['form'].errors['parent'])
+        self.assertEqual(Comment.objects.count(), 0)
@@ -0,0 +1,177 @@
+import logging
+import random
+from collections import defaultdict, deque
+from contextlib import ExitStack
+from contextvars import ContextVar
+from math import ceil
+from threading import Lock
+from time import perf_counter
+
+from django.conf import settings
+from django.core.exceptions import MiddlewareNotUsed
+from django.db import connections
+from django.template.backends.django import DjangoTemplates
+
+logger = logging.getLogger('blog.timing')
+
+# Замеры текущего запроса; None - замер не ведётся (middleware отключено
+# или код выполняется вне запроса)
+current_timing = ContextVar('blog_request_timing', default=None)
+# Процентили времени запросов в журнале
+PERCENTILES = (50, 95, 99)
+
+
+class RequestTiming:
+    """
+    Замеры одного запроса: время и количество запросов к базе данных,
+    время отрисовки шаблонов и общее время обработки (секунды).
+    """
+
+    def __init__(self):
+        self.db = 0.0
+        self.queries = 0
+        self.template = 0.0
+        self.total = 0.0
+
+    def __call__(self, execute, sql, params, many, context):
+        """
+        Обёртка выполнения запросов (connection.execute_wrapper).
+        """
+        start = perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.db += perf_counter() - start
+            self.queries += 1
+
+    def header(self) -> str:
+        """
+        Возвращает значение заголовка Server-Timing (длительности в мс).
+        """
+        return f'db;dur={self.db * 1000:.2f};desc="{self.queries} queries", ' \
+               f'tpl;dur={self.template * 1000:.2f}, ' \
+               f'total;dur={self.total * 1000:.2f}'
+
+
+class TimedTemplate:
+    """
+    Шаблон, время отрисовки которого добавляется к замерам текущего
+    запроса. Вне замера вызывается исходный render без измерений.
+    """
+
+    def __init__(self, template):
+        self.template = template
+
+    def __getattr__(self, name):
+        return getattr(self.template, name)
+
+    def render(self, context=None, request=None):
+        timing = current_timing.get()
+        if timing is None:
+            return self.template.render(context, request)
+        start = perf_counter()
+        try:
+            return self.template.render(context, request)
+        finally:
+            timing.template += perf_counter() - start
+
+
+class TimedDjangoTemplates(DjangoTemplates):
+    """
+    Шаблонизатор Django, измеряющий время отрисовки шаблонов верхнего
+    уровня (render, render_to_string). Вложенные шаблоны ({% extends %},
+    {% include %}) отрисовываются внутри них и отдельно не учитываются.
+    """
+
+    def from_string(self, template_code):
+        return TimedTemplate(super().from_string(template_code))
+
+    def get_template(self, template_name):
+        return TimedTemplate(super().get_template(template_name))
+
+
+def percentile(values: list, percent: float) -> float:
+    """
+    Функция возвращает процентиль отсортированного списка значений
+    (метод ближайшего ранга).
+    """
+    return values[max(ceil(percent / 100 * len(values)) - 1, 0)]
+
+
+class RouteStats:
+    """
+    Выборка замеров по маршрутам: для каждого маршрута хранятся последние
+    window замеров, после каждых log_every новых замеров маршрута
+    в журнал blog.timing записываются процентили PERCENTILES общего
+    времени и времени базы данных.
+    """
+
+    def __init__(self, window=1000, log_every=100):
+        self.log_every = log_every
+        self.samples = defaultdict(lambda: deque(maxlen=window))
+        self.counts = defaultdict(int)
+        self._lock = Lock()
+
+    def add(self, route: str, timing: RequestTiming):
+        with self._lock:
+            samples = self.samples[route]
+            samples.append((timing.total, timing.db))
+            self.counts[route] += 1
+            if self.counts[route] % self.log_every:
+                return
+            summary = self.summary(route)
+        logger.info('%s n=%d total p50/p95/p99=%s ms db p50/p95/p99=%s ms',
+                    route, len(samples), summary['total'], summary['db'])
+
+    def summary(self, route: str) -> dict:
+        """
+        Возвращает процентили общего времени и времени базы данных
+        маршрута (мс): {'total': [p50, p95, p99], 'db': [...]}.
+        """
+        samples = list(self.samples[route])
+        result = {}
+        for index, name in enumerate(('total', 'db')):
+            values = sorted(sample[index] for sample in samples)
+            result[name] = [round(percentile(values, percent) * 1000, 2)
+                            for percent in PERCENTILES]
+        return result
+
+
+class ServerTimingMiddleware:
+    """
+    Middleware замера времени запроса: время запросов к базе данных
+    (обёртка execute_wrapper на всех соединениях), время отрисовки
+    шаблонов (шаблонизатор TimedDjangoTemplates) и общее время обработки
+    запроса. Замеры отдаются в заголовке Server-Timing, доля
+    BLOG_TIMING_SAMPLE_RATE запросов попадает в статистику по маршрутам
+    (RouteStats). Если BLOG_SERVER_TIMING выключен, middleware исключается
+    из цепочки при запуске (MiddlewareNotUsed), а шаблоны отрисовываются
+    с одной проверкой ContextVar.
+    """
+
+    def __init__(self, get_response):
+        if not getattr(settings, 'BLOG_SERVER_TIMING', False):
+            raise MiddlewareNotUsed
+        self.get_response = get_response
+        self.sample_rate = getattr(settings, 'BLOG_TIMING_SAMPLE_RATE', 0.01)
+        self.stats = RouteStats(
+            log_every=getattr(settings, 'BLOG_TIMING_LOG_EVERY', 100))
+
+    def __call__(self, request):
+        timing = RequestTiming()
+        token = current_timing.set(timing)
+        start = perf_counter()
+        try:
+            with ExitStack() as stack:
+                for connection in connections.all():
+                    stack.enter_context(connection.execute_wrapper(timing))
+                response = self.get_response(request)
+        finally:
+            timing.total = perf_counter() - start
+            current_timing.reset(token)
+        response['Server-Timing'] = timing.header()
+        if random.random() < self.sample_rate:
+            match = request.resolver_match
+            self.stats.add(match.view_name if match else request.path_info,
+                           timing)
+        return response
@@ -0,0 +1,167 @@
+import json
+from contextlib import contextmanager
+from datetime import datetime
+from itertools import islice
+
+from django.contrib.auth import get_user_model
+from django.db import transaction
+from django.db.models import Max
+from django.utils import timezone
+
+from blog.cache import author_cache
+from blog.models import Post
+from blog.search import index_posts_after
+from blog.slugs import allocate_slugs
+
+# Поля поста в файле экспорта (JSON Lines, один пост на строку)
+EXPORT_FIELDS = ('title', 'text', 'author', 'created_at')
+# Количество строк, читаемых из базы за один раз при экспорте
+EXPORT_CHUNK_SIZE = 2000
+# Количество постов в одной пачке bulk_create при импорте
+IMPORT_BATCH_SIZE = 1000
+
+
+def export_posts(stream, chunk_size=EXPORT_CHUNK_SIZE) -> int:
+    """
+    Функция записывает все посты в поток stream в формате JSON Lines
+    в порядке id. Посты читаются курсором базы данных
+    (iterator(chunk_size)) без кеша результатов набора записей, поэтому
+    в памяти одновременно находится не больше chunk_size строк.
+    :param stream: Текстовый поток для записи.
+    :param chunk_size: Количество строк, читаемых из базы за один раз.
+    :return: Количество выгруженных постов.
+    """
+    rows = Post.objects.order_by('pk').values_list(
+        'title', 'text', 'created_by__username', 'created_at'
+    ).iterator(chunk_size=chunk_size)
+    count = 0
+    for title, text, author, created_at in rows:
+        record = dict(zip(EXPORT_FIELDS,
+                          (title, text, author, created_at.isoformat())))
+        stream.write(json.dumps(record, ensure_ascii=False) + '\n')
+        count += 1
+    return count
+
+
+def read_records(stream):
+    """
+    Генератор разбирает строки JSON Lines из потока stream, пропуская
+    пустые строки.
+    :raise ValueError: Если строка не является объектом JSON с заголовком
+    и текстом поста (в сообщении - номер строки).
+    """
+    for number, line in enumerate(stream, 1):
+        if not line.strip():
+            continue
+        try:
+            record = json.loads(line)
+        except ValueError as exc:
+            raise ValueError(f'Строка {number}: некорректный JSON '
+                             f'({exc})') from exc
+        if not isinstance(record, dict) or 'title' not in record or \
+                'text' not in record:
+            raise ValueError(f'Строка {number}: нет заголовка или текста '
+                             f'поста')
+        yield record
+
+
+class AuthorMap:
+    """
+    Соответствие имени пользователя и id автора для импорта. Имена,
+    которых ещё нет в словаре, запрашиваются одним запросом на пачку
+    постов; отсутствующие пользователи запоминаются как None (пост
+    импортируется без автора).
+    """
+
+    def __init__(self):
+        self.ids = {}
+        self.missing = set()
+
+    def resolve(self, usernames):
+        unknown = {name for name in usernames
+                   if name is not None and name not in self.ids}
+        if not unknown:
+            return
+        found = dict(get_user_model().objects.filter(
+            username__in=unknown).values_list('username', 'pk'))
+        for name in unknown:
+            self.ids[name] = found.get(name)
+            if name not in found:
+                self.missing.add(name)
+
+    def get(self, username):
+        return self.ids.get(username)
+
+
+@contextmanager
+def keep_created_at():
+    """
+    Контекстный менеджер временно отключает auto_now_add у Post.created_at,
+    чтобы bulk_create сохранил дату создания из файла (для записей без
+    даты подставляется время импорта). Время изменения (updated_at)
+    остаётся временем импорта.
+    """
+    field = Post._meta.get_field('created_at')
+    field.auto_now_add = False
+    try:
+        yield
+    finally:
+        field.auto_now_add = True
+
+
+def import_batch(records: list, authors: AuthorMap) -> set:
+    """
+    Функция сохраняет пачку постов одним bulk_create в транзакции: слаги
+    распределяются для всей пачки (allocate_slugs), анонсы вычисляются
+    заранее, новые посты добавляются в полнотекстовый индекс одним
+    запросом. bulk_create не отправляет сигналы, поэтому после
+    сохранения пачки кеш списков постов её авторов сбрасывается явно:
+    если импорт прервётся на следующей пачке, уже сохранённые посты
+    не останутся скрытыми устаревшими страницами кеша.
+    :return: Количество сохранённых постов.
+    """
+    authors.resolve(record.get('author') for record in records)
+    now = timezone.now()
+    with transaction.atomic():
+        last_id = Post.objects.aggregate(last_id=Max('pk'))['last_id'] or 0
+        slugs = allocate_slugs(Post.objects,
+                               [record['title'] for record in records])
+        posts = []
+        for record, slug in zip(records, slugs):
+            created_at = record.get('created_at')
+            post = Post(title=record['title'], text=record['text'], slug=slug,
+                        created_by_id=authors.get(record.get('author')),
+                        created_at=datetime.fromisoformat(created_at)
+                        if created_at else now)
+            post.update_summary()
+            posts.append(post)
+        with keep_created_at():
+            Post.objects.bulk_create(posts)
+        index_posts_after(last_id)
+    for author_id in {post.created_by_id for post in posts} - {None}:
+        author_cache.bump(author_id)
+    return len(posts)
+
+
+def import_posts(stream, batch_size=IMPORT_BATCH_SIZE):
+    """
+    Функция загружает посты из потока stream в формате JSON Lines пачками
+    по batch_size постов. Файл читается построчно, и в памяти находится
+    только одна пачка, поэтому расход памяти не зависит от размера файла.
+    Кеш списков постов авторов сбрасывается после каждой пачки
+    (import_batch); чтобы сброс дошёл до сервера, кеш блога должен быть
+    общим для процессов.
+    :param stream: Текстовый поток для чтения.
+    :param batch_size: Количество постов в пачке.
+    :return: Пара (количество импортированных постов, множество имён
+    авторов, не найденных среди пользователей).
+    """
+    records = read_records(stream)
+    authors = AuthorMap()
+    count = 0
+    while True:
+        batch = list(islice(records, batch_size))
+        if not batch:
+            break
+        count += import_batch(batch, authors)
+    return count, authors.missing
@@ -1,11 +1,48 @@
 from django.contrib.auth.decorators import login_required
 from django.contrib.auth.forms import UserCreationForm
-from django.core.paginator import Paginator
 from django.http import Http404
 from django.shortcuts import redirect, render, get_object_or_404
+from django.utils.safestring import mark_safe
 
-from blog.forms import PostForm
-from blog.models import Post
+from blog.cache import author_cache, post_cache, render_post
+from blog.conditional import conditional_view, list_validators, \
+    post_validators
+from blog.comments import add_comment, render_comments
+from blog.forms import CommentForm, PostForm
+from blog.models import Comment, Post
+from blog.pagination import CursorPaginator
+from blog.routers import replica_reads, use_primary
+from blog.search import search_posts
+
+# Поля постов, которые выводятся в списках (шаблон home.html): полный
+# текст не загружается, автор выбирается тем же запросом
+LIST_FIELDS = ('title', 'excerpt', 'word_count', 'comment_count',
+               'created_at', 'created_by__username')
+
+
+def list_queryset():
+    """
+    Функция возвращает набор постов для списков: только поля LIST_FIELDS
+    и автор через select_related.
+    """
+    return Post.objects.select_related('created_by').only(*LIST_FIELDS)
+
+
+def post_list_paginator(request) -> CursorPaginator:
+    return CursorPaginator(list_queryset(), 5)
+
+
+def author_list_paginator(request) -> CursorPaginator:
+    return CursorPaginator(list_queryset().filter(created_by=request.user), 5)
+
+
+def post_list_validators(request):
+    return list_validators(request, post_list_paginator(request))
+
+
+def author_list_validators(request):
+    return list_validators(request, author_list_paginator(request),
+                           request.user.pk)
 
 
 # class CreateUser(CreateView):
@@ -43,9 +80,16 @@ def create_user(request):
 #     paginate_by = 5
 #     ordering = '-created_at'
 
+@replica_reads
+@conditional_view(post_list_validators)
 def post_list(request):
-    queryset = Post.objects.all().order_by('-created_at')
-    paginator = Paginator(queryset, 5)
+    """
+    Функция выводит список всех постов, новые сначала, с курсорной
+    пагинацией по (created_at, id): параметр page содержит курсор страницы.
+    Загружаются только поля, нужные для списка (анонс вместо текста).
+    Поддерживается условный GET (ETag/Last-Modified по постам страницы).
+    """
+    paginator = post_list_paginator(request)
     page_number = request.GET.get('page')
     page_obj = paginator.get_page(page_number)
     context = {'page_obj': page_obj}
@@ -68,12 +112,24 @@ def post_list(request):
 #         queryset = queryset.filter(created_by=self.request.user)
 #         return queryset
 
+@replica_reads
+@conditional_view(author_list_validators)
 def post_author_list(request):
-    queryset = Post.objects.filter(created_by=request.user).order_by(
-        '-created_at')
-    paginator = Paginator(queryset, 5)
-    page_number = request.GET.get('page')
-    page_obj = paginator.get_page(page_number)
+    """
+    Функция выводит список постов текущего пользователя с курсорной
+    пагинацией (по индексу (created_by, created_at)), без загрузки полного
+    текста постов. Страницы списка
+    хранятся в кеше author_cache, версия которого меняется при любом
+    изменении постов автора. Поддерживается условный GET.
+    """
+    page_number = request.GET.get('page') or ''
+    page_obj = author_cache.get(request.user.pk, page_number)
+    if page_obj is None:
+        # Страница для кеша читается из основной базы (см. use_primary)
+        with use_primary():
+            paginator = author_list_paginator(request)
+            page_obj = paginator.get_page(page_number)
+        author_cache.set(request.user.pk, page_obj, page_number)
     context = {'page_obj': page_obj}
     return render(request, 'home.html', context)
 
@@ -86,9 +142,33 @@ def post_author_list(request):
 #     model = Post
 #     template_name = 'post_detail.html'
 
+@replica_reads
+@conditional_view(post_validators)
 def post_detail(request, pk):
-    post = get_object_or_404(Post, id=pk)
-    context = {'object': post}
+    """
+    Функция выводит пост и ветку комментариев. Отрисованные содержимое
+    поста и ветка комментариев берутся из кеша post_cache; при промахе
+    они загружаются из базы и отрисовываются заново. Ссылки
+    на редактирование и удаление выводятся автору по id автора из кеша,
+    без загрузки поста. Если копия клиента актуальна (ETag/Last-Modified
+    по времени изменения поста), возвращается 304.
+    """
+    rendered = post_cache.get(pk)
+    if rendered is None:
+        # Пост для кеша читается из основной базы (см. use_primary)
+        with use_primary():
+            post = get_object_or_404(
+                Post.objects.select_related('created_by'), id=pk)
+        rendered = render_post(post)
+    author_id, _, body = rendered
+    comments = post_cache.get(pk, 'comments')
+    if comments is None:
+        with use_primary():
+            comments = render_comments(pk)
+    context = {'post_id': pk, 'body': mark_safe(body),
+               'comments': mark_safe(comments),
+               'is_author': author_id is not None and
+               author_id == request.user.pk}
     return render(request, 'post_detail.html', context)
 
 
@@ -144,7 +224,9 @@ def post_update(request, pk):
     if request.POST:
         form = PostForm(request.POST, instance=post)
         if form.is_valid():
-            form.save()
+            # Кеш сбрасывается сигналом post_save, новое содержимое сразу
+            # записывается в кеш (write-through)
+            render_post(form.save())
             return redirect('post_detail', pk)
     form = PostForm(instance=post)
     context = {'form': form}
@@ -181,3 +263,41 @@ def post_delete(request, pk):
     form = PostForm(instance=post)
     context = {'form': form, 'object': post}
     return render(request, 'post_delete.html', context)
+
+
+@login_required(login_url='login_user')
+def comment_new(request, pk):
+    """
+    Функция добавляет комментарий к посту или ответ на комментарий
+    (параметр parent). После сохранения перенаправляет на страницу
+    поста к новому комментарию.
+    """
+    post = get_object_or_404(Post.objects.only('id', 'created_by'), id=pk)
+    form = CommentForm(request.POST or None,
+                       initial={'parent': request.GET.get('parent')})
+    if form.is_bound and form.is_valid():
+        parent = None
+        if form.cleaned_data['parent']:
+            parent = get_object_or_404(Comment, id=form.cleaned_data['parent'],
+                                       post=post)
+        comment = add_comment(post, form.cleaned_data['text'], request.user,
+                              parent)
+        return redirect(f'{post.get_absolute_url()}#comment-{comment.pk}')
+    context = {'form': form, 'post_id': pk}
+    return render(request, 'comment_new.html', context)
+
+
+def post_search(request):
+    """
+    Функция ищет посты по строке из параметра q в полнотекстовом индексе
+    и выводит страницу результатов (параметр page - номер страницы),
+    упорядоченных по релевантности, с фрагментами текста.
+    """
+    query = request.GET.get('q', '').strip()
+    try:
+        page = int(request.GET.get('page', 1))
+    except (ValueError, OverflowError):
+        page = 1
+    page_obj = search_posts(query, page)
+    context = {'query': query, 'page_obj': page_obj}
+    return render(request, 'search.html', context)
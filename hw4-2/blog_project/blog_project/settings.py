@@ -10,6 +10,7 @@ For the full list of settings and their values, see
 https://docs.djangoproject.com/en/3.2/ref/settings/
 """
 from pathlib import Path
+from tempfile import gettempdir
 
 # Build paths inside the project like this: BASE_DIR / 'subdir'.
 BASE_DIR = Path(__file__).resolve().parent.parent
@@ -40,6 +41,8 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
+    'blog.timing.ServerTimingMiddleware',
+    'blog.routers.PrimaryPinMiddleware',
     'django.middleware.security.SecurityMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
@@ -53,7 +56,8 @@ ROOT_URLCONF = 'blog_project.urls'
 
 TEMPLATES = [
     {
-        'BACKEND': 'django.template.backends.django.DjangoTemplates',
+        # DjangoTemplates с замером времени отрисовки для Server-Timing
+        'BACKEND': 'blog.timing.TimedDjangoTemplates',
         'DIRS': [],
         'APP_DIRS': True,
         'OPTIONS': {
@@ -77,9 +81,27 @@ DATABASES = {
     'default': {
         'ENGINE': 'django.db.backends.sqlite3',
         'NAME': BASE_DIR / 'db.sqlite3',
-    }
+    },
+    # Реплика только для чтения: копия default, которую обновляет команда
+    # replicate (backup API SQLite). В тестах - зеркало default
+    'replica': {
+        'ENGINE': 'django.db.backends.sqlite3',
+        'NAME': BASE_DIR / 'db_replica.sqlite3',
+        'TEST': {'MIRROR': 'default'},
+    },
 }
 
+# Чтение с реплик в представлениях списков и постов (blog.routers)
+DATABASE_ROUTERS = ['blog.routers.ReplicaRouter']
+
+# Алиасы реплик, с которых читают представления replica_reads. Чтобы
+# включить чтение с реплики, добавьте 'replica' и запустите
+# manage.py replicate. Время (с), на которое пользователь после записи
+# закрепляется за основной базой, должно быть больше периода репликации
+BLOG_REPLICAS = []
+BLOG_PRIMARY_PIN_SECONDS = 10
+BLOG_REPLICATION_INTERVAL = 2
+
 
 # Password validation
 # https://docs.djangoproject.com/en/3.2/ref/settings/#auth-password-validators
@@ -126,3 +148,43 @@ DEFAULT_AUTO_FIELD = 'django.db.models.BigAutoField'
 
 # редирект на главную страницу после удачной авторизации пользователя
 LOGIN_REDIRECT_URL = 'home'
+
+# Кеш отрисованных постов и списков постов авторов
+# https://docs.djangoproject.com/en/3.2/topics/cache/
+# Кеш должен быть общим для всех процессов (файловый, Redis, Memcached):
+# версии записей меняют и процессы сервера, и команды управления
+# (import_posts), а LocMemCache виден только своему процессу
+
+CACHES = {
+    'default': {
+        'BACKEND': 'django.core.cache.backends.filebased.FileBasedCache',
+        'LOCATION': Path(gettempdir()) / 'blog_project_cache',
+    }
+}
+
+# Алиас кеша Django и время жизни записей кеша блога (с)
+BLOG_CACHE_ALIAS = 'default'
+BLOG_CACHE_TIMEOUT = 3600
+
+# Замер времени запросов (blog.timing.ServerTimingMiddleware): заголовок
+# Server-Timing, доля запросов, попадающих в статистику по маршрутам,
+# и через сколько замеров маршрута записывать процентили в журнал
+BLOG_SERVER_TIMING = DEBUG
+BLOG_TIMING_SAMPLE_RATE = 0.01
+BLOG_TIMING_LOG_EVERY = 100
+
+LOGGING = {
+    'version': 1,
+    'disable_existing_loggers': False,
+    'handlers': {
+        'console': {
+            'class': 'logging.StreamHandler',
+        },
+    },
+    'loggers': {
+        'blog.timing': {
+            'handlers': ['console'],
+            'level': 'INFO',
+        },
+    },
+}
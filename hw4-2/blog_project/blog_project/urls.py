@@ -17,7 +17,7 @@ from django.contrib import admin
 from django.urls import path
 
 from blog.views import post_detail, create_user, post_list, post_author_list, \
-    create_post_view, post_update, post_delete
+    create_post_view, post_update, post_delete, post_search, comment_new
 import django.contrib.auth.views as auth_views
 
 
@@ -34,5 +34,7 @@ urlpatterns = [
     path('post/<int:pk>/', post_detail, name='post_detail'),
     path('post/<int:pk>/edit/', post_update, name='post_edit'),
     path('post/<int:pk>/delete/', post_delete, name='post_delete'),
+    path('post/<int:pk>/comment/', comment_new, name='comment_new'),
     path('post/author_posts/', post_author_list, name='post_author_list'),
+    path('search/', post_search, name='post_search'),
 ]
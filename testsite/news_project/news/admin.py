@@ -22,6 +22,7 @@ class NewsAdmin(admin.ModelAdmin):
     search_fields = ('title', 'content')
     list_editable = ('is_published',)
     list_filter = ('is_published', 'category')
+    readonly_fields = ('views',)
 
 
 class CategoryAdmin(admin.ModelAdmin):
@@ -5,3 +5,7 @@ class NewsConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'news'
     verbose_name = 'Новости'  # Замена названия в меню админки
+
+    def ready(self):
+        # Подключение обработчиков сигналов сброса кеша категорий
+        import news.signals  # noqa: F401
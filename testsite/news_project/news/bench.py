@@ -0,0 +1,63 @@
+from contextlib import contextmanager
+from statistics import median
+from time import perf_counter
+
+from django.db import connection
+from django.test.utils import setup_test_environment, \
+    teardown_test_environment
+
+from .counters import view_buffer
+
+
+@contextmanager
+def test_database():
+    """
+    Контекстный менеджер для бенчмарков: создаёт тестовую базу данных
+    (как при запуске manage.py test), чтобы не засорять рабочую
+    db.sqlite3, и удаляет её после замеров. Также настраивается тестовое
+    окружение, чтобы можно было использовать тестовый клиент. Буфер
+    просмотров очищается, иначе при завершении процесса он записался бы
+    в рабочую базу.
+    """
+    setup_test_environment()
+    old_name = connection.settings_dict['NAME']
+    connection.creation.create_test_db(verbosity=0, autoclobber=True)
+    try:
+        yield connection
+    finally:
+        view_buffer.drain()
+        connection.creation.destroy_test_db(old_name, verbosity=0)
+        teardown_test_environment()
+
+
+class QueryCounter:
+    """
+    Обёртка выполнения запросов (connection.execute_wrapper), считающая
+    запросы.
+    """
+
+    def __init__(self):
+        self.count = 0
+
+    def __call__(self, execute, sql, params, many, context):
+        self.count += 1
+        return execute(sql, params, many, context)
+
+
+def measure(func, repeat, before=None):
+    """
+    Выполняет func repeat раз (перед каждым разом - before, если указана).
+    :return: Медиана времени выполнения (мс) и количество запросов
+    к базе за один вызов.
+    """
+    times = []
+    counter = QueryCounter()
+    for _ in range(repeat):
+        if before is not None:
+            before()
+        counter.count = 0
+        with connection.execute_wrapper(counter):
+            start = perf_counter()
+            func()
+            times.append(perf_counter() - start)
+    return median(times) * 1000, counter.count
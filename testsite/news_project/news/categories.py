@@ -0,0 +1,81 @@
+from django.conf import settings
+from django.core.cache import caches
+from django.db.models import Count
+
+from .models import Category, News
+
+# Ключ кеша со списком категорий [(id, название)] в порядке сортировки
+CATEGORIES_KEY = 'news:categories'
+# Шаблон ключа кеша количества опубликованных новостей категории
+COUNT_KEY = 'news:category_count:{}'
+
+
+def get_cache():
+    return caches[getattr(settings, 'NEWS_CATEGORIES_CACHE_ALIAS', 'default')]
+
+
+def cache_timeout():
+    return getattr(settings, 'NEWS_CATEGORIES_CACHE_TIMEOUT', 3600)
+
+
+def count_key(category_id):
+    return COUNT_KEY.format(category_id)
+
+
+def load_categories(cache):
+    """
+    Загружает список категорий [(id, название)] и сохраняет его в кеше.
+    """
+    categories = list(Category.objects.values_list('pk', 'title'))
+    cache.set(CATEGORIES_KEY, categories, cache_timeout())
+    return categories
+
+
+def load_counts(cache, category_ids):
+    """
+    Считает опубликованные новости в указанных категориях одним запросом
+    с группировкой по индексу category_id и сохраняет результат в кеше.
+    """
+    found = dict(News.objects.filter(
+        category_id__in=category_ids, is_published=True
+    ).order_by().values('category_id').annotate(
+        cnt=Count('pk')).values_list('category_id', 'cnt'))
+    counts = {pk: found.get(pk, 0) for pk in category_ids}
+    cache.set_many({count_key(pk): cnt for pk, cnt in counts.items()},
+                   cache_timeout())
+    return counts
+
+
+def sidebar_categories():
+    """
+    Возвращает категории с опубликованными новостями для боковой панели
+    (тег show_categories): у каждой категории атрибут cnt - количество
+    новостей. Список категорий и количество новостей в каждой хранятся
+    в кеше отдельными ключами, поэтому изменение новости пересчитывает
+    только её категории, а не агрегат по всей таблице новостей.
+    """
+    cache = get_cache()
+    categories = cache.get(CATEGORIES_KEY)
+    if categories is None:
+        categories = load_categories(cache)
+    keys = {count_key(pk): pk for pk, _ in categories}
+    counts = {keys[key]: cnt
+              for key, cnt in cache.get_many(list(keys)).items()}
+    missing = [pk for pk in keys.values() if pk not in counts]
+    if missing:
+        counts.update(load_counts(cache, missing))
+    result = []
+    for pk, title in categories:
+        if counts[pk]:
+            category = Category(pk=pk, title=title)
+            category.cnt = counts[pk]
+            result.append(category)
+    return result
+
+
+def invalidate_counts(category_ids):
+    get_cache().delete_many([count_key(pk) for pk in category_ids])
+
+
+def invalidate_categories():
+    get_cache().delete(CATEGORIES_KEY)
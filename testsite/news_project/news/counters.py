@@ -0,0 +1,120 @@
+import atexit
+import logging
+from collections import Counter, defaultdict
+from threading import Lock
+from time import monotonic
+
+from django.conf import settings
+from django.core.cache import caches
+from django.db import DatabaseError, transaction
+from django.db.models import F
+
+from .models import News
+
+logger = logging.getLogger('news.counters')
+
+# Максимальное количество id новостей в одном UPDATE (ограничение SQLite
+# на число параметров запроса)
+UPDATE_BATCH_SIZE = 500
+
+
+def flush_size():
+    return getattr(settings, 'NEWS_VIEWS_FLUSH_SIZE', 100)
+
+
+def flush_interval():
+    return getattr(settings, 'NEWS_VIEWS_FLUSH_INTERVAL', 10)
+
+
+class ViewBuffer:
+    """
+    Буфер просмотров новостей в памяти процесса. Просмотры копятся
+    по id новости и записываются в базу пакетом запросов
+    UPDATE views = views + n (по одному на каждое значение n), когда
+    в буфере накопилось NEWS_VIEWS_FLUSH_SIZE просмотров или с прошлой
+    записи прошло NEWS_VIEWS_FLUSH_INTERVAL секунд. Приращение
+    считается в базе (F-выражение), поэтому буферы нескольких процессов
+    не затирают просмотры друг друга.
+    """
+
+    def __init__(self):
+        self._counts = Counter()
+        self._pending = 0
+        self._flushed_at = monotonic()
+        self._lock = Lock()
+
+    def add(self, news_id, count=1):
+        with self._lock:
+            self._counts[news_id] += count
+            self._pending += count
+            due = self._pending >= flush_size() or \
+                monotonic() - self._flushed_at >= flush_interval()
+        if due:
+            self.flush()
+
+    def drain(self):
+        """
+        Забирает накопленные просмотры и очищает буфер.
+        :return: Counter {id новости: количество просмотров}.
+        """
+        with self._lock:
+            counts, self._counts = self._counts, Counter()
+            self._pending = 0
+            self._flushed_at = monotonic()
+        return counts
+
+    def flush(self):
+        """
+        Записывает накопленные просмотры в базу. Если запись не удалась,
+        просмотры возвращаются в буфер и будут записаны при следующем
+        сбросе.
+        :return: Количество записанных просмотров.
+        """
+        counts = self.drain()
+        if not counts:
+            return 0
+        ids_by_count = defaultdict(list)
+        for news_id, count in counts.items():
+            ids_by_count[count].append(news_id)
+        try:
+            with transaction.atomic():
+                for count, ids in ids_by_count.items():
+                    for start in range(0, len(ids), UPDATE_BATCH_SIZE):
+                        News.objects.filter(
+                            pk__in=ids[start:start + UPDATE_BATCH_SIZE]
+                        ).update(views=F('views') + count)
+        except DatabaseError:
+            logger.exception('Ошибка записи просмотров новостей')
+            with self._lock:
+                self._counts.update(counts)
+                self._pending += sum(counts.values())
+            return 0
+        return sum(counts.values())
+
+
+# Буфер просмотров процесса; остаток записывается при завершении процесса
+view_buffer = ViewBuffer()
+atexit.register(view_buffer.flush)
+
+
+def is_repeat_view(request, news_id):
+    """
+    Проверяет, смотрели ли новость в этой сессии за последние
+    NEWS_VIEWS_UNIQUE_WINDOW секунд (0 - повторы не отсеиваются).
+    Отметки о просмотрах хранятся в кеше NEWS_VIEWS_CACHE_ALIAS
+    и истекают сами. Сессия для посетителя без неё не создаётся (иначе
+    каждый запрос без cookie, например от поискового робота, записывал бы
+    строку сессии в базу), поэтому такие просмотры не отсеиваются.
+    """
+    window = getattr(settings, 'NEWS_VIEWS_UNIQUE_WINDOW', 0)
+    session_key = request.session.session_key
+    if not window or session_key is None:
+        return False
+    cache = caches[getattr(settings, 'NEWS_VIEWS_CACHE_ALIAS', 'default')]
+    return not cache.add(f'news_viewed:{session_key}:{news_id}', True,
+                         window)
+
+
+def count_view(request, news_id):
+    if not is_repeat_view(request, news_id):
+        view_buffer.add(news_id)
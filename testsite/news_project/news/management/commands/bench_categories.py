@@ -0,0 +1,87 @@
+from django.core.cache import cache
+from django.core.management.base import BaseCommand
+from django.db import connection, transaction
+from django.db.models import Count, F
+from django.test import Client, override_settings
+from django.utils import timezone
+
+from news.bench import measure, test_database
+from news.categories import sidebar_categories
+from news.models import Category, News
+
+INSERT_NEWS = 'INSERT INTO news_news (title, content, created_at, ' \
+              'updated_at, photo, is_published, category_id, views) ' \
+              'VALUES (%s, %s, %s, %s, %s, %s, %s, 0)'
+LOCMEM_CACHES = {'default': {
+    'BACKEND': 'django.core.cache.backends.locmem.LocMemCache'}}
+# Количество строк в одном executemany при заполнении таблицы новостей
+SEED_CHUNK = 50000
+
+
+def seed(news_count, category_count):
+    """
+    Заполняет таблицу новостей: новости равномерно по категориям,
+    каждая десятая не опубликована.
+    """
+    categories = [Category.objects.create(title=f'Категория {i}').pk
+                  for i in range(category_count)]
+    now = timezone.now()
+    with transaction.atomic(), connection.cursor() as cursor:
+        for start in range(0, news_count, SEED_CHUNK):
+            cursor.executemany(INSERT_NEWS, [
+                (f'Новость {i}', 'Текст новости', now, now, '', i % 10 != 0,
+                 categories[i % category_count])
+                for i in range(start, min(start + SEED_CHUNK, news_count))])
+
+
+def toggle_published(news):
+    news.is_published = not news.is_published
+    news.save()
+
+
+def old_sidebar():
+    return list(Category.objects.annotate(
+        cnt=Count('news', filter=F('news__is_published'))).filter(cnt__gt=0))
+
+
+class Command(BaseCommand):
+    help = 'Измеряет запросы и время отрисовки боковой панели категорий ' \
+           '(тег show_categories) на таблице новостей из --news строк ' \
+           '(на временной тестовой базе данных).'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--news', type=int, default=1000000,
+                            help='Количество новостей.')
+        parser.add_argument('--categories', type=int, default=20,
+                            help='Количество категорий.')
+        parser.add_argument('--repeat', type=int, default=20,
+                            help='Количество повторов каждого замера.')
+
+    def report(self, name, result):
+        elapsed, queries = result
+        self.stdout.write(f'{name:<44} {elapsed:>9.2f} мс, '
+                          f'запросов: {queries}')
+
+    def handle(self, *args, **options):
+        repeat = options['repeat']
+        # Без панели отладки (DEBUG=False), кеш - в памяти, чтобы не
+        # трогать файловый кеш проекта
+        with override_settings(DEBUG=False, CACHES=LOCMEM_CACHES), \
+                test_database():
+            seed(options['news'], options['categories'])
+            news = News.objects.order_by('pk')[0]
+            self.report('агрегат по всей таблице (до изменения)',
+                        measure(old_sidebar, repeat))
+            self.report('sidebar_categories, пустой кеш',
+                        measure(sidebar_categories, repeat, cache.clear))
+            self.report('sidebar_categories, после изменения новости',
+                        measure(sidebar_categories, repeat,
+                                lambda: toggle_published(news)))
+            self.report('sidebar_categories из кеша',
+                        measure(sidebar_categories, repeat))
+            client = Client()
+            url = news.get_absolute_url()
+            self.report('страница новости, пустой кеш', measure(
+                lambda: client.get(url), repeat, cache.clear))
+            self.report('страница новости, категории из кеша', measure(
+                lambda: client.get(url), repeat))
@@ -0,0 +1,45 @@
+from django.core.cache import cache
+from django.core.management.base import BaseCommand
+from django.test import Client, override_settings
+
+from news.bench import measure, test_database
+from news.management.commands.bench_categories import LOCMEM_CACHES, seed
+from news.models import News
+
+
+class Command(BaseCommand):
+    help = 'Измеряет пропускную способность страниц новостей для ' \
+           'анонимных пользователей с пустым и заполненным кешем страниц ' \
+           '(на временной тестовой базе данных).'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--news', type=int, default=100000,
+                            help='Количество новостей.')
+        parser.add_argument('--categories', type=int, default=20,
+                            help='Количество категорий.')
+        parser.add_argument('--repeat', type=int, default=50,
+                            help='Количество запросов каждой страницы.')
+
+    def handle(self, *args, **options):
+        repeat = options['repeat']
+        # Без панели отладки (DEBUG=False), кеш - в памяти, чтобы не
+        # трогать файловый кеш проекта
+        with override_settings(DEBUG=False, CACHES=LOCMEM_CACHES), \
+                test_database():
+            seed(options['news'], options['categories'])
+            news = News.objects.filter(is_published=True).order_by('pk')[0]
+            category = news.category
+            pages = [('главная', '/'),
+                     ('категория', category.get_absolute_url()),
+                     ('новость', news.get_absolute_url())]
+            client = Client()
+            for name, url in pages:
+                for state, before in (('пустой кеш', cache.clear),
+                                      ('кеш заполнен', None)):
+                    assert client.get(url).status_code == 200
+                    elapsed, queries = measure(lambda: client.get(url),
+                                               repeat, before)
+                    self.stdout.write(
+                        f'{name:<10} {state:<13} {elapsed:>9.2f} мс, '
+                        f'{1000 / elapsed:>8.0f} запросов/с, '
+                        f'запросов к базе: {queries}')
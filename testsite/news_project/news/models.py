@@ -21,6 +21,17 @@ class News(models.Model):
     def get_absolute_url(self):  # получение абсолютной ссылки на пост
         return reverse('view_news', kwargs={'pk': self.pk})
 
+    def save(self, *args, **kwargs):
+        # Просмотры увеличиваются только запросом UPDATE с F-выражением
+        # (news.counters) и могли измениться после загрузки новости,
+        # поэтому при сохранении существующей новости они не записываются
+        if self.pk and not self._state.adding and \
+                kwargs.get('update_fields') is None:
+            kwargs['update_fields'] = [
+                field.name for field in self._meta.concrete_fields
+                if not field.primary_key and field.name != 'views']
+        super().save(*args, **kwargs)
+
     class Meta:  # Настройка админки "под себя"
         verbose_name = 'Новость'
         verbose_name_plural = 'Новости'
@@ -0,0 +1,126 @@
+from hashlib import md5
+from time import time_ns
+
+from django.conf import settings
+from django.contrib.messages import get_messages
+from django.core.cache import caches
+
+# Ключ кеша версии страниц области: главной, категории или новости
+VERSION_KEY = 'news:page_version:{}'
+# Ключ кеша страницы: версии её областей и хеш полного URL
+PAGE_KEY = 'news:page:{}:{}'
+
+
+def get_cache():
+    return caches[getattr(settings, 'NEWS_PAGE_CACHE_ALIAS', 'default')]
+
+
+def page_timeout():
+    return getattr(settings, 'NEWS_PAGE_CACHE_TIMEOUT', 300)
+
+
+def home_scope():
+    return 'home'
+
+
+def category_scope(category_id):
+    return f'category:{category_id}'
+
+
+def news_scope(news_id):
+    return f'news:{news_id}'
+
+
+def scope_versions(cache, scopes):
+    """
+    Возвращает текущие версии областей страниц. Начальная версия -
+    текущее время, а не 0: если ключ версии вытеснен из кеша, страницы
+    со старой версией не станут снова актуальными.
+    """
+    keys = [VERSION_KEY.format(scope) for scope in scopes]
+    versions = cache.get_many(keys)
+    for key in keys:
+        if key not in versions:
+            cache.add(key, time_ns(), None)
+            versions[key] = cache.get(key)
+    return [versions[key] for key in keys]
+
+
+def bump_versions(scopes):
+    """
+    Увеличивает версии областей: все закешированные страницы этих
+    областей перестают использоваться (и истекают по таймауту).
+    """
+    cache = get_cache()
+    for scope in scopes:
+        key = VERSION_KEY.format(scope)
+        try:
+            cache.incr(key)
+        except ValueError:
+            cache.set(key, time_ns(), None)
+
+
+def page_key(request, versions):
+    url = md5(request.build_absolute_uri().encode()).hexdigest()
+    return PAGE_KEY.format('.'.join(map(str, versions)), url)
+
+
+def is_cacheable_request(request):
+    """
+    Из кеша отдаются только GET- и HEAD-запросы анонимных пользователей
+    без сообщений (django.contrib.messages), которые показываются
+    на странице.
+    """
+    if request.method not in ('GET', 'HEAD'):
+        return False
+    if request.user.is_authenticated:
+        return False
+    return not len(get_messages(request))
+
+
+def is_cacheable_response(request, response):
+    return request.method == 'GET' and response.status_code == 200 and \
+        not response.streaming and not response.cookies and \
+        'private' not in response.get('Cache-Control', '') and \
+        not len(get_messages(request))
+
+
+class AnonymousPageCacheMixin:
+    """
+    Кеш страниц для анонимных пользователей. Ключ страницы содержит
+    версии областей, от которых она зависит (page_cache_scopes), поэтому
+    изменение новости сбрасывает только главную, страницы её категории
+    и её собственную страницу (news.signals), а не весь кеш.
+    Пользователи, вошедшие на сайт, и запросы с сообщениями кеш
+    не используют.
+    """
+
+    def page_cache_scopes(self):
+        raise NotImplementedError
+
+    def page_cache_hit(self, request):
+        """
+        Вызывается, когда страница отдана из кеша.
+        """
+
+    def dispatch(self, request, *args, **kwargs):
+        if not is_cacheable_request(request):
+            return super().dispatch(request, *args, **kwargs)
+        cache = get_cache()
+        key = page_key(request,
+                       scope_versions(cache, self.page_cache_scopes()))
+        response = cache.get(key)
+        if response is not None:
+            self.page_cache_hit(request)
+            return response
+        response = super().dispatch(request, *args, **kwargs)
+
+        def store(response):
+            if is_cacheable_response(request, response):
+                cache.set(key, response, page_timeout())
+
+        if callable(getattr(response, 'render', None)):
+            response.add_post_render_callback(store)
+        else:
+            store(response)
+        return response
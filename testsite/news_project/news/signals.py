@@ -0,0 +1,78 @@
+from django.db import transaction
+from django.db.models.signals import post_delete, post_save, pre_save
+from django.dispatch import receiver
+
+from .categories import invalidate_categories, invalidate_counts
+from .models import Category, News
+from .page_cache import bump_versions, category_scope, home_scope, \
+    news_scope
+
+
+@receiver(pre_save, sender=News)
+def remember_category(sender, instance, **kwargs):
+    # Категория и публикация новости до сохранения: если они изменились,
+    # нужно пересчитать и прежнюю категорию
+    instance._saved_category = None
+    if instance.pk is not None and not instance._state.adding:
+        instance._saved_category = sender.objects.filter(
+            pk=instance.pk).values_list('category_id', 'is_published').first()
+
+
+@receiver(post_save, sender=News)
+def invalidate_news_category(sender, instance, created, **kwargs):
+    """
+    Сбрасывает в кеше боковой панели количество новостей только в тех
+    категориях, которые затронуло сохранение новости (после фиксации
+    транзакции, чтобы пересчёт не прочитал старые данные).
+    """
+    saved = getattr(instance, '_saved_category', None)
+    current = (instance.category_id, instance.is_published)
+    if not created and saved == current:
+        return
+    category_ids = {instance.category_id}
+    if saved is not None:
+        category_ids.add(saved[0])
+    transaction.on_commit(lambda: invalidate_counts(category_ids))
+
+
+@receiver(post_delete, sender=News)
+def invalidate_deleted_news_category(sender, instance, **kwargs):
+    category_ids = [instance.category_id]
+    transaction.on_commit(lambda: invalidate_counts(category_ids))
+
+
+@receiver(post_save, sender=Category)
+def invalidate_category_list(sender, instance, **kwargs):
+    # Изменилось название или порядок категорий: количество новостей
+    # в категориях остаётся в кеше
+    transaction.on_commit(invalidate_categories)
+
+
+@receiver(post_delete, sender=Category)
+def invalidate_deleted_category(sender, instance, **kwargs):
+    category_ids = [instance.pk]
+    transaction.on_commit(invalidate_categories)
+    transaction.on_commit(lambda: invalidate_counts(category_ids))
+
+
+@receiver(post_save, sender=News)
+@receiver(post_delete, sender=News)
+def invalidate_news_pages(sender, instance, **kwargs):
+    """
+    Сбрасывает кеш страниц, на которых видна новость: главной, страниц
+    её категории (и прежней категории, если новость перенесена)
+    и страницы самой новости.
+    """
+    scopes = [home_scope(), category_scope(instance.category_id),
+              news_scope(instance.pk)]
+    saved = getattr(instance, '_saved_category', None)
+    if saved is not None and saved[0] != instance.category_id:
+        scopes.append(category_scope(saved[0]))
+    transaction.on_commit(lambda: bump_versions(scopes))
+
+
+@receiver(post_save, sender=Category)
+@receiver(post_delete, sender=Category)
+def invalidate_category_pages(sender, instance, **kwargs):
+    scopes = [home_scope(), category_scope(instance.pk)]
+    transaction.on_commit(lambda: bump_versions(scopes))
@@ -1,6 +1,6 @@
 from django import template
-from django.db.models import Count, F
 
+from news.categories import sidebar_categories
 from news.models import Category
 
 register = template.Library()
@@ -14,6 +14,7 @@ def get_categories():
 @register.inclusion_tag('news/list_categories.html')
 def show_categories():
     # categories = Category.objects.all()
-    categories = Category.objects.annotate(
-        cnt=Count('news', filter=F('news__is_published'))).filter(cnt__gt=0)
-    return {'categories': categories}
+    # categories = Category.objects.annotate(
+    #     cnt=Count('news', filter=F('news__is_published'))).filter(cnt__gt=0)
+    # Количество новостей в категориях берётся из кеша (news.categories)
+    return {'categories': sidebar_categories()}
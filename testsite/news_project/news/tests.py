@@ -1,3 +1,289 @@
-from django.test import TestCase
+from threading import Barrier, Thread
 
-# Create your tests here.
+from django.contrib import messages
+from django.contrib.auth.models import AnonymousUser, User
+from django.contrib.messages.storage import default_storage
+from django.contrib.sessions.backends.db import SessionStore
+from django.contrib.sessions.models import Session
+from django.core.cache import cache
+from django.db import connections
+from django.test import Client, RequestFactory, TestCase, \
+    TransactionTestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+
+from .categories import CATEGORIES_KEY, count_key, sidebar_categories
+from .counters import view_buffer
+from .models import Category, News
+from .page_cache import is_cacheable_request
+from .views import HomeNews
+
+# Кеш в памяти вместо файлового кеша проекта
+LOCMEM_CACHES = {'default': {
+    'BACKEND': 'django.core.cache.backends.locmem.LocMemCache'}}
+
+
+def create_news(count, category=None):
+    category = category or Category.objects.create(title='Категория')
+    return [News.objects.create(title=f'Новость {i}', content='Текст',
+                                category=category)
+            for i in range(count)]
+
+
+def update_queries(context):
+    return [query['sql'] for query in context.captured_queries
+            if query['sql'].startswith('UPDATE "news_news"')]
+
+
+@override_settings(NEWS_VIEWS_FLUSH_SIZE=100, NEWS_VIEWS_FLUSH_INTERVAL=3600,
+                   NEWS_VIEWS_UNIQUE_WINDOW=0, CACHES=LOCMEM_CACHES)
+class ViewCounterTest(TestCase):
+    def setUp(self):
+        cache.clear()
+        view_buffer.drain()
+        self.addCleanup(view_buffer.drain)
+        self.news = create_news(3)
+
+    def views(self, news):
+        return News.objects.values_list('views', flat=True).get(pk=news.pk)
+
+    def test_views_are_buffered(self):
+        url = self.news[0].get_absolute_url()
+        with CaptureQueriesContext(connections['default']) as context:
+            for _ in range(3):
+                self.assertEqual(self.client.get(url).status_code, 200)
+        self.assertEqual(update_queries(context), [])
+        self.assertEqual(self.views(self.news[0]), 0)
+        self.assertEqual(view_buffer.flush(), 3)
+        self.assertEqual(self.views(self.news[0]), 3)
+        self.assertEqual(view_buffer.flush(), 0)
+
+    def test_flush_groups_news_by_increment(self):
+        for news, count in zip(self.news, (2, 2, 5)):
+            view_buffer.add(news.pk, count)
+        with CaptureQueriesContext(connections['default']) as context:
+            view_buffer.flush()
+        self.assertEqual(len(update_queries(context)), 2)
+        self.assertEqual([self.views(news) for news in self.news], [2, 2, 5])
+
+    @override_settings(NEWS_VIEWS_FLUSH_SIZE=2)
+    def test_flush_when_buffer_is_full(self):
+        url = self.news[0].get_absolute_url()
+        self.client.get(url)
+        self.assertEqual(self.views(self.news[0]), 0)
+        self.client.get(url)
+        self.assertEqual(self.views(self.news[0]), 2)
+
+    def test_save_keeps_flushed_views(self):
+        news = News.objects.get(pk=self.news[0].pk)
+        view_buffer.add(news.pk, 4)
+        view_buffer.flush()
+        news.title = 'Новый заголовок'
+        news.save()
+        self.assertEqual(self.views(news), 4)
+
+    @override_settings(NEWS_VIEWS_UNIQUE_WINDOW=60)
+    def test_repeat_views_in_session(self):
+        url = self.news[0].get_absolute_url()
+        # Сессия посетителя уже есть (создана при входе, сообщениями и т.п.)
+        self.client.session
+        for _ in range(3):
+            self.client.get(url)
+        self.client.get(self.news[1].get_absolute_url())
+        Client().get(url)
+        view_buffer.flush()
+        self.assertEqual([self.views(news) for news in self.news], [2, 1, 0])
+
+    @override_settings(NEWS_VIEWS_UNIQUE_WINDOW=60)
+    def test_views_without_session_do_not_create_sessions(self):
+        url = self.news[0].get_absolute_url()
+        for _ in range(5):
+            self.assertEqual(self.client.get(url).status_code, 200)
+        view_buffer.flush()
+        self.assertEqual(Session.objects.count(), 0)
+        self.assertEqual(self.views(self.news[0]), 5)
+
+
+@override_settings(NEWS_VIEWS_FLUSH_SIZE=7, NEWS_VIEWS_FLUSH_INTERVAL=3600,
+                   NEWS_VIEWS_UNIQUE_WINDOW=0, CACHES=LOCMEM_CACHES)
+class ConcurrentViewCounterTest(TransactionTestCase):
+    THREADS = 8
+    REQUESTS = 25
+
+    def setUp(self):
+        cache.clear()
+        view_buffer.drain()
+        self.addCleanup(view_buffer.drain)
+
+    def test_counts_are_exact(self):
+        news = create_news(2)
+        barrier = Barrier(self.THREADS)
+        statuses = []
+
+        def worker(index):
+            client = Client()
+            url = news[index % 2].get_absolute_url()
+            try:
+                barrier.wait()
+                for _ in range(self.REQUESTS):
+                    statuses.append(client.get(url).status_code)
+            finally:
+                connections.close_all()
+
+        threads = [Thread(target=worker, args=(i,))
+                   for i in range(self.THREADS)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        view_buffer.flush()
+        self.assertEqual(statuses, [200] * self.THREADS * self.REQUESTS)
+        total = self.THREADS * self.REQUESTS // 2
+        self.assertEqual(
+            list(News.objects.order_by('pk').values_list('views', flat=True)),
+            [total, total])
+
+
+@override_settings(CACHES=LOCMEM_CACHES)
+class CategoryCacheTest(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.sport = Category.objects.create(title='Спорт')
+        self.culture = Category.objects.create(title='Культура')
+        self.empty = Category.objects.create(title='Пусто')
+        self.news = create_news(3, self.sport) + create_news(2, self.culture)
+
+    def sidebar(self):
+        return [(category.title, category.cnt)
+                for category in sidebar_categories()]
+
+    def test_cached_counts(self):
+        with self.assertNumQueries(2):
+            self.assertEqual(self.sidebar(), [('Культура', 2), ('Спорт', 3)])
+        with self.assertNumQueries(0):
+            self.assertEqual(self.sidebar(), [('Культура', 2), ('Спорт', 3)])
+        # Запросы страницы - только количество и список новостей
+        with self.assertNumQueries(2):
+            response = self.client.get('/')
+        self.assertContains(response, 'Спорт <span')
+
+    def test_save_invalidates_only_changed_categories(self):
+        self.sidebar()
+        news = self.news[0]
+        with self.captureOnCommitCallbacks(execute=True):
+            news.title = 'Новый заголовок'
+            news.save()
+        self.assertIsNotNone(cache.get(count_key(self.sport.pk)))
+        with self.captureOnCommitCallbacks(execute=True):
+            news.category = self.empty
+            news.save()
+        self.assertIsNone(cache.get(count_key(self.sport.pk)))
+        self.assertIsNone(cache.get(count_key(self.empty.pk)))
+        self.assertEqual(cache.get(count_key(self.culture.pk)), 2)
+        self.assertIsNotNone(cache.get(CATEGORIES_KEY))
+        with self.assertNumQueries(1):
+            self.assertEqual(self.sidebar(), [
+                ('Культура', 2), ('Пусто', 1), ('Спорт', 2)])
+
+    def test_publish_create_and_delete(self):
+        self.sidebar()
+        with self.captureOnCommitCallbacks(execute=True):
+            self.news[3].is_published = False
+            self.news[3].save()
+            create_news(1, self.sport)
+            self.news[0].delete()
+        self.assertEqual(self.sidebar(), [('Культура', 1), ('Спорт', 3)])
+
+    def test_category_changes(self):
+        self.sidebar()
+        with self.captureOnCommitCallbacks(execute=True):
+            self.sport.title = 'Атлетика'
+            self.sport.save()
+            self.empty.delete()
+        self.assertEqual(cache.get(count_key(self.culture.pk)), 2)
+        with self.assertNumQueries(1):
+            self.assertEqual(self.sidebar(), [
+                ('Атлетика', 3), ('Культура', 2)])
+
+
+@override_settings(CACHES=LOCMEM_CACHES, NEWS_VIEWS_FLUSH_SIZE=100,
+                   NEWS_VIEWS_FLUSH_INTERVAL=3600, NEWS_VIEWS_UNIQUE_WINDOW=0)
+class PageCacheTest(TestCase):
+    def setUp(self):
+        cache.clear()
+        view_buffer.drain()
+        self.addCleanup(view_buffer.drain)
+        self.sport = Category.objects.create(title='Спорт')
+        self.culture = Category.objects.create(title='Культура')
+        self.sport_news = create_news(2, self.sport)
+        self.culture_news = create_news(2, self.culture)
+        self.urls = {
+            'home': '/',
+            'sport': self.sport.get_absolute_url(),
+            'culture': self.culture.get_absolute_url(),
+            'sport_news': self.sport_news[0].get_absolute_url(),
+            'sport_other': self.sport_news[1].get_absolute_url(),
+            'culture_news': self.culture_news[0].get_absolute_url(),
+        }
+
+    def cached_pages(self, client=None):
+        """
+        Возвращает имена страниц, отданных из кеша (без запросов к базе).
+        """
+        client = client or self.client
+        cached = []
+        for name, url in self.urls.items():
+            with CaptureQueriesContext(connections['default']) as context:
+                self.assertEqual(client.get(url).status_code, 200)
+            if not context.captured_queries:
+                cached.append(name)
+        return cached
+
+    def test_warm_pages_are_served_from_cache(self):
+        self.assertEqual(self.cached_pages(), [])
+        self.assertEqual(self.cached_pages(), list(self.urls))
+        response = self.client.get('/')
+        self.assertContains(response, self.sport_news[0].title)
+
+    def test_news_save_invalidates_only_its_pages(self):
+        self.cached_pages()
+        news = self.sport_news[0]
+        with self.captureOnCommitCallbacks(execute=True):
+            news.title = 'Новый заголовок'
+            news.save()
+        self.assertEqual(self.cached_pages(),
+                         ['culture', 'sport_other', 'culture_news'])
+        self.assertContains(self.client.get(self.urls['sport_news']),
+                            'Новый заголовок')
+        with self.captureOnCommitCallbacks(execute=True):
+            news.category = self.culture
+            news.save()
+        self.assertEqual(self.cached_pages(),
+                         ['sport_other', 'culture_news'])
+
+    def test_authenticated_users_bypass_cache(self):
+        user = User.objects.create_user('user', password='password')
+        client = Client()
+        client.force_login(user)
+        self.assertEqual(self.cached_pages(client), [])
+        self.assertEqual(self.cached_pages(client), [])
+        self.assertEqual(self.cached_pages(), [])
+        self.assertContains(client.get('/'), 'Добро пожаловать')
+
+    def test_messages_bypass_cache(self):
+        request = RequestFactory().get('/')
+        request.user = AnonymousUser()
+        request.session = SessionStore()
+        request._messages = default_storage(request)
+        self.assertTrue(is_cacheable_request(request))
+        messages.success(request, 'Новость добавлена')
+        self.assertFalse(is_cacheable_request(request))
+        response = HomeNews.as_view()(request)
+        self.assertContains(response, 'Новость добавлена')
+        self.assertNotIn('home', self.cached_pages())
+
+    def test_cached_detail_page_counts_views(self):
+        url = self.urls['sport_news']
+        for _ in range(3):
+            self.client.get(url)
+        view_buffer.flush()
+        self.assertEqual(News.objects.get(pk=self.sport_news[0].pk).views, 3)
@@ -4,8 +4,11 @@ from django.shortcuts import render, get_object_or_404, redirect
 from django.urls import reverse_lazy
 from django.views.generic import ListView, DetailView, CreateView
 
+from .counters import count_view
 from .forms import NewsForm, UserRegisterForm, UserLoginForm, ContactForm
 from .models import News, Category
+from .page_cache import AnonymousPageCacheMixin, category_scope, \
+    home_scope, news_scope
 from django.contrib.auth.forms import UserCreationForm
 from django.contrib import messages
 from django.contrib.auth import login, logout
@@ -65,7 +68,7 @@ def user_logout(request):
     return redirect('home')
 
 
-class HomeNews(ListView):
+class HomeNews(AnonymousPageCacheMixin, ListView):
     model = News
     template_name = 'news/home_news_list.html'
     context_object_name = 'news'
@@ -81,8 +84,11 @@ class HomeNews(ListView):
     def get_queryset(self):
         return News.objects.filter(is_published=True).select_related('category')
 
+    def page_cache_scopes(self):
+        return [home_scope()]
 
-class NewsByCategory(ListView):
+
+class NewsByCategory(AnonymousPageCacheMixin, ListView):
     model = News
     template_name = 'news/home_news_list.html'
     context_object_name = 'news'
@@ -98,13 +104,29 @@ class NewsByCategory(ListView):
         return News.objects.filter(category_id=self.kwargs['category_id'],
                                    is_published=True).select_related('category')
 
+    def page_cache_scopes(self):
+        return [category_scope(self.kwargs['category_id'])]
+
 
-class ViewNews(DetailView):
+class ViewNews(AnonymousPageCacheMixin, DetailView):
     model = News
     context_object_name = 'news_item'  # по умолчанию 'object'
     # template_name = 'news/news_detail.html'
     # pk_url_kwarg = 'news_id'
 
+    def get(self, request, *args, **kwargs):
+        response = super().get(request, *args, **kwargs)
+        # Просмотр копится в буфере, в базу пишется пакетами (news.counters)
+        count_view(request, self.object.pk)
+        return response
+
+    def page_cache_scopes(self):
+        return [news_scope(self.kwargs['pk'])]
+
+    def page_cache_hit(self, request):
+        # Страница из кеша - тоже просмотр
+        count_view(request, self.kwargs['pk'])
+
 
 class CreateNews(LoginRequiredMixin, CreateView):
     form_class = NewsForm
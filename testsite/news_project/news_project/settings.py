@@ -82,6 +82,10 @@ DATABASES = {
     'default': {
         'ENGINE': 'django.db.backends.sqlite3',
         'NAME': BASE_DIR / 'db.sqlite3',
+        # Тестовая база в файле: в общей базе в памяти параллельные запросы
+        # из разных потоков (news.tests) не ждут блокировку, а сразу
+        # получают ошибку "database table is locked"
+        'TEST': {'NAME': BASE_DIR / 'test_db.sqlite3'},
     }
 }
 
@@ -154,6 +158,27 @@ CACHES = {
     }
 }
 
+# Просмотры новостей копятся в памяти процесса и записываются в базу,
+# когда их накопилось NEWS_VIEWS_FLUSH_SIZE или прошло
+# NEWS_VIEWS_FLUSH_INTERVAL секунд с прошлой записи
+NEWS_VIEWS_FLUSH_SIZE = 100
+NEWS_VIEWS_FLUSH_INTERVAL = 10
+# Повторные просмотры новости в одной сессии за это время (секунды)
+# не считаются; 0 - считать все просмотры. Сессии ради этого не создаются:
+# просмотры посетителей без сессии считаются все
+NEWS_VIEWS_UNIQUE_WINDOW = 0
+NEWS_VIEWS_CACHE_ALIAS = 'default'
+# Кеш количества новостей в категориях боковой панели (сбрасывается
+# сигналами при изменении новостей и категорий)
+NEWS_CATEGORIES_CACHE_ALIAS = 'default'
+NEWS_CATEGORIES_CACHE_TIMEOUT = 3600
+# Кеш страниц новостей для анонимных пользователей (сбрасывается
+# сигналами по областям: главная, категория, новость). Количество
+# новостей в боковой панели на страницах других областей обновляется
+# по истечении таймаута
+NEWS_PAGE_CACHE_ALIAS = 'default'
+NEWS_PAGE_CACHE_TIMEOUT = 300
+
 
 CKEDITOR_UPLOAD_PATH = "uploads/"
 CKEDITOR_CONFIGS = {